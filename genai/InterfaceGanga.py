@@ -3,18 +3,99 @@ import sys
 import time
 import torch
 import numpy as np
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, StoppingCriteria, StoppingCriteriaList
+from genai.telemetry import InferenceTelemetry
+from genai.context_window import ContextWindowManager
+from genai.retrieval import fit_chunks, format_reference
+from genai.backends import load_backend_model, llm_backends
+from genai.precision import get_best_dtype, check_dtype
+from genai.artifact_store import ArtifactStore, new_run_id
+
+class GenerationTimer(StoppingCriteria):
+    """
+    The GenerationTimer class is passed to generate as a stopping criterion
+    that never stops generation. generate calls it after every step, so the
+    first call marks the end of the prefill (the forward pass over the
+    prompt) and the calls after it time the decode, one token per step.
+    """
+    def __init__(self):
+        self.start_time = None
+        self.step_times = []
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.step_times = []
+
+    def __call__(self, input_ids, scores, **kwargs):
+        self.step_times.append(time.perf_counter())
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+    def prefill_seconds(self):
+        return self.step_times[0] - self.start_time if self.step_times else 0.0
+
+    def decode_seconds(self):
+        return self.step_times[-1] - self.step_times[0] if self.step_times else 0.0
+
+    def decode_tokens(self):
+        return max(0, len(self.step_times) - 1)
 
 class InterfaceGanga:
     def __init__(self, llm_model="deepseek-ai/deepseek-coder-1.3b-instruct",\
                        llm_input="Find approximation of Pi using Monte Carlo",\
                        return_tensor_format='pt',\
-                       token_length=1024):
+                       token_length=1024,\
+                       generation_tokens=512,\
+                       context_policy='compress',\
+                       backend='eager',\
+                       torch_dtype='auto',\
+                       artifact_store=None,\
+                       publish_dir=None,\
+                       retrieval_index=None,\
+                       top_k=3,\
+                       telemetry=None):
+        if backend not in llm_backends:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {llm_backends}")
+        if torch_dtype != 'auto':
+            check_dtype(torch_dtype)
 
         self.llm_model = llm_model
         self.llm_input = llm_input
         self.return_tensor_format = return_tensor_format
         self.token_length = token_length
+        self.generation_tokens = generation_tokens
+        self.context_policy = context_policy
+        self.context_split = None
+        self.backend = backend
+        self.backend_info = None
+        self.torch_dtype = torch_dtype
+        self.telemetry = telemetry if telemetry else InferenceTelemetry()
+        # every run keeps its files in the store, so parallel runs don't clobber each other
+        self.artifact_store = artifact_store if artifact_store else ArtifactStore()
+        self.publish_dir = publish_dir
+        self.retrieval_index = retrieval_index
+        self.top_k = top_k
+        self.run_id = new_run_id()
+
+    def add_telemetry_callback(self, callback):
+        """
+        The add_telemetry_callback method registers a function that is
+        called with the record of every stage (model load, retrieval, tokenization,
+        prefill, decode, detokenize, snippet extraction, file writing)
+        as soon as the stage ends.
+        
+        :param callback: a function taking a record dictionary
+        """
+        self.telemetry.add_callback(callback)
+
+    def export_telemetry(self, path):
+        """
+        The export_telemetry method appends the stage records of this run
+        and their summary to a JSON lines file.
+        
+        :param path: path of the JSON lines file
+        :return: The path of the file
+        """
+        return self.telemetry.export_jsonl(path)
 
     def run_llm_inference(self):
         """
@@ -25,48 +106,143 @@ class InterfaceGanga:
             llm_model: the LLM model to use
             llm_input: prompt
             return_tensor_format: format of the return tensor
-            token_length: maximum token length of the output
+            token_length: size of the context window, prompt and output together
+            generation_tokens: tokens always left for the output
+            context_policy: how to fit a prompt that is too long:
+                            'error', 'truncate' or 'compress'
+            backend: how to run generate: 'eager', 'compile' (torch.compile)
+                     or 'onnx' (ONNX Runtime), compiled once per model
+                     and library version
+            torch_dtype: precision of the weights, one of candidate_dtypes,
+                         or 'auto' for the fastest accurate one on this
+                         host; the onnx backend ignores it
+            retrieval_index: a RetrievalIndex whose most relevant chunks
+                             are prepended to the prompt, as far as they
+                             fit next to it, or None
+            top_k: the number of chunks to prepend
+            telemetry: records the time of every stage
         :return: The generated text
         """
-        tokenizer = AutoTokenizer.from_pretrained(self.llm_model,\
-            trust_remote_code=True)
-
-        model = AutoModelForCausalLM.from_pretrained(self.llm_model,\
-            trust_remote_code=True, torch_dtype=torch.bfloat16)
-
-        # Run on GPU if available
-        if torch.cuda.is_available():
-            print("\nFound CUDA compatible GPU. Utilizing GPU...\n\
+        with self.telemetry.stage('model_load', model=self.llm_model, backend=self.backend) as counters:
+            tokenizer = AutoTokenizer.from_pretrained(self.llm_model,\
+                trust_remote_code=True)
+
+            # Run on GPU if available; ONNX Runtime runs on CPU
+            use_cuda = torch.cuda.is_available() and self.backend != 'onnx'
+            # probed once per host, e.g. bfloat16 is slower than float32
+            # on CPUs without native bfloat16 support; the ONNX export
+            # has its own precision, so there is nothing to choose
+            dtype_name = None
+            if self.backend != 'onnx':
+                dtype_name = self.torch_dtype
+                if dtype_name == 'auto':
+                    dtype_name, _ = get_best_dtype('cuda' if use_cuda else 'cpu')
+            model, self.backend_info = load_backend_model(self.llm_model, self.backend,\
+                torch_dtype=getattr(torch, dtype_name) if dtype_name else None, use_cuda=use_cuda)
+            counters['cached'] = self.backend_info['cached']
+            counters['dtype'] = dtype_name
+
+            if use_cuda:
+                print("\nFound CUDA compatible GPU. Utilizing GPU...\n\
 Esimated runtime: less than 1 minute\n")
-            model = model.cuda()
-        else:
-            print("\nNo CUDA compatible GPU found. Running on CPU only...\n\
+            else:
+                print("\nNo CUDA compatible GPU found. Running on CPU only...\n\
 Esimated runtime: 10 to 25 minutes\n")
+            counters['device'] = str(model.device)
 
         if not tokenizer.pad_token:
             tokenizer.pad_token = tokenizer.eos_token
 
-        input_text = self.llm_input
-        inputs = tokenizer(input_text,\
-                return_tensors=self.return_tensor_format).to(model.device)
-
+        # count the prompt tokens up front so that a long prompt can't
+        # eat the output budget
+        context_window = ContextWindowManager(tokenizer, self.token_length,\
+            self.generation_tokens, self.context_policy)
+
+        reference = ''
+        if self.retrieval_index:
+            with self.telemetry.stage('retrieval') as counters:
+                # the chunks only get the tokens that the task leaves
+                chunks = fit_chunks(self.retrieval_index.search(self.llm_input, self.top_k),\
+                    self.llm_input, context_window.count_tokens, context_window.prompt_budget)
+                reference = format_reference(chunks)
+                counters['chunks'] = len(chunks)
+
+        with self.telemetry.stage('tokenization') as counters:
+            # the task is never shortened to make room for the reference
+            if reference:
+                self.context_split = context_window.fit(reference, protected_suffix=self.llm_input)
+            else:
+                self.context_split = context_window.fit(self.llm_input)
+            input_text = self.context_split['prompt']
+
+            inputs = tokenizer(input_text,\
+                    return_tensors=self.return_tensor_format).to(model.device)
+            input_tokens = int(inputs['input_ids'].shape[-1])
+            counters['tokens'] = input_tokens
+            counters['original_tokens'] = self.context_split['original_prompt_tokens']
+            counters['generation_budget'] = self.context_split['generation_tokens']
+
+        print(f"\nContext: {input_tokens} prompt tokens (originally \
+{self.context_split['original_prompt_tokens']}), {self.context_split['generation_tokens']} tokens \
+left for generation out of {self.token_length}\n")
+        if self.context_split['actions']:
+            print(f"WARNING: The prompt was too long and has been shortened: {', '.join(self.context_split['actions'])}\n")
+
+        generation_timer = GenerationTimer()
         start_time = time.time()
+        cpu_start_time = time.process_time()
+        generation_timer.start()
 
-        # testing: Assert max_length >= input length
-        outputs = model.generate(**inputs, max_length=self.token_length)
+        outputs = model.generate(**inputs, max_new_tokens=self.context_split['generation_tokens'],\
+            stopping_criteria=StoppingCriteriaList([generation_timer]))
 
         end_time = time.time()
+        cpu_seconds = time.process_time() - cpu_start_time
+
+        # prefill and decode share generate's CPU time by their wall time
+        prefill_seconds = generation_timer.prefill_seconds()
+        decode_seconds = generation_timer.decode_seconds()
+        generate_seconds = max(prefill_seconds + decode_seconds, 1e-9)
+        decode_tokens = generation_timer.decode_tokens()
+        self.telemetry.record_stage('prefill', prefill_seconds,\
+            cpu_seconds * prefill_seconds / generate_seconds, tokens=input_tokens,\
+            tokens_per_second=input_tokens / prefill_seconds if prefill_seconds else None)
+        self.telemetry.record_stage('decode', decode_seconds,\
+            cpu_seconds * decode_seconds / generate_seconds, tokens=decode_tokens,\
+            tokens_per_second=decode_tokens / decode_seconds if decode_seconds else None)
 
         print("\nTime taken:", round((end_time - start_time) / 60.0, 2), "minutes\n")
 
-        return tokenizer.decode(outputs[0], skip_special_tokens=True)
+        output_tokens = int(outputs.shape[-1]) - input_tokens
+        with self.telemetry.stage('detokenize', tokens=output_tokens):
+            return tokenizer.decode(outputs[0], skip_special_tokens=True)
+
+    def save_artifacts(self, artifacts):
+        """
+        The save_artifacts method stores files of this run in the artifact
+        store and, if publish_dir is set, also writes them there under
+        their names, replacing each file atomically. Runs publishing to
+        the same folder overwrite each other's files, so publish_dir is
+        None by default and parallel runs read their files from the
+        store by run id.
+        
+        :param artifacts: dictionary of file contents by file name
+        :return: The paths of the published files, or of the stored
+                 objects if nothing is published
+        """
+        manifest = self.artifact_store.add_artifacts(self.run_id, artifacts,\
+            {'llm_model': self.llm_model, 'telemetry_run_id': self.telemetry.run_id})
+
+        if self.publish_dir:
+            return self.artifact_store.materialize(self.run_id, self.publish_dir, list(artifacts))
+
+        return [self.artifact_store.get_object_path(manifest['artifacts'][name]['hash']) for name in artifacts]
 
     ### THIS FUNCTION BLOCK IS AUXILLARY TO THE PROBLEM STATEMENT ###
 
     def store_llm_output(self, output):
-        output_file = 'llm_output.txt'
-        with open(output_file, 'w') as f:
-            f.write(output)
+        with self.telemetry.stage('file_write', files=1):
+            output_file, = self.save_artifacts({'llm_output.txt': output})
 
         return output_file
 
@@ -170,31 +346,29 @@ using coding marker #1.\nLLM probably generated a different pattern of text.")
         ganga_pattern_2 = r"```python(\n[^`]*?from.*?)```"
         bash_pattern_2 = r"```bash(.*?)```"
 
-        python_snippet = self.extract_code_snippet(\
-            'Pi approximation', pi_pattern_1, pi_pattern_2, llm_output)
-        # print(python_snippet)
-        
-        ganga_snippet = self.extract_code_snippet(\
-            'Ganga job', ganga_pattern_1, ganga_pattern_2, llm_output)
-        # print(ganga_snippet)
+        with self.telemetry.stage('snippet_extraction', characters=len(llm_output)):
+            python_snippet = self.extract_code_snippet(\
+                'Pi approximation', pi_pattern_1, pi_pattern_2, llm_output)
+            # print(python_snippet)
+            
+            ganga_snippet = self.extract_code_snippet(\
+                'Ganga job', ganga_pattern_1, ganga_pattern_2, llm_output)
+            # print(ganga_snippet)
+
+            bash_snippet = self.extract_code_snippet(\
+                'Bash', bash_pattern_1, bash_pattern_2, llm_output) if ganga_snippet else None
+            # print(bash_snippet)
 
         if not ganga_snippet:
             print("ERROR: LLM failed to generate any code to run Ganga job.")
             return False
-        
-        bash_snippet = self.extract_code_snippet(\
-            'Bash', bash_pattern_1, bash_pattern_2, llm_output)
-        # print(bash_snippet)
 
         # all code snippets should be ready by this point. #
         
         # Generate file names
-        pi_function_name = re.findall(r'def\s+(\w+)\(', python_snippet, re.DOTALL)
+        pi_function_name = re.findall(r'def\s+(\w+)\(', python_snippet or '', re.DOTALL)
         if pi_function_name:
-            if len(pi_function_name) > 1:
-                pi_filename = f"{pi_function_name[0]}.py"        
-            else:
-                pi_filename = f"{pi_function_name}.py"
+            pi_filename = f"{pi_function_name[0]}.py"
         else:
             pi_filename = "pi_estimation.py"
 
@@ -202,15 +376,10 @@ using coding marker #1.\nLLM probably generated a different pattern of text.")
         bash_filename = "run_ganga.sh"
 
         # Write available code snippets to respective files
-        if python_snippet:
-            self.helper_write_to_file(pi_filename, python_snippet)
-        if ganga_snippet:
-            self.helper_write_to_file(ganga_filename, ganga_snippet)
-        if bash_snippet:
-            self.helper_write_to_file(bash_filename, bash_snippet)
+        with self.telemetry.stage('file_write') as counters:
+            snippets = {pi_filename: python_snippet, ganga_filename: ganga_snippet, bash_filename: bash_snippet}
+            artifacts = {filename: snippet.lstrip() for filename, snippet in snippets.items() if snippet}
+            self.save_artifacts(artifacts)
+            counters['files'] = len(artifacts)
 
         return True
-
-    def helper_write_to_file(self, filename, snippet):
-        with open(filename, 'w') as file:
-            file.write(snippet.lstrip())
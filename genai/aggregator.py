@@ -0,0 +1,177 @@
+import os
+
+# printed by persistent workers before the count of every page
+page_marker = '# page '
+
+def parse_page_key(key):
+    """
+    The parse_page_key function reads the page named by a page marker:
+    a page number, or a 'file:page' key in a corpus job.
+
+    :param key: the text after the page marker
+    :return: The page number, or the key as a string
+    """
+    key = key.strip()
+    try:
+        return int(key)
+    except ValueError:
+        return key
+
+class WordCountAggregator:
+    """
+    The WordCountAggregator class folds the word counts printed by the
+    subjobs of a word-count job into a running total as soon as each
+    subjob finishes. Output files are read line by line, so a merged
+    file is never held in memory as a whole.
+    """
+    def __init__(self):
+        self.total = 0
+        self.page_counts = {}
+        self.folded_subjobs = set()
+
+    def fold_lines(self, lines, page=None):
+        """
+        The fold_lines method adds up the integers in an iterable of lines.
+        Lines starting with '#' (e.g. TextMerger headers) and lines that
+        are not integers are skipped. A page marker line attributes the
+        counts after it to that page, which lets a persistent worker
+        report many pages in one stdout.
+
+        :param lines: an iterable of text lines, e.g. an open file
+        :param page: the page the counts belong to, if known
+        :return: The sum of the integers that were folded in
+        """
+        word_count = 0
+        for line in lines:
+            if line.startswith(page_marker):
+                page = parse_page_key(line[len(page_marker):])
+                continue
+            if line.startswith('#'):
+                continue
+            try:
+                line_count = int(line.strip())
+            except ValueError:
+                continue
+
+            word_count += line_count
+            if page is not None:
+                self.page_counts[page] = self.page_counts.get(page, 0) + line_count
+
+        self.total += word_count
+
+        return word_count
+
+    def fold_file(self, output_file, page=None):
+        """
+        The fold_file method streams a stdout file into the aggregator.
+
+        :param output_file: path of the file to read
+        :param page: the page the counts belong to, if known
+        :return: The sum of the integers in the file
+        """
+        with open(output_file, 'r') as f:
+            return self.fold_lines(f, page)
+
+    def fold_subjob(self, subjob, page=None):
+        """
+        The fold_subjob method folds the stdout of a finished subjob into
+        the aggregator. A subjob is only ever folded once.
+
+        :param subjob: a completed subjob
+        :param page: the page the subjob counted; defaults to the subjob id,
+                     which is the page number in the ArgSplitter job
+        :return: True if the subjob was folded in by this call
+        """
+        if subjob.id in self.folded_subjobs:
+            return False
+
+        stdout = os.path.join(subjob.outputdir, 'stdout')
+        self.fold_file(stdout, subjob.id if page is None else page)
+        self.folded_subjobs.add(subjob.id)
+
+        return True
+
+    def fold_completed_subjobs(self, job):
+        """
+        The fold_completed_subjobs method folds in every subjob of a job
+        that has completed since the last call.
+
+        :param job: the master job
+        :return: The number of subjobs folded in by this call
+        """
+        folded = 0
+        for subjob in job.subjobs:
+            if subjob.status == 'completed' and self.fold_subjob(subjob):
+                folded += 1
+
+        return folded
+
+    def count_by_file(self):
+        """
+        The count_by_file method adds up the per-page counts of a corpus
+        job, whose pages are named by 'file:page' keys, for every file.
+
+        :return: A dictionary of word counts by file name, empty for a
+                 single-file job
+        """
+        file_counts = {}
+        for page, word_count in self.page_counts.items():
+            if isinstance(page, str) and ':' in page:
+                file = page.rpartition(':')[0]
+                file_counts[file] = file_counts.get(file, 0) + word_count
+
+        return file_counts
+
+
+class TermMatrixAggregator(WordCountAggregator):
+    """
+    The TermMatrixAggregator class folds the output of multi-term word
+    count subjobs, a 'count<TAB>term' line per term after the page marker
+    of every page, into a term x page matrix. The total adds up all terms.
+    """
+    def __init__(self):
+        super().__init__()
+        self.term_counts = {}
+
+    def fold_lines(self, lines, page=None):
+        """
+        The fold_lines method adds the term counts in an iterable of lines
+        to the matrix. Lines that are not page markers or term counts are
+        skipped.
+
+        :param lines: an iterable of text lines, e.g. an open file
+        :param page: the page the counts belong to, if known
+        :return: The sum of the term counts that were folded in
+        """
+        word_count = 0
+        for line in lines:
+            if line.startswith(page_marker):
+                page = parse_page_key(line[len(page_marker):])
+                continue
+            if line.startswith('#') or '\t' not in line:
+                continue
+
+            count, term = line.rstrip('\n').split('\t', 1)
+            try:
+                count = int(count)
+            except ValueError:
+                continue
+
+            word_count += count
+            page_counts = self.term_counts.setdefault(term, {})
+            page_counts[page] = page_counts.get(page, 0) + count
+            self.page_counts[page] = self.page_counts.get(page, 0) + count
+
+        self.total += word_count
+
+        return word_count
+
+    def get_matrix(self, terms, pages):
+        """
+        The get_matrix method returns the counts as a term x page matrix.
+
+        :param terms: the terms, in the order of the rows
+        :param pages: the pages, in the order of the columns
+        :return: One list of page counts per term
+        """
+        return [[self.term_counts.get(term, {}).get(page, 0) for page in pages] for term in terms]
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+
+artifact_store_env_var = 'GENAI_ARTIFACT_STORE'
+artifact_store_folder = 'llm_artifacts'
+manifest_file = 'manifest.json'
+
+def write_atomic(path, data):
+    """
+    The write_atomic function writes a file under a temporary name and
+    renames it into place, so that readers see either the old file or
+    the complete new one, never a partial write. The temporary name is
+    unique, so concurrent writers don't clash.
+
+    :param path: path of the file
+    :param data: the bytes to write
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def new_run_id():
+    """
+    The new_run_id function names a generation run: its start time, so
+    that runs sort by time, and a random suffix, so that concurrent runs
+    never share a name.
+
+    :return: The run id
+    """
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+class ArtifactStore:
+    """
+    The ArtifactStore class keeps the files generated by LLM runs, e.g.
+    the raw output and the code snippets. The content of every file is
+    stored once under its SHA-256 hash in objects/, so identical
+    snippets of different runs share a single copy. Every run has a
+    manifest in runs/<run_id>/ that maps the file names of the run to
+    their hashes. Objects are immutable and both objects and manifests
+    are written atomically, so any number of processes can write runs
+    and read them concurrently. A run is written by a single process.
+    """
+    def __init__(self, root=None):
+        self.root = root if root else os.getenv(artifact_store_env_var, artifact_store_folder)
+
+    def get_object_path(self, content_hash):
+        return os.path.join(self.root, 'objects', content_hash[:2], content_hash)
+
+    def get_manifest_path(self, run_id):
+        return os.path.join(self.root, 'runs', run_id, manifest_file)
+
+    def put_object(self, data):
+        """
+        The put_object method stores content under its hash, unless the
+        same content is already stored.
+
+        :param data: the content, as bytes or text
+        :return: A tuple of the hash and whether the content was new
+        """
+        data = data.encode() if isinstance(data, str) else data
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.get_object_path(content_hash)
+        if os.path.exists(path):
+            return content_hash, False
+
+        write_atomic(path, data)
+
+        return content_hash, True
+
+    def get_object(self, content_hash):
+        """
+        The get_object method reads stored content back.
+
+        :param content_hash: the hash of the content
+        :return: The content as bytes
+        """
+        with open(self.get_object_path(content_hash), 'rb') as f:
+            return f.read()
+
+    def read_manifest(self, run_id):
+        """
+        The read_manifest method reads the manifest of a run.
+
+        :param run_id: the run id
+        :return: The manifest, or None if the run doesn't exist
+        """
+        try:
+            with open(self.get_manifest_path(run_id), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def add_artifacts(self, run_id, artifacts, metadata=None):
+        """
+        The add_artifacts method stores files of a run and records them in
+        its manifest. The objects are written before the manifest, so a
+        manifest never names a missing object.
+
+        :param run_id: the run id
+        :param artifacts: dictionary of file contents by file name
+        :param metadata: optional dictionary to record in the manifest
+        :return: The manifest of the run
+        """
+        manifest = self.read_manifest(run_id) or {'run_id': run_id, 'created_at': time.time(), 'artifacts': {}}
+        if metadata:
+            manifest.setdefault('metadata', {}).update(metadata)
+
+        for name, content in artifacts.items():
+            content_hash, new = self.put_object(content)
+            manifest['artifacts'][name] = {
+                'hash': content_hash,
+                'size': len(content.encode() if isinstance(content, str) else content),
+                'deduplicated': not new,
+            }
+
+        write_atomic(self.get_manifest_path(run_id), json.dumps(manifest, indent=2).encode())
+
+        return manifest
+
+    def read_artifact(self, run_id, name):
+        """
+        The read_artifact method reads a file of a run.
+
+        :param run_id: the run id
+        :param name: the file name
+        :return: The content as text
+        """
+        manifest = self.read_manifest(run_id)
+        if not manifest or name not in manifest['artifacts']:
+            raise KeyError(f"No artifact '{name}' in run {run_id}")
+
+        return self.get_object(manifest['artifacts'][name]['hash']).decode()
+
+    def list_runs(self):
+        """
+        The list_runs method lists the runs with a manifest, oldest first.
+
+        :return: A list of run ids
+        """
+        runs_dir = os.path.join(self.root, 'runs')
+        if not os.path.isdir(runs_dir):
+            return []
+
+        return sorted(run_id for run_id in os.listdir(runs_dir)
+                      if os.path.exists(self.get_manifest_path(run_id)))
+
+    def materialize(self, run_id, target_dir, names=None):
+        """
+        The materialize method copies files of a run to a folder under
+        their names, e.g. to run a generated Ganga job from there. Every
+        file is replaced atomically.
+
+        :param run_id: the run id
+        :param target_dir: the folder to write to
+        :param names: the files to copy; all files of the run by default
+        :return: The list of written paths
+        """
+        manifest = self.read_manifest(run_id)
+        if not manifest:
+            raise KeyError(f"No run {run_id} in {self.root}")
+
+        paths = []
+        for name, artifact in manifest['artifacts'].items():
+            if names is None or name in names:
+                path = os.path.join(target_dir, name)
+                write_atomic(path, self.get_object(artifact['hash']))
+                paths.append(path)
+
+        return paths
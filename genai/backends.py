@@ -0,0 +1,252 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+from importlib import metadata
+
+# eager: the HuggingFace generate loop as it is
+# compile: the decoder forward pass compiled by torch.compile with a static KV cache
+# onnx: the decoder exported to ONNX and run by ONNX Runtime with its KV cache
+llm_backends = ('eager', 'compile', 'onnx')
+backend_cache_env_var = 'GENAI_BACKEND_CACHE'
+backend_info_file = 'backend.json'
+benchmark_file = 'backend_benchmark.json'
+# the libraries whose version invalidates a compiled artifact
+backend_libraries = {
+    'eager': ('torch', 'transformers'),
+    'compile': ('torch', 'transformers'),
+    'onnx': ('torch', 'transformers', 'optimum', 'onnxruntime'),
+}
+
+def get_library_version(library):
+    """
+    The get_library_version function returns the installed version of a
+    library without importing it.
+
+    :param library: the distribution name, e.g. 'torch'
+    :return: The version, or None if the library is not installed
+    """
+    try:
+        return metadata.version(library)
+    except metadata.PackageNotFoundError:
+        return None
+
+def get_backend_cache_dir(llm_model, backend, versions=None, cache_root=None):
+    """
+    The get_backend_cache_dir function names the folder of the compiled
+    artifact of a model. It depends on the model, the backend and the
+    versions of the libraries that produced it, so that the compile cost
+    is paid once per model and library version.
+
+    :param llm_model: the name of the model
+    :param backend: one of llm_backends
+    :param versions: dictionary of library versions; defaults to the installed ones
+    :param cache_root: where the artifacts are kept; defaults to $GENAI_BACKEND_CACHE
+                       or ~/.cache/genai/backends
+    :return: The path of the cache folder
+    """
+    if backend not in llm_backends:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {llm_backends}")
+
+    if versions is None:
+        versions = {library: get_library_version(library) for library in backend_libraries[backend]}
+    if cache_root is None:
+        cache_root = os.getenv(backend_cache_env_var,\
+            os.path.join(os.path.expanduser('~'), '.cache', 'genai', 'backends'))
+
+    key = json.dumps({'model': llm_model, 'backend': backend, 'versions': versions}, sort_keys=True)
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    model_folder = re.sub(r'[^\w.-]', '_', llm_model)
+
+    return os.path.join(cache_root, model_folder, f"{backend}-{digest}")
+
+def write_backend_info(cache_dir, info):
+    """
+    The write_backend_info function records how a cached artifact was
+    built, e.g. how long compiling took.
+
+    :param cache_dir: the cache folder
+    :param info: dictionary to record
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, backend_info_file), 'w') as f:
+        json.dump(info, f, indent=2)
+
+def load_backend_model(llm_model, backend='eager', torch_dtype=None, use_cuda=False, cache_dir=None):
+    """
+    The load_backend_model function loads a causal language model to run
+    generate on with the chosen backend. The compiled artifacts are kept
+    in the cache folder of the model:
+        compile: the TorchInductor cache, so later processes reuse the
+                 compiled kernels instead of compiling again
+        onnx: the exported ONNX model, which is only exported once
+
+    :param llm_model: the name of the model
+    :param backend: one of llm_backends
+    :param torch_dtype: dtype of the weights for eager and compile
+    :param use_cuda: move the model to the GPU (eager and compile only)
+    :param cache_dir: the cache folder; defaults to get_backend_cache_dir
+    :return: A tuple of the model and a dictionary describing the backend
+    """
+    if cache_dir is None:
+        cache_dir = get_backend_cache_dir(llm_model, backend)
+    info = {'backend': backend, 'model': llm_model, 'cache_dir': cache_dir, 'cached': False}
+
+    if backend == 'onnx':
+        try:
+            from optimum.onnxruntime import ORTModelForCausalLM
+        except ImportError:
+            raise ImportError("The onnx backend needs ONNX Runtime and Optimum: pip install optimum[onnxruntime]")
+
+        start_time = time.perf_counter()
+        if os.path.exists(os.path.join(cache_dir, backend_info_file)):
+            model = ORTModelForCausalLM.from_pretrained(cache_dir, use_cache=True, use_io_binding=False)
+            info['cached'] = True
+        else:
+            model = ORTModelForCausalLM.from_pretrained(llm_model, export=True, use_cache=True,\
+                trust_remote_code=True, use_io_binding=False)
+            model.save_pretrained(cache_dir)
+            write_backend_info(cache_dir, dict(info, export_seconds=time.perf_counter() - start_time))
+        info['load_seconds'] = time.perf_counter() - start_time
+
+        return model, info
+
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    # must be set before anything is compiled
+    if backend == 'compile':
+        os.environ.setdefault('TORCHINDUCTOR_CACHE_DIR', os.path.join(cache_dir, 'inductor'))
+        os.environ.setdefault('TORCHINDUCTOR_FX_GRAPH_CACHE', '1')
+        info['cached'] = os.path.exists(os.path.join(cache_dir, backend_info_file))
+
+    start_time = time.perf_counter()
+    model = AutoModelForCausalLM.from_pretrained(llm_model, trust_remote_code=True,\
+        torch_dtype=torch_dtype if torch_dtype else torch.bfloat16)
+    if use_cuda:
+        model = model.cuda()
+
+    if backend == 'compile':
+        # a static KV cache keeps the shapes fixed, so the graph is compiled
+        # once instead of once per generated token
+        model.generation_config.cache_implementation = 'static'
+        model.forward = torch.compile(model.forward, mode='reduce-overhead', fullgraph=True)
+        if not info['cached']:
+            write_backend_info(cache_dir, info)
+    info['load_seconds'] = time.perf_counter() - start_time
+
+    return model, info
+
+def time_generation(model, tokenizer, prompt, max_new_tokens):
+    """
+    The time_generation function times a greedy generate call.
+
+    :param model: the model
+    :param tokenizer: its tokenizer
+    :param prompt: the prompt
+    :param max_new_tokens: the number of tokens to generate at most
+    :return: A tuple of the wall time and the number of generated tokens
+    """
+    inputs = tokenizer(prompt, return_tensors='pt').to(model.device)
+    start_time = time.perf_counter()
+    outputs = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False)
+    seconds = time.perf_counter() - start_time
+
+    return seconds, int(outputs.shape[-1]) - int(inputs['input_ids'].shape[-1])
+
+def summarize_benchmark(runs):
+    """
+    The summarize_benchmark function adds up the timed runs of every
+    backend and compares their throughput to the eager backend.
+
+    :param runs: list of dictionaries with the backend, the seconds and
+                 the generated tokens of a run
+    :return: A dictionary of backend summaries with the total seconds,
+             the total tokens, the tokens per second and the speedup
+             over eager
+    """
+    summary = {}
+    for run in runs:
+        backend = summary.setdefault(run['backend'], {'runs': 0, 'seconds': 0.0, 'tokens': 0})
+        backend['runs'] += 1
+        backend['seconds'] += run['seconds']
+        backend['tokens'] += run['tokens']
+
+    for backend in summary.values():
+        backend['tokens_per_second'] = backend['tokens'] / backend['seconds'] if backend['seconds'] else 0.0
+
+    eager = summary.get('eager', {}).get('tokens_per_second')
+    for backend in summary.values():
+        backend['speedup'] = backend['tokens_per_second'] / eager if eager else None
+
+    return summary
+
+def benchmark_backends(llm_model, prompts, backends=llm_backends, max_new_tokens=64, warmup=True,\
+                       output_file=benchmark_file):
+    """
+    The benchmark_backends function measures the generation throughput of
+    every backend on the same prompts. A warm-up run on the first prompt
+    keeps compiling out of the timed runs; the load and compile time is
+    reported separately.
+
+    :param llm_model: the name of the model
+    :param prompts: list of prompts
+    :param backends: the backends to compare
+    :param max_new_tokens: the number of tokens to generate per prompt
+    :param warmup: run the first prompt once before timing
+    :param output_file: the JSON file to write the results to
+    :return: A dictionary with the runs, the load information and the summary
+    """
+    import torch
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(llm_model, trust_remote_code=True)
+    if not tokenizer.pad_token:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    runs, loads = [], []
+    for backend in backends:
+        # the same dtype everywhere, so that only the backend differs
+        model, info = load_backend_model(llm_model, backend, torch_dtype=torch.float32)
+        if warmup:
+            start_time = time.perf_counter()
+            time_generation(model, tokenizer, prompts[0], max_new_tokens)
+            info['warmup_seconds'] = time.perf_counter() - start_time
+        loads.append(info)
+
+        for prompt_index, prompt in enumerate(prompts):
+            seconds, tokens = time_generation(model, tokenizer, prompt, max_new_tokens)
+            runs.append({'backend': backend, 'prompt': prompt_index, 'seconds': seconds, 'tokens': tokens})
+        del model
+
+    results = {'model': llm_model, 'max_new_tokens': max_new_tokens, 'loads': loads,\
+               'runs': runs, 'summary': summarize_benchmark(runs)}
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return results
+
+def execute_script():
+    """
+    The execute_script function benchmarks the backends on a few prompts:
+        python3 -m genai.backends [MODEL] [BACKEND,BACKEND,...] [MAX_NEW_TOKENS]
+    """
+    llm_model = sys.argv[1] if len(sys.argv) > 1 else "deepseek-ai/deepseek-coder-1.3b-instruct"
+    backends = sys.argv[2].split(',') if len(sys.argv) > 2 else llm_backends
+    max_new_tokens = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    prompts = ["Find approximation of Pi using Monte Carlo",
+               "Write a Python function that counts the words in a text file",
+               "Write a bash script that runs a Python script with two arguments"]
+
+    results = benchmark_backends(llm_model, prompts, backends, max_new_tokens)
+    for backend, summary in results['summary'].items():
+        speedup = f", {summary['speedup']:.2f}x eager" if summary['speedup'] else ''
+        print(f"{backend}: {summary['tokens_per_second']:.2f} tokens/s{speedup}")
+    print(f"\nThe results have been stored in: {benchmark_file}")
+
+
+if __name__ == '__main__':
+    execute_script()
@@ -0,0 +1,427 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import subprocess
+from collections import Counter
+from contextlib import redirect_stdout
+from fpdf import FPDF
+from pypdf import PdfReader
+
+try:
+    from genai.pdf_io import open_pdf, track_memory
+    from genai.count_it import count_word, count_word_in_range, count_word_parallel, preprocess_text, extract_page_text,\
+        extraction_engines, default_extraction_engine
+    from genai.split_pdf import split_pdf
+except ImportError:
+    # run as a script from the genai directory
+    from pdf_io import open_pdf, track_memory
+    from count_it import count_word, count_word_in_range, count_word_parallel, preprocess_text, extract_page_text,\
+        extraction_engines, default_extraction_engine
+    from split_pdf import split_pdf
+
+benchmark_output_file = 'pdf_benchmark.json'
+engine_benchmark_file = 'extraction_benchmark.json'
+default_page_counts = [1, 4, 16, 64]
+# every page of the job path is a subjob, so it is only run on small PDFs
+job_max_pages = 64
+filler_words = ['proton', 'beam', 'detector', 'collision', 'energy', 'magnet', 'tunnel',\
+                'particle', 'luminosity', 'trigger', 'muon', 'calorimeter', 'data', 'run']
+
+def generate_pdf(file, pages, words_per_page=300, term='it', term_frequency=0.02, seed=0):
+    """
+    The generate_pdf function writes a synthetic PDF file with a known
+    number of pages, words per page and occurrences of a term, so that
+    the PDF pipeline can be measured and checked at any size.
+
+    :param file: path of the PDF file to write
+    :param pages: the number of pages
+    :param words_per_page: the number of words on every page
+    :param term: the word to plant in the text
+    :param term_frequency: the share of the words of a page that are the term
+    :param seed: seed of the random text, so that runs are repeatable
+    :return: The number of times the term appears in the file
+    """
+    generator = random.Random(seed)
+    terms_per_page = round(words_per_page * term_frequency)
+    fillers = [word for word in filler_words if word != term]
+
+    pdf_writer = FPDF()
+    # a page of text must stay a single page
+    pdf_writer.set_auto_page_break(False)
+    pdf_writer.set_font('Times', size=8)
+    for _ in range(pages):
+        words = [generator.choice(fillers) for _ in range(words_per_page)]
+        for position in generator.sample(range(words_per_page), terms_per_page):
+            words[position] = term
+        pdf_writer.add_page()
+        pdf_writer.multi_cell(0, 4, ' '.join(words))
+    pdf_writer.output(file)
+
+    return pages * terms_per_page
+
+def measure(function, *args):
+    """
+    The measure function times a call and keeps its output quiet. The
+    stages run one after another in this process, so the peak of the
+    process only tells about the largest stage so far; a stage records
+    how far it raised the peak over the peak before it instead. That is
+    a lower bound, as a stage can reuse memory freed by an earlier one.
+
+    :param function: the function to call
+    :param args: its arguments
+    :return: A tuple of the return value and a dictionary with the wall
+             time and the increase of the peak memory during the call
+    """
+    start_time = time.perf_counter()
+    with track_memory() as memory, redirect_stdout(io.StringIO()):
+        result = function(*args)
+    seconds = time.perf_counter() - start_time
+
+    return result, {'seconds': seconds, 'peak_increase_mb': memory['peak_increase_mb']}
+
+def count_word_per_page(file, pages, word):
+    """
+    The count_word_per_page function counts a word the way a subjob per
+    page does: the PDF file is opened again for every page.
+    """
+    return sum(count_word(file, page_num, word) for page_num in range(pages))
+
+def count_word_single_open(file, pages, word):
+    """
+    The count_word_single_open function counts a word on every page with
+    a single PDF open, as a process-pool worker or a persistent worker does.
+    """
+    page_counts, _ = count_word_in_range(file, 0, pages, word)
+
+    return sum(page_counts)
+
+def count_word_pool(file, pages, word, workers, worker_stats):
+    """
+    The count_word_pool function counts a word on every page with the
+    local process pool, filling in the page range and memory of every worker.
+    """
+    return sum(count_word_parallel(file, word, workers, worker_stats))
+
+def run_job_path(file, pages, word, script_dir, persistent_workers=False):
+    """
+    The run_job_path function runs the word count job of initial_task.py
+    on a PDF file with the local executor, one subjob per page or one
+    persistent worker per core. The job runs in a folder of its own, and
+    its subjobs use the same Python interpreter as this process.
+
+    :param file: the PDF file
+    :param pages: the number of pages of the file
+    :param word: the word to count
+    :param script_dir: the folder of the scripts, e.g. genai
+    :param persistent_workers: use persistent workers instead of a subjob per page
+    :return: A tuple of the word count, or None if the job failed, and
+             a dictionary with the wall time
+    """
+    work_dir = tempfile.mkdtemp(prefix='pdf_benchmark_')
+    try:
+        for name in os.listdir(script_dir):
+            if name.endswith('.py'):
+                os.symlink(os.path.join(script_dir, name), os.path.join(work_dir, name))
+        shutil.copy(file, os.path.join(work_dir, 'LHC.pdf'))
+
+        # the subjobs call python3, so point it at this interpreter
+        bin_dir = os.path.join(work_dir, 'bin')
+        os.makedirs(bin_dir)
+        os.symlink(sys.executable, os.path.join(bin_dir, 'python3'))
+
+        env = dict(os.environ, GENAI_EXECUTOR='local', GENAI_LOCAL_WORKSPACE=os.path.join(work_dir, 'jobs'),\
+                   PATH=bin_dir + os.pathsep + os.environ.get('PATH', ''))
+        command = [sys.executable, 'initial_task.py', 'count_it.py', '--force']
+        if persistent_workers:
+            command.append('--persistent-workers')
+
+        start_time = time.perf_counter()
+        process = subprocess.run(command, cwd=work_dir, env=env, capture_output=True, text=True)
+        seconds = time.perf_counter() - start_time
+
+        word_count = None
+        count_file = os.path.join(work_dir, 'count_it.txt')
+        if process.returncode == 0 and os.path.exists(count_file):
+            with open(count_file, 'r') as f:
+                word_count = int(f.read().split()[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return word_count, {'seconds': seconds}
+
+def fit_scaling(points):
+    """
+    The fit_scaling function fits seconds = fixed + per_page * pages to
+    the measurements of a stage by least squares. The fixed part is the
+    start-up cost; the per-page part is what grows with the document.
+
+    :param points: list of (pages, seconds) tuples
+    :return: A dictionary with the fixed and per-page seconds
+    """
+    if not points:
+        return {'fixed_seconds': None, 'per_page_seconds': None}
+
+    n = len(points)
+    mean_pages = sum(pages for pages, _ in points) / n
+    mean_seconds = sum(seconds for _, seconds in points) / n
+    variance = sum((pages - mean_pages) ** 2 for pages, _ in points)
+    if not variance:
+        return {'fixed_seconds': None, 'per_page_seconds': mean_seconds / mean_pages}
+
+    per_page = sum((pages - mean_pages) * (seconds - mean_seconds) for pages, seconds in points) / variance
+
+    return {'fixed_seconds': mean_seconds - per_page * mean_pages, 'per_page_seconds': per_page}
+
+def run_benchmark(page_counts=None, words_per_page=300, term='it', term_frequency=0.02, jobs=False,\
+                  output_file=benchmark_output_file, work_dir=None, workers=None):
+    """
+    The run_benchmark function generates a synthetic PDF file of every
+    size and measures the stages of the PDF pipeline on it:
+        count_word_per_page: count_word on every page, a PDF open per page
+        count_word_in_range: every page counted with a single PDF open
+        count_word_parallel: the local process pool, with the page range
+            and the memory of every worker in its worker_stats
+        split_pdf: split_pdf into single-page files
+        job_per_page, job_persistent_workers: the word count job of
+            initial_task.py on the local executor (with jobs=True)
+    Every count is checked against the number of planted terms. The
+    scaling curves, a linear fit of every stage and the job overhead per
+    page are written as JSON.
+
+    :param page_counts: list of page counts
+    :param words_per_page: the number of words on every page
+    :param term: the word to count
+    :param term_frequency: the share of the words of a page that are the term
+    :param jobs: also measure the job path
+    :param output_file: the JSON file to write, or None
+    :param work_dir: where to generate the PDF files; a temporary folder by default
+    :param workers: the number of pool workers; one per CPU core by default
+    :return: The benchmark results
+    """
+    page_counts = page_counts if page_counts else default_page_counts
+    workers = workers if workers else os.cpu_count() or 1
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    temp_dir = tempfile.mkdtemp(prefix='pdf_benchmark_') if work_dir is None else None
+    work_dir = work_dir if work_dir else temp_dir
+
+    results = []
+    try:
+        for pages in page_counts:
+            file = os.path.join(work_dir, f"synthetic_{pages}.pdf")
+            expected = generate_pdf(file, pages, words_per_page, term, term_frequency)
+            result = {'pages': pages, 'file_bytes': os.path.getsize(file), 'expected_count': expected}
+
+            stages = [('count_word_per_page', count_word_per_page, (file, pages, term)),
+                      ('count_word_in_range', count_word_single_open, (file, pages, term))]
+            for stage, function, args in stages:
+                count, measurement = measure(function, *args)
+                result[stage] = dict(measurement, count=count, correct=count == expected)
+
+            worker_stats = []
+            count, measurement = measure(count_word_pool, file, pages, term, workers, worker_stats)
+            result['count_word_parallel'] = dict(measurement, count=count, correct=count == expected,\
+                                                 workers=len(worker_stats), worker_stats=worker_stats)
+
+            split_dir = os.path.join(work_dir, f"split_{pages}")
+            _, result['split_pdf'] = measure(split_pdf, file, split_dir)
+            shutil.rmtree(split_dir, ignore_errors=True)
+
+            if jobs and pages <= job_max_pages:
+                for stage, persistent_workers in [('job_per_page', False), ('job_persistent_workers', True)]:
+                    count, measurement = run_job_path(file, pages, term, script_dir, persistent_workers)
+                    result[stage] = dict(measurement, count=count, correct=count == expected)
+
+            results.append(result)
+            os.remove(file)
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    stage_names = [stage for stage in results[0] if isinstance(results[0][stage], dict)] if results else []
+    scaling = {stage: fit_scaling([(result['pages'], result[stage]['seconds'])
+                                   for result in results if stage in result]) for stage in stage_names}
+
+    benchmark = {
+        'words_per_page': words_per_page,
+        'term': term,
+        'term_frequency': term_frequency,
+        'cpu_count': os.cpu_count(),
+        'results': results,
+        'scaling': scaling,
+    }
+    # what a page costs in the job path on top of counting it
+    for stage in ('job_per_page', 'job_persistent_workers'):
+        if stage in scaling and scaling[stage]['per_page_seconds'] is not None:
+            benchmark[f"{stage}_overhead_per_page_seconds"] = scaling[stage]['per_page_seconds'] -\
+                scaling['count_word_in_range']['per_page_seconds']
+
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump(benchmark, f, indent=2)
+
+    return benchmark
+
+def extract_tokens(file, engine):
+    """
+    The extract_tokens function extracts and normalizes the words of every
+    page of a PDF file with an extraction engine, the way count_it does.
+
+    :param file: the PDF file
+    :param engine: the name of the engine
+    :return: A list with a Counter of the words of every page
+    """
+    with open_pdf(file) as pdf:
+        reader = PdfReader(pdf)
+        return [Counter(preprocess_text(extract_page_text(page, engine)).split()) for page in reader.pages]
+
+def choose_engine(engines):
+    """
+    The choose_engine function picks the fastest engine that gives the
+    same counts as pypdf on every page.
+
+    :param engines: dictionary of engine results from compare_engines
+    :return: The name of the engine
+    """
+    identical = [engine for engine, result in engines.items() if result['identical_counts']]
+
+    return min(identical, key=lambda engine: engines[engine]['seconds'], default=default_extraction_engine)
+
+def compare_engines(file, word, engines=None, output_file=engine_benchmark_file):
+    """
+    The compare_engines function measures the speed of every extraction
+    engine on a PDF file and its accuracy against pypdf, the engine that
+    counts were always made with:
+        identical_pages: pages where the word count is the same
+        token_agreement: the share of pypdf's words, counted with their
+                         multiplicity, that the engine also found
+    Every engine reads the file with its own PdfReader, so no engine
+    benefits from pages parsed by another.
+
+    :param file: the PDF file
+    :param word: the word to count
+    :param engines: the names of the engines; all of them by default
+    :param output_file: the JSON file to write, or None
+    :return: The comparison, with the cheapest engine that gives identical counts
+    """
+    engines = engines if engines else list(extraction_engines)
+    reference_tokens, _ = measure(extract_tokens, file, default_extraction_engine)
+
+    results = {}
+    for engine in engines:
+        tokens, measurement = measure(extract_tokens, file, engine)
+        page_counts = [page_tokens[word] for page_tokens in tokens]
+        reference_counts = [page_tokens[word] for page_tokens in reference_tokens]
+        agreed = sum(sum((page_tokens & reference).values()) for page_tokens, reference in zip(tokens, reference_tokens))
+        total = sum(sum(reference.values()) for reference in reference_tokens)
+
+        results[engine] = dict(measurement,\
+            pages_per_second=len(tokens) / measurement['seconds'] if measurement['seconds'] else 0.0,\
+            word_count=sum(page_counts),\
+            identical_pages=sum(count == reference for count, reference in zip(page_counts, reference_counts)),\
+            identical_counts=page_counts == reference_counts,\
+            token_agreement=agreed / total if total else 1.0)
+
+    reference_seconds = results.get(default_extraction_engine, {}).get('seconds')
+    for result in results.values():
+        result['speedup'] = reference_seconds / result['seconds'] if reference_seconds and result['seconds'] else None
+
+    comparison = {
+        'file': file,
+        'word': word,
+        'pages': len(reference_tokens),
+        'reference': default_extraction_engine,
+        'engines': results,
+        'best_engine': choose_engine(results),
+    }
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump(comparison, f, indent=2)
+
+    return comparison
+
+def get_options():
+    """
+    The get_options function reads the options of the benchmark:
+        python3 benchmark_pdf.py [--pages 1,4,16,64] [--words 300] [--term it]
+                                 [--frequency 0.02] [--workers N] [--jobs] [--output pdf_benchmark.json]
+    or, to compare the extraction engines on a PDF file, or on a synthetic
+    one with the largest page count:
+        python3 benchmark_pdf.py --engines [--pdf LHC.pdf] [--term it] ...
+
+    :return: A dictionary of keyword arguments for run_benchmark
+    """
+    options = {'jobs': '--jobs' in sys.argv, 'engines': '--engines' in sys.argv}
+    flags = {'--pdf': ('pdf', str),
+             '--pages': ('page_counts', lambda value: [int(pages) for pages in value.split(',')]),
+             '--words': ('words_per_page', int),
+             '--term': ('term', str),
+             '--frequency': ('term_frequency', float),
+             '--workers': ('workers', int),
+             '--output': ('output_file', str)}
+
+    for flag, (name, parse) in flags.items():
+        if flag in sys.argv:
+            try:
+                options[name] = parse(sys.argv[sys.argv.index(flag) + 1])
+            except (IndexError, ValueError):
+                print(f"{flag} needs a valid value")
+                sys.exit(1)
+
+    return options
+
+def execute_engine_comparison(options):
+    """
+    The execute_engine_comparison function compares the extraction engines
+    and prints their speed and accuracy.
+
+    :param options: the options from get_options
+    """
+    term = options.get('term', 'it')
+    output_file = options.get('output_file', engine_benchmark_file)
+    work_dir = tempfile.mkdtemp(prefix='pdf_benchmark_')
+    try:
+        file = options.get('pdf')
+        if not file:
+            file = os.path.join(work_dir, 'synthetic.pdf')
+            generate_pdf(file, max(options.get('page_counts', default_page_counts)),\
+                options.get('words_per_page', 300), term, options.get('term_frequency', 0.02))
+        comparison = compare_engines(file, term, output_file=output_file)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for engine, result in comparison['engines'].items():
+        speedup = f", {result['speedup']:.2f}x {comparison['reference']}" if result['speedup'] else ''
+        print(f"{engine}: {result['pages_per_second']:.1f} pages/s{speedup}, '{term}' counted {result['word_count']} \
+times, {result['identical_pages']}/{comparison['pages']} pages identical, {result['token_agreement']:.2%} words agree")
+    print(f"\nCheapest engine with identical counts: {comparison['best_engine']}")
+    print(f"Use it with: GENAI_EXTRACTION_ENGINE={comparison['best_engine']}")
+    print(f"\nThe results have been stored in: {output_file}")
+
+def execute_script():
+    options = get_options()
+    if options.pop('engines'):
+        execute_engine_comparison(options)
+        return
+    options.pop('pdf', None)
+
+    benchmark = run_benchmark(**options)
+
+    for result in benchmark['results']:
+        stages = ', '.join(f"{stage} {result[stage]['seconds']:.3f} s"
+                           for stage in benchmark['scaling'] if stage in result)
+        print(f"{result['pages']} pages: {stages}")
+    for stage, fit in benchmark['scaling'].items():
+        if fit['per_page_seconds'] is not None:
+            fixed = f"{fit['fixed_seconds']:.3f} s fixed + " if fit['fixed_seconds'] is not None else ''
+            print(f"{stage}: {fixed}{fit['per_page_seconds'] * 1000:.2f} ms per page")
+
+    print(f"\nThe results have been stored in: {options.get('output_file', benchmark_output_file)}")
+
+
+if __name__ == '__main__':
+    execute_script()
@@ -0,0 +1,134 @@
+import re
+
+# literal strings, hex strings, array brackets, dictionaries, numbers,
+# names, operators and comments of a content stream; a literal string
+# with unescaped nested parentheses is cut short, which only costs the
+# rest of that string
+content_token = re.compile(rb"""
+    \((?:\\.|[^\\)])*\)          # literal string
+  | <<|>>                        # dictionary
+  | <[0-9A-Fa-f\s]*>             # hex string
+  | \[|\]                        # array
+  | [+-]?(?:\d+\.?\d*|\.\d+)     # number
+  | /[^\s/\[\]()<>{}%]*          # name
+  | %[^\r\n]*                    # comment
+  | [^\s/\[\]()<>{}%]+           # operator
+""", re.VERBOSE | re.DOTALL)
+
+escapes = {ord('n'): b'\n', ord('r'): b'\r', ord('t'): b'\t', ord('b'): b'\b', ord('f'): b'\f',\
+           ord('('): b'(', ord(')'): b')', ord('\\'): b'\\'}
+# operators that move to another position or line, i.e. end a word
+break_operators = {b'Td', b'TD', b'T*', b'Tm', b'BT', b'ET'}
+# a TJ offset this far to the left (thousandths of a text space unit) is a space
+space_offset = 200
+
+def decode_literal(token):
+    """
+    The decode_literal function decodes a literal string of a content
+    stream, e.g. (it\\051s), resolving its escape sequences.
+
+    :param token: the string token with its parentheses
+    :return: The bytes of the string
+    """
+    data, result, i = token[1:-1], bytearray(), 0
+    while i < len(data):
+        byte = data[i]
+        if byte != ord('\\') or i + 1 == len(data):
+            result.append(byte)
+            i += 1
+            continue
+
+        following = data[i + 1]
+        if following in escapes:
+            result += escapes[following]
+            i += 2
+        elif following in b'01234567':
+            octal = re.match(rb'[0-7]{1,3}', data[i + 1:i + 4]).group()
+            result.append(int(octal, 8) & 0xFF)
+            i += 1 + len(octal)
+        elif following in b'\r\n':
+            # a backslash at the end of a line continues the string
+            i += 3 if data[i + 1:i + 3] == b'\r\n' else 2
+        else:
+            result.append(following)
+            i += 2
+
+    return bytes(result)
+
+def decode_string(token):
+    """
+    The decode_string function decodes a string operand as text. Single
+    byte encodings are read as Latin-1, which matches the standard and
+    WinAnsi encodings for letters and digits; fonts with two-byte codes
+    would need their ToUnicode maps, which this scanner doesn't read.
+
+    :param token: a literal or hex string token
+    :return: The text of the string
+    """
+    if token.startswith(b'('):
+        data = decode_literal(token)
+    else:
+        digits = re.sub(rb'\s', b'', token[1:-1])
+        data = bytes.fromhex((digits + b'0' * (len(digits) % 2)).decode())
+
+    return data.decode('latin-1')
+
+def scan_text(data):
+    """
+    The scan_text function extracts the text of a decoded content stream
+    by reading only its text-showing operators (Tj, TJ, ' and "), without
+    any layout analysis. Positioning operators and large TJ offsets end a
+    word, which is all a word counter needs.
+
+    :param data: the decoded content stream
+    :return: The text of the stream
+    """
+    pieces, operands = [], []
+    position, length = 0, len(data)
+
+    while position < length:
+        match = content_token.search(data, position)
+        if not match:
+            break
+        token, position = match.group(), match.end()
+
+        if token.startswith((b'(', b'<')) and token != b'<<' or token in (b'[', b']') or\
+           token[:1] in b'+-.0123456789':
+            operands.append(token)
+            continue
+        if token.startswith((b'/', b'%')) or token in (b'<<', b'>>'):
+            continue
+
+        if token == b'Tj' and operands:
+            pieces.append(decode_string(operands[-1]))
+        elif token in (b"'", b'"') and operands:
+            pieces.append('\n' + decode_string(operands[-1]))
+        elif token == b'TJ':
+            for operand in operands:
+                if operand.startswith((b'(', b'<')):
+                    pieces.append(decode_string(operand))
+                elif operand[:1] in b'+-.0123456789' and -float(operand) >= space_offset:
+                    pieces.append(' ')
+        elif token in break_operators:
+            pieces.append(' ')
+        elif token == b'ID':
+            # skip the binary data of an inline image
+            end = data.find(b'EI', position)
+            position = length if end < 0 else end + 2
+        operands = []
+
+    return ''.join(pieces)
+
+def extract_content_stream_text(page):
+    """
+    The extract_content_stream_text function extracts the text of a pypdf
+    page straight from its content stream. Form XObjects are not followed.
+
+    :param page: a pypdf page object
+    :return: The text of the page
+    """
+    contents = page.get_contents()
+    if contents is None:
+        return ''
+
+    return scan_text(contents.get_data())
@@ -0,0 +1,172 @@
+import re
+import textwrap
+
+# what to do with a prompt that leaves less than the generation budget
+context_policies = ('error', 'truncate', 'compress')
+
+# instruction boilerplate that can be dropped without changing the task;
+# every pattern is matched at the start of a sentence only
+boilerplate_patterns = [
+    r"Here are (?:some|the) instructions (?:that )?you (?:can|should) follow\.?$",
+    r"Please note that\s+",
+    r"Please\s+",
+]
+
+class ContextWindowManager:
+    """
+    The ContextWindowManager class splits the context window of a model
+    between the prompt and the generated text. The prompt tokens are
+    counted before generation, so that a guaranteed number of tokens is
+    always left for the output. A prompt that doesn't fit is handled by
+    a policy:
+        error: refuse to run
+        truncate: drop tokens from the middle of the prompt, which keeps
+                  the task at the start and the final instructions at the end
+        compress: collapse whitespace and drop repeated sentences and
+                  instruction boilerplate first, then truncate if needed
+    A protected prefix and suffix, e.g. the task after retrieved reference
+    material, are kept as they are; only the text between them is shortened.
+    The tokenizer only needs encode and decode, as Hugging Face tokenizers have.
+    """
+    def __init__(self, tokenizer, context_length=1024, generation_tokens=512,\
+                       policy='compress', boilerplate=None):
+        if policy not in context_policies:
+            raise ValueError(f"Unknown context policy '{policy}', expected one of {context_policies}")
+        if generation_tokens >= context_length:
+            raise ValueError(f"A generation budget of {generation_tokens} tokens leaves no room for a prompt \
+in a context of {context_length} tokens")
+
+        self.tokenizer = tokenizer
+        self.context_length = context_length
+        self.generation_tokens = generation_tokens
+        self.policy = policy
+        self.boilerplate = boilerplate_patterns if boilerplate is None else boilerplate
+
+    @property
+    def prompt_budget(self):
+        return self.context_length - self.generation_tokens
+
+    def count_tokens(self, text):
+        """
+        The count_tokens method counts the tokens of a prompt the way the
+        model sees it, special tokens included.
+
+        :param text: the prompt
+        :return: The number of tokens
+        """
+        return len(self.tokenizer.encode(text))
+
+    def compress(self, text):
+        """
+        The compress method shortens a prompt without touching its content:
+        it collapses runs of spaces, e.g. of a prompt written as a
+        multi-line string, and the indentation that all lines share, and
+        drops repeated sentences and boilerplate at the start of sentences.
+        Line breaks and the indentation of code relative to its first
+        line are kept, as are lines that are not sentences, e.g. code.
+
+        :param text: the prompt
+        :return: The compressed prompt
+        """
+        lines, seen = [], set()
+        for line in textwrap.dedent(text).splitlines():
+            indentation = line[:len(line) - len(line.lstrip())]
+            sentences = []
+            for sentence in re.split(r'(?<=[.!?])\s+', re.sub(r'\s+', ' ', line).strip()):
+                stripped = sentence
+                for pattern in self.boilerplate:
+                    stripped = re.sub('^(?:' + pattern + ')', '', stripped)
+                if not stripped:
+                    continue
+                if stripped != sentence:
+                    sentence = stripped[0].upper() + stripped[1:]
+
+                # only sentences are deduplicated, repeated code lines are kept
+                key = sentence.lower()
+                if sentence[-1] in '.!?':
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                sentences.append(sentence)
+
+            if sentences or line.strip() == '':
+                lines.append(indentation + ' '.join(sentences))
+
+        # a single empty line between paragraphs is enough
+        return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip('\n')
+
+    def truncate(self, text, budget, protected_prefix='', protected_suffix=''):
+        """
+        The truncate method drops tokens from the middle of a text until,
+        together with the protected prefix and suffix, it fits the budget.
+
+        :param text: the text to shorten
+        :param budget: the maximum number of prompt tokens
+        :param protected_prefix: text kept as it is before the shortened text
+        :param protected_suffix: text kept as it is after the shortened text
+        :return: The truncated text, without the protected parts
+        """
+        ids = self.tokenizer.encode(text, add_special_tokens=False)
+
+        # decoding and encoding again can merge tokens differently, so
+        # keep cutting until the prompt fits
+        keep = min(len(ids), budget - self.count_tokens(protected_prefix + protected_suffix))
+        while keep > 0:
+            head = (keep + 1) // 2
+            tail = keep - head
+            kept_ids = ids[:head] + (ids[len(ids) - tail:] if tail else [])
+            truncated = self.tokenizer.decode(kept_ids, skip_special_tokens=True)
+            overflow = self.count_tokens(protected_prefix + truncated + protected_suffix) - budget
+            if overflow <= 0:
+                return truncated
+            keep -= overflow
+
+        return ''
+
+    def fit(self, text, protected_prefix='', protected_suffix=''):
+        """
+        The fit method makes a prompt fit in the context window along with
+        the generation budget, according to the policy. The prompt is the
+        protected prefix, the text and the protected suffix; only the text
+        is ever compressed or truncated.
+
+        :param text: the prompt, or the part of it that may be shortened
+        :param protected_prefix: text kept as it is before the text
+        :param protected_suffix: text kept as it is after the text
+        :return: A dictionary with the prompt to use, its token count, the
+                 token count of the original prompt, the number of tokens
+                 left for generation and the actions taken
+        """
+        original_tokens = self.count_tokens(protected_prefix + text + protected_suffix)
+        prompt_tokens = original_tokens
+        actions = []
+
+        if prompt_tokens > self.prompt_budget:
+            if self.policy == 'error':
+                raise ValueError(f"The prompt has {prompt_tokens} tokens, but only {self.prompt_budget} \
+of the {self.context_length} tokens of the context are left after reserving {self.generation_tokens} \
+for generation")
+
+            protected_tokens = self.count_tokens(protected_prefix + protected_suffix)
+            if protected_tokens > self.prompt_budget:
+                raise ValueError(f"The protected parts of the prompt alone have {protected_tokens} tokens, \
+more than the {self.prompt_budget} tokens left for the prompt")
+
+            if self.policy == 'compress':
+                text = self.compress(text)
+                prompt_tokens = self.count_tokens(protected_prefix + text + protected_suffix)
+                actions.append('compress')
+
+            if prompt_tokens > self.prompt_budget:
+                text = self.truncate(text, self.prompt_budget, protected_prefix, protected_suffix)
+                prompt_tokens = self.count_tokens(protected_prefix + text + protected_suffix)
+                actions.append('truncate')
+
+        return {
+            'prompt': protected_prefix + text + protected_suffix,
+            'prompt_tokens': prompt_tokens,
+            'original_prompt_tokens': original_tokens,
+            'generation_tokens': self.context_length - prompt_tokens,
+            'context_length': self.context_length,
+            'actions': actions,
+        }
@@ -0,0 +1,168 @@
+import os
+import json
+import heapq
+from pypdf.errors import PyPdfError
+
+try:
+    from genai.pdf_manifest import load_manifest
+except ImportError:
+    # run as a script from the genai directory
+    from pdf_manifest import load_manifest
+
+# fixed cost of a page on top of its content streams, e.g. parsing the page
+# dictionary and its fonts, so that pages with tiny streams aren't free
+page_overhead_bytes = 2048
+
+# work units per subjob; more units give the packing more freedom
+units_per_subjob = 4
+
+# what pypdf raises on a file that is not a readable PDF, e.g. a truncated
+# download, a broken cross-reference table or an empty file
+unreadable_pdf_errors = (PyPdfError, OSError, ValueError, KeyError, TypeError)
+
+def find_corpus_pdfs(corpus_dir):
+    """
+    The find_corpus_pdfs function lists the PDF files of a corpus.
+
+    :param corpus_dir: the directory that holds the PDF files
+    :return: A sorted list of PDF file names relative to corpus_dir
+    """
+    return sorted(name for name in os.listdir(corpus_dir)
+                  if name.lower().endswith('.pdf') and os.path.isfile(os.path.join(corpus_dir, name)))
+
+def estimate_page_cost(page):
+    """
+    The estimate_page_cost function estimates the text extraction cost of
+    a page from the size of its content streams. Text-heavy pages have
+    long streams of text operators, while a page holding a single figure
+    has a short stream that draws an image.
+
+    :param page: a page entry of a manifest
+    :return: The estimated cost in bytes
+    """
+    return page['content_size'] + page_overhead_bytes
+
+def make_work_units(file_index, manifest, unit_cost):
+    """
+    The make_work_units function cuts the pages of a PDF file into
+    contiguous page ranges of about the same estimated cost. A heavy
+    document is cut into many units so that it can be spread over
+    several subjobs; a page costing more than unit_cost gets its own unit.
+
+    :param file_index: the index of the file in the plan's file list
+    :param manifest: the manifest of the PDF file
+    :param unit_cost: the target cost of a unit
+    :return: A list of [file index, start, stop, cost] units, stop being exclusive
+    """
+    units = []
+    start, cost = 0, 0
+    for page in manifest['pages']:
+        page_cost = estimate_page_cost(page)
+        if cost and cost + page_cost > unit_cost:
+            units.append([file_index, start, page['page'], cost])
+            start, cost = page['page'], 0
+        cost += page_cost
+
+    if cost:
+        units.append([file_index, start, manifest['page_count'], cost])
+
+    return units
+
+def pack_work_units(units, subjobs):
+    """
+    The pack_work_units function distributes work units over subjobs so
+    that their estimated costs are balanced. It uses the longest
+    processing time rule: units are taken from the most to the least
+    expensive and each goes to the subjob with the lowest cost so far.
+
+    :param units: list of [file index, start, stop, cost] units
+    :param subjobs: the maximum number of subjobs
+    :return: A list of subjobs, each a dict with its cost and its units
+             sorted by file and page
+    """
+    bins = [{'cost': 0, 'units': []} for _ in range(min(subjobs, len(units)))]
+    heap = [(0, index) for index in range(len(bins))]
+
+    for unit in sorted(units, key=lambda unit: unit[3], reverse=True):
+        cost, index = heapq.heappop(heap)
+        bins[index]['cost'] = cost + unit[3]
+        bins[index]['units'].append(unit)
+        heapq.heappush(heap, (bins[index]['cost'], index))
+
+    # read every file front to back within a subjob
+    for work in bins:
+        work['units'].sort()
+
+    return bins
+
+def plan_corpus(corpus_dir, word, subjobs):
+    """
+    The plan_corpus function plans a word count over every PDF file in a
+    directory. The manifest of each file provides the per-page costs,
+    which are cut into work units and packed into balanced subjobs.
+    A file that can't be read is skipped with a message, so that one
+    corrupt file doesn't stop the count of the others.
+
+    :param corpus_dir: the directory that holds the PDF files
+    :param word: the word to count
+    :param subjobs: the maximum number of subjobs
+    :return: The plan as a dictionary, with the skipped files in skipped_files
+    """
+    corpus_dir = os.path.abspath(corpus_dir)
+    files, manifests, skipped_files = [], [], []
+    for name in find_corpus_pdfs(corpus_dir):
+        try:
+            manifests.append(load_manifest(os.path.join(corpus_dir, name)))
+        except unreadable_pdf_errors as error:
+            print(f"Skipping '{name}', which can't be read as a PDF file: {error}")
+            skipped_files.append(name)
+            continue
+        files.append(name)
+
+    total_cost = sum(estimate_page_cost(page) for manifest in manifests for page in manifest['pages'])
+    unit_cost = total_cost / max(1, subjobs * units_per_subjob)
+
+    units = []
+    for file_index, manifest in enumerate(manifests):
+        units.extend(make_work_units(file_index, manifest, unit_cost))
+
+    return {
+        'corpus_dir': corpus_dir,
+        'word': word,
+        'files': files,
+        'skipped_files': skipped_files,
+        'page_count': sum(manifest['page_count'] for manifest in manifests),
+        'subjobs': pack_work_units(units, subjobs),
+    }
+
+def get_page_key(file, page_num):
+    """
+    The get_page_key function names a page of the corpus, as printed in
+    the page markers of the word count subjobs.
+
+    :param file: the PDF file name relative to the corpus directory
+    :param page_num: the page number, starting at 0
+    :return: The page key
+    """
+    return f"{file}:{page_num}"
+
+def save_plan(plan, plan_file):
+    """
+    The save_plan function stores a plan for the subjobs to read.
+
+    :param plan: the plan dictionary
+    :param plan_file: path of the file to write
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(plan_file)), exist_ok=True)
+    with open(plan_file, 'w') as f:
+        json.dump(plan, f)
+
+def load_plan(plan_file):
+    """
+    The load_plan function reads a plan stored by save_plan.
+
+    :param plan_file: path of the plan file
+    :return: The plan dictionary
+    """
+    with open(plan_file, 'r') as f:
+        return json.load(f)
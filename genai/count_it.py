@@ -6,6 +6,43 @@ import shutil
 from pypdf import PdfReader
 from collections import Counter
 
+try:
+    from genai.pdf_io import open_pdf, share_pdf, fork_pool, split_page_ranges, track_memory
+    from genai.pdf_manifest import load_manifest, load_page
+    from genai.work_queue import load_queue_info, iter_tasks
+    from genai.aggregator import page_marker
+    from genai.corpus import load_plan, get_page_key
+    from genai.multi_count import TermMatcher
+    from genai.profiling import run_profiled
+    from genai.content_stream import extract_content_stream_text
+except ImportError:
+    # run as a script from the genai directory
+    from pdf_io import open_pdf, share_pdf, fork_pool, split_page_ranges, track_memory
+    from pdf_manifest import load_manifest, load_page
+    from work_queue import load_queue_info, iter_tasks
+    from aggregator import page_marker
+    from corpus import load_plan, get_page_key
+    from multi_count import TermMatcher
+    from profiling import run_profiled
+    from content_stream import extract_content_stream_text
+
+# bump when the text normalization or the counting changes, so that the
+# results remembered by initial_task.py are not used any more
+normalization_version = 1
+
+# the engines that extract the text of a page, all returning plain text
+extraction_engines = {
+    # pypdf's default extraction, which counts were always made with
+    'pypdf': lambda page: page.extract_text(),
+    # upright text only, skipping the passes for rotated text
+    'pypdf_upright': lambda page: page.extract_text(orientations=(0,)),
+    # the text-showing operators of the content stream, without layout work
+    'content_stream': extract_content_stream_text,
+}
+default_extraction_engine = 'pypdf'
+# set to the name of an engine to count with it, e.g. inside subjobs
+extraction_engine_env_var = 'GENAI_EXTRACTION_ENGINE'
+
 def get_arguments():
     """
     The get_arguments function takes the arguments passed to it
@@ -27,6 +64,27 @@ parameters are: current directory, page number, word, pdf file name")
 
     return tuple(sys.argv[1:5])
 
+def get_worker_arguments():
+    """
+    The get_worker_arguments function reads the arguments of the local
+    process-pool mode, which is called as:
+        count_it.py --workers N current_dir word pdf_file
+    
+    :return: A tuple of the number of workers, current directory, word and pdf file name
+    """
+    if len(sys.argv) != 6 or sys.argv[1] != '--workers':
+        print(f"You must specify all 4 parameters after --workers N.\
+parameters are: number of workers, current directory, word, pdf file name")
+        sys.exit(1)
+
+    try:
+        workers = int(sys.argv[2])
+    except ValueError:
+        print(f"The number of workers must be an integer, got '{sys.argv[2]}'")
+        sys.exit(1)
+
+    return (workers,) + tuple(sys.argv[3:6])
+
 def preprocess_text(text):
     """
     The preprocess_text function takes a string of text as input
@@ -50,7 +108,46 @@ def preprocess_text(text):
     return clean_text
 
 
-def count_word(file, page_num, word):
+def get_extraction_engine(engine=None):
+    """
+    The get_extraction_engine function returns the name of the engine to
+    extract text with: the given one, else $GENAI_EXTRACTION_ENGINE, else
+    pypdf.
+    
+    :param engine: the name of an engine, or None
+    :return: The name of the engine
+    """
+    engine = engine if engine else os.getenv(extraction_engine_env_var, default_extraction_engine)
+    if engine not in extraction_engines:
+        raise ValueError(f"Unknown extraction engine '{engine}', expected one of {sorted(extraction_engines)}")
+
+    return engine
+
+def extract_page_text(page, engine=None):
+    """
+    The extract_page_text function extracts the text of a page with one
+    of the extraction engines.
+    
+    :param page: a pypdf page object
+    :param engine: the name of an engine; see get_extraction_engine
+    :return: The text of the page
+    """
+    return extraction_engines[get_extraction_engine(engine)](page) or ''
+
+def get_normalization_version(engine=None):
+    """
+    The get_normalization_version function returns the version of the
+    text a word count is made from. An engine other than pypdf may
+    extract different text, so it is part of the version of its counts.
+    
+    :param engine: the name of an engine; see get_extraction_engine
+    :return: The normalization version
+    """
+    engine = get_extraction_engine(engine)
+
+    return normalization_version if engine == default_extraction_engine else f"{normalization_version}+{engine}"
+
+def count_word(file, page_num, word, manifest=None):
     """
     The count_word function takes in a PDF file, page number and word
     as input. It then opens the PDF file, extracts the text from that
@@ -60,14 +157,213 @@ def count_word(file, page_num, word):
     :param file: Specify the file to be read
     :param page_num: Specify which page to look at
     :param word: Search for the word in the text and count how many times it appears
+    :param manifest: optional manifest of the file, to load the page directly
     :return: The number of times a word appears on a page
     """
-    with open(file, 'rb') as pdf:
+    with open_pdf(file) as pdf:
+        reader = PdfReader(pdf)
+
+        return count_word_in_page(load_page(reader, manifest, int(page_num)), word)
+
+def count_word_in_page(page, word, engine=None):
+    """
+    The count_word_in_page function extracts the text of an already
+    loaded page, preprocesses it and counts the word in it. It is shared
+    by the Ganga path and the process-pool path so that both produce
+    identical counts.
+    
+    :param page: a pypdf page object
+    :param word: the word to count
+    :param engine: the name of the extraction engine; see get_extraction_engine
+    :return: The number of times the word appears on the page
+    """
+    clean_text = preprocess_text(extract_page_text(page, engine))
+
+    return Counter(clean_text.split())[word]
+
+def make_term_matcher(terms):
+    """
+    The make_term_matcher function builds a matcher for a list of words
+    and phrases. The terms are normalized like the text of the pages, so
+    that e.g. 'Large-Hadron Collider' matches 'large hadron collider'.
+    
+    :param terms: list of words and multi-word phrases
+    :return: A TermMatcher
+    """
+    return TermMatcher(terms, tokenize=lambda term: preprocess_text(term).split())
+
+def count_terms_in_page(page, matcher):
+    """
+    The count_terms_in_page function extracts and preprocesses the text
+    of a page once and counts every term of the matcher in one pass.
+    
+    :param page: a pypdf page object
+    :param matcher: a TermMatcher from make_term_matcher
+    :return: A list with the count of each term on the page
+    """
+    return matcher.count(preprocess_text(extract_page_text(page)).split())
+
+def count_terms(file, terms, manifest=None):
+    """
+    The count_terms function counts many words and phrases on every page
+    of a PDF file, extracting the text of each page only once.
+    
+    :param file: the PDF file to read
+    :param terms: list of words and multi-word phrases
+    :param manifest: optional manifest of the file, to load pages directly
+    :return: A term x page matrix: one list of page counts per term
+    """
+    matcher = make_term_matcher(terms)
+
+    with open_pdf(file) as pdf:
+        reader = PdfReader(pdf)
+        number_of_pages = manifest['page_count'] if manifest else len(reader.pages)
+        page_counts = [count_terms_in_page(load_page(reader, manifest, page_num), matcher)
+                       for page_num in range(number_of_pages)]
+
+    return [list(term_counts) for term_counts in zip(*page_counts)] if page_counts else [[] for _ in terms]
+
+def count_word_in_range(file, start, stop, word, manifest=None, worker=False):
+    """
+    The count_word_in_range function is run by each process-pool worker.
+    It opens the PDF file once and counts the word on every page in the
+    range [start, stop). If the parent mapped the file before forking,
+    the worker reads from that shared mapping.
+    
+    :param file: the PDF file to read
+    :param start: first page number of the range
+    :param stop: page number after the last page of the range
+    :param word: the word to count
+    :param manifest: optional manifest of the file, to load pages directly
+    :param worker: True in a forked worker, whose peak memory can be reset
+    :return: A list with the word count of each page in the range and
+             the memory of the worker, as measured by track_memory
+    """
+    with track_memory(reset_peak=worker) as memory, open_pdf(file) as pdf:
+        reader = PdfReader(pdf)
+        page_counts = [count_word_in_page(load_page(reader, manifest, page_num), word)
+                       for page_num in range(start, stop)]
+
+    return page_counts, memory
+
+def count_word_parallel(file, word, workers, worker_stats=None, chunk_size=None):
+    """
+    The count_word_parallel function counts a word on every page of a PDF
+    file with a local process pool instead of a Ganga job. Pages are split
+    into contiguous ranges, one per worker or of chunk_size pages each,
+    and the per-page results are reduced in memory in page order. The
+    PDF file is memory-mapped once before the workers are forked, so
+    they all share the same pages. If the file has a current manifest,
+    the work is planned from it and the workers load their pages directly.
+    
+    :param file: the PDF file to read
+    :param word: the word to count
+    :param workers: number of worker processes
+    :param worker_stats: optional list that receives the page range and
+                         the memory of every range: its resident set at
+                         the start of its range, its peak and the
+                         increase of the peak, which excludes what it
+                         inherited from this process
+    :param chunk_size: the number of pages of a range; by default the
+                       pages are divided evenly over the workers
+    :return: A list with the word count of each page, in page order
+    """
+    manifest = load_manifest(file, build=False)
+
+    with share_pdf(file) as pdf:
+        if manifest:
+            number_of_pages = manifest['page_count']
+        else:
+            number_of_pages = len(PdfReader(pdf).pages)
+
+        if chunk_size:
+            ranges = [(start, min(start + chunk_size, number_of_pages))
+                      for start in range(0, number_of_pages, chunk_size)]
+        else:
+            ranges = split_page_ranges(number_of_pages, workers)
+        if not ranges:
+            return []
+
+        with fork_pool(min(workers, len(ranges))) as executor:
+            futures = [executor.submit(count_word_in_range, file, start, stop, word, manifest, True)
+                       for start, stop in ranges]
+
+            page_counts = []
+            for (start, stop), future in zip(ranges, futures):
+                counts, memory = future.result()
+                page_counts.extend(counts)
+                if worker_stats is not None:
+                    worker_stats.append(dict(memory, pages=(start, stop)))
+
+    return page_counts
+
+def count_word_from_queue(queue_dir):
+    """
+    The count_word_from_queue function is run by a persistent worker
+    subjob. It opens the PDF file once, then keeps claiming page ranges
+    from a local work queue and counts the word on each page until the
+    queue is empty. Several workers can drain the same queue.
+    A multi-term queue counts all its terms on each page instead.
+    
+    :param queue_dir: the work queue created by initial_task.py
+    :return: A generator of (page number, word count) tuples; for a
+             multi-term queue, the count is a list of term counts
+    """
+    info = load_queue_info(queue_dir)
+    input_pdf = info['pdf_file']
+    manifest = load_manifest(input_pdf, build=False)
+
+    if 'terms' in info:
+        matcher = make_term_matcher(info['terms'])
+        count_page = lambda page: count_terms_in_page(page, matcher)
+    else:
+        count_page = lambda page: count_word_in_page(page, info['word'])
+
+    with open_pdf(input_pdf) as pdf:
         reader = PdfReader(pdf)
-        text = reader.pages[int(page_num)].extract_text()
-        clean_text = preprocess_text(text)
+        for start, stop in iter_tasks(queue_dir):
+            for page_num in range(start, stop):
+                yield page_num, count_page(load_page(reader, manifest, page_num))
+
+def count_word_from_plan(plan_file, subjob_index):
+    """
+    The count_word_from_plan function is run by a subjob of a corpus job.
+    It counts the word on every page of the work units that the plan
+    assigned to the subjob, opening each PDF file only once.
+    
+    :param plan_file: the plan written by initial_task.py
+    :param subjob_index: the index of this subjob in the plan
+    :return: A generator of (page key, word count) tuples
+    """
+    plan = load_plan(plan_file)
+    word = plan['word']
+    units = plan['subjobs'][int(subjob_index)]['units']
+
+    for file_index in sorted({unit[0] for unit in units}):
+        file = plan['files'][file_index]
+        input_pdf = os.path.join(plan['corpus_dir'], file)
+        manifest = load_manifest(input_pdf, build=False)
 
-        return Counter(clean_text.split())[word]
+        with open_pdf(input_pdf) as pdf:
+            reader = PdfReader(pdf)
+            for _, start, stop, _ in (unit for unit in units if unit[0] == file_index):
+                for page_num in range(start, stop):
+                    page = load_page(reader, manifest, page_num)
+                    yield get_page_key(file, page_num), count_word_in_page(page, word)
+
+def print_worker_stats(worker_stats):
+    """
+    The print_worker_stats function reports the page range and peak memory
+    of each process-pool worker on stderr, keeping stdout identical to the
+    output of the Ganga job.
+    
+    :param worker_stats: list filled in by count_word_parallel
+    """
+    for worker, stats in enumerate(worker_stats):
+        start, stop = stats['pages']
+        print(f"# worker {worker}: pages {start}-{stop - 1}, peak RSS {stats['peak_rss_mb']:.1f} MB, \
+{stats['peak_increase_mb']:.1f} MB over its start",\
+            file=sys.stderr)
 
 def execute_script():
     """
@@ -75,12 +371,49 @@ def execute_script():
     It extracts three arguments: a pdf file, a page number and a word.
     The function then counts how many times the word appears on that
     page of the pdf file.
+    With --workers N, it counts every page of the pdf file with a local
+    process pool and prints one count per page, the same lines that the
+    Ganga job's merged stdout contains.
+    With --queue queue_dir, it runs as a persistent worker and prints a
+    page marker before the count of every page it takes from the queue.
+    With --plan plan_file subjob_index, it counts the pages of a corpus
+    job's subjob, also with a page marker before every count.
+    A multi-term queue prints a 'count<TAB>term' line per term instead
+    of a single count.
     
     :return: The number of times the word appears in the page
     """
+    if len(sys.argv) > 1 and sys.argv[1] == '--workers':
+        workers, current_dir, word, pdf_file = get_worker_arguments()
+        input_pdf = os.path.join(current_dir, pdf_file)
+        worker_stats = []
+        for page_count in count_word_parallel(input_pdf, word, workers, worker_stats):
+            print(page_count)
+        print_worker_stats(worker_stats)
+        return
+
+    if len(sys.argv) == 3 and sys.argv[1] == '--queue':
+        terms = load_queue_info(sys.argv[2]).get('terms')
+        for page_num, page_count in count_word_from_queue(sys.argv[2]):
+            print(f"{page_marker}{page_num}")
+            if terms is None:
+                print(page_count)
+                continue
+            for term, term_count in zip(terms, page_count):
+                print(f"{term_count}\t{term}")
+        return
+
+    if len(sys.argv) == 4 and sys.argv[1] == '--plan':
+        for page_key, page_count in count_word_from_plan(sys.argv[2], sys.argv[3]):
+            print(f"{page_marker}{page_key}")
+            print(page_count)
+        return
+
     current_dir, page_num, word, pdf_file = get_arguments()
     input_pdf = os.path.join(current_dir, pdf_file)
-    print((count_word(input_pdf, page_num, word)))
+    # use the manifest written by initial_task.py, if there is one
+    manifest = load_manifest(input_pdf, build=False)
+    print((count_word(input_pdf, page_num, word, manifest)))
 
 
 # Prevent autorun if script is being imported by test_InitialTask.py
@@ -89,5 +422,7 @@ if os.getenv("FROM_TEST_SCRIPT") == "true":
 else:
     RUN_INITIAL_TASK = True
 
-if RUN_INITIAL_TASK or os.getenv("TEST_SCRIPT_OVERRIDE") == "true":
-    execute_script()
+# initial_task.py imports this module to count small PDFs without a job
+if __name__ == '__main__' and (RUN_INITIAL_TASK or os.getenv("TEST_SCRIPT_OVERRIDE") == "true"):
+    # GENAI_PROFILE=1 profiles the run, e.g. inside a subjob
+    run_profiled(execute_script, 'count_it')
@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
 import os
 
+try:
+    from genai.local_ganga import use_local_executor
+except ImportError:
+    # run as a script from the genai directory
+    from local_ganga import use_local_executor
+
 def execute_script():
     """
     The execute_script function is a simple example of
@@ -22,7 +28,15 @@ if os.getenv("FROM_TEST_SCRIPT") == "true":
 else:
     RUN_INITIAL_TASK = True
 
-if RUN_INITIAL_TASK:
+# GENAI_EXECUTOR=local runs the job without Ganga: python3 hello.py
+if use_local_executor():
+    try:
+        from genai.local_ganga import Job, Local
+    except ImportError:
+        from local_ganga import Job, Local
+    if RUN_INITIAL_TASK:
+        execute_script()
+elif RUN_INITIAL_TASK:
     execute_script()
 else:
     from ganga.ganga import ganga
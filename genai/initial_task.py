@@ -1,16 +1,65 @@
 #!/usr/bin/env python3
 import os
+import csv
+import math
 import shutil
 import sys
 import time
-from pypdf import PdfReader
+from functools import partial
 from tqdm import tqdm
 
+try:
+    from genai.aggregator import WordCountAggregator, TermMatrixAggregator
+    from genai.job_wait import JobWaiter
+    from genai.pdf_manifest import load_manifest
+    from genai.split_pdf import get_page_filename, load_split_state, is_output_current
+    from genai.pdf_io import split_page_ranges
+    from genai.work_queue import create_queue
+    from genai.corpus import find_corpus_pdfs, plan_corpus, save_plan, estimate_page_cost
+    from genai.local_ganga import use_local_executor
+    from genai.count_it import count_word_in_range, count_word_parallel, get_normalization_version
+    from genai.result_store import get_result_store_path, lookup_result, store_result
+    from genai.profiling import is_profiling_enabled, write_profile_report, profile_env_var,\
+        profile_extension, profile_stats_extension
+except ImportError:
+    # run as a script from the genai directory
+    from aggregator import WordCountAggregator, TermMatrixAggregator
+    from job_wait import JobWaiter
+    from pdf_manifest import load_manifest
+    from split_pdf import get_page_filename, load_split_state, is_output_current
+    from pdf_io import split_page_ranges
+    from work_queue import create_queue
+    from corpus import find_corpus_pdfs, plan_corpus, save_plan, estimate_page_cost
+    from local_ganga import use_local_executor
+    from count_it import count_word_in_range, count_word_parallel, get_normalization_version
+    from result_store import get_result_store_path, lookup_result, store_result
+    from profiling import is_profiling_enabled, write_profile_report, profile_env_var,\
+        profile_extension, profile_stats_extension
+
 # globals
 call_script = 'run_initial_task.sh'
 word_counting_script = 'count_it.py'
 split_pdf_script = 'split_pdf.py'
 pdf_file = 'LHC.pdf'
+split_pages_folder = 'extracted_pages'
+split_pages_flag = '--split-pages'
+persistent_workers_flag = '--persistent-workers'
+queue_folder = 'work_queue'
+# page ranges per persistent worker, so that fast workers take over more
+queue_tasks_per_worker = 4
+corpus_flag = '--corpus'
+subjobs_flag = '--subjobs'
+corpus_plan_file = 'corpus_plan.json'
+auto_flag = '--auto'
+force_flag = '--force'
+terms_flag = '--terms'
+term_matrix_file = 'count_it_terms.csv'
+# estimated extraction cost (content-stream bytes plus page overhead) up to
+# which the planner counts in this process, or with a local process pool
+inline_max_cost = 1024 * 1024
+pool_max_cost = 256 * 1024 * 1024
+# smallest share of the work worth starting another pool worker for
+pool_min_cost_per_worker = 256 * 1024
 current_dir = os.getcwd()
 
 def set_current_dir(cur_dir):
@@ -43,12 +92,14 @@ def set_current_dir(cur_dir):
     return cur_dir
 
 
-def create_call_script(script=None):
+def create_call_script(script=None, direct=False):
     """
     The create_call_script function creates a bash script that will run
-    the specified Python script.
+    the specified Python script. Persistent word count workers and corpus
+    jobs run count_it.py directly, so no bash script is created for them.
     
     :param script: Pass the name of the script to be run
+    :param direct: the word count job runs count_it.py directly
     :return: The name of the python script to be run
     """
     if not script and len(sys.argv) < 2:
@@ -61,11 +112,14 @@ def create_call_script(script=None):
     python_script = os.path.basename(python_script)
     cur_dir = set_current_dir(current_dir)
 
+    if direct and python_script == word_counting_script:
+        return python_script, cur_dir
+
     # Create a bash script that will run the specified Python script
     with open(call_script, 'w') as script:
         if python_script == word_counting_script:
             script.write(f"""#!/bin/bash
-            python3 "{cur_dir}/{python_script}" "$1" "$2" "$3" {pdf_file}
+            python3 "{cur_dir}/{python_script}" "$1" "$2" "$3" "${{4:-{pdf_file}}}"
             """)
         else:
             script.write(f"""#!/bin/bash
@@ -90,31 +144,270 @@ def check_file_existence(filepath):
         print("Please store the file in the current directory and rerun the job.\n")
         sys.exit(1)
 
-def submit_ganga_job(python_script, cur_dir):
+def get_persistent_workers():
+    """
+    The get_persistent_workers function reads the number of persistent
+    word count workers from the command line:
+        ganga initial_task.py count_it.py --persistent-workers [N]
+    Without N, one worker per CPU core is started.
+    
+    :return: The number of workers, or None if the flag is not given
+    """
+    if persistent_workers_flag not in sys.argv:
+        return None
+
+    position = sys.argv.index(persistent_workers_flag)
+    try:
+        workers = int(sys.argv[position + 1])
+    except (IndexError, ValueError):
+        workers = os.cpu_count() or 1
+
+    return max(1, workers)
+
+def get_corpus_options():
+    """
+    The get_corpus_options function reads the corpus mode options from
+    the command line:
+        ganga initial_task.py count_it.py --corpus DIR [--subjobs N]
+    Without N, one subjob per CPU core is planned.
+    
+    :return: A tuple of the corpus directory and the number of subjobs,
+             or None if the corpus flag is not given
+    """
+    if corpus_flag not in sys.argv:
+        return None
+
+    position = sys.argv.index(corpus_flag)
+    if position + 1 >= len(sys.argv):
+        print(f"You must specify the directory of PDF files after {corpus_flag}")
+        sys.exit(1)
+    corpus_dir = sys.argv[position + 1]
+
+    subjobs = os.cpu_count() or 1
+    if subjobs_flag in sys.argv:
+        position = sys.argv.index(subjobs_flag)
+        try:
+            subjobs = int(sys.argv[position + 1])
+        except (IndexError, ValueError):
+            print(f"The number of subjobs must follow {subjobs_flag} as an integer")
+            sys.exit(1)
+
+    return corpus_dir, max(1, subjobs)
+
+def split_corpus_job(job, script_path, corpus_dir, subjobs):
+    """
+    The split_corpus_job function sets up a word count job over every PDF
+    file in a directory. The work is planned from the manifests of the
+    files: page ranges are packed into subjobs of balanced estimated cost,
+    so a single heavy document is spread over several subjobs instead of
+    defining how long the whole job takes.
+    
+    :param job: the word count job
+    :param script_path: path of count_it.py
+    :param corpus_dir: the directory that holds the PDF files
+    :param subjobs: the maximum number of subjobs
+    :return: The plan of the job
+    """
+    if not os.path.isdir(corpus_dir) or not find_corpus_pdfs(corpus_dir):
+        print(f"\nThe directory '{corpus_dir}' does not contain any PDF files.")
+        print("Please store the files in that directory and rerun the job.\n")
+        sys.exit(1)
+
+    plan = plan_corpus(corpus_dir, 'it', subjobs)
+    if not plan['subjobs']:
+        print(f"\nThe PDF files in '{corpus_dir}' do not have any pages to count.")
+        print("Please store files with pages in that directory and rerun the job.\n")
+        sys.exit(1)
+
+    plan_file = os.path.join(job.inputdir, corpus_plan_file)
+    save_plan(plan, plan_file)
+
+    costs = [work['cost'] for work in plan['subjobs']]
+    print(f"\nCounting {plan['page_count']} pages of {len(plan['files'])} PDF files in {len(costs)} subjobs.")
+    print(f"Estimated subjob cost: {min(costs)} to {max(costs)} bytes, \
+{max(costs) / (sum(costs) / len(costs)):.2f}x the mean at most.\n")
+
+    # split using ArgSplitter, one set of work units per subjob
+    job.splitter = ArgSplitter(args=[ [script_path, '--plan', plan_file, index] for index in range(len(costs))])
+
+    # merge using TextMerger
+    job.postprocessors.append(TextMerger(files=['stdout']))
+
+    return plan
+
+def get_terms_option():
+    """
+    The get_terms_option function reads the terms of a multi-term word
+    count from the command line, a comma-separated list of words and
+    phrases:
+        ganga initial_task.py count_it.py --terms "it,the,large hadron collider"
+    A multi-term count reads the whole PDF file with persistent workers or
+    a subjob per page, so it can't be combined with the options that pick
+    another way of counting. Term counts are not stored as results, so
+    they are counted again on every run.
+    
+    :return: A list of distinct terms, or None if the flag is not given
+    """
+    if terms_flag not in sys.argv:
+        return None
+
+    combined = [flag for flag in (corpus_flag, auto_flag, split_pages_flag) if flag in sys.argv]
+    if combined:
+        print(f"The option {terms_flag} can't be combined with {', '.join(combined)}; \
+only {persistent_workers_flag} can be used with it.")
+        sys.exit(1)
+
+    position = sys.argv.index(terms_flag)
+    terms = sys.argv[position + 1].split(',') if position + 1 < len(sys.argv) else []
+    # drop empty and repeated terms, keeping the order
+    terms = list(dict.fromkeys(term.strip() for term in terms if term.strip()))
+    if not terms:
+        print(f"You must specify the terms to count after {terms_flag}, separated by commas")
+        sys.exit(1)
+
+    return terms
+
+def get_queue_dir(job):
+    """
+    The get_queue_dir function returns where the work queue of a job is
+    kept: inside the job's own input directory, so that concurrent runs
+    never share a queue and the queue is removed along with the job.
+    
+    :param job: the master job
+    :return: The path of the work queue directory
+    """
+    return os.path.join(job.inputdir, queue_folder)
+
+def create_page_queue(queue_dir, input_pdf, word, number_of_pages, workers, chunk_size=None, terms=None):
+    """
+    The create_page_queue function fills a work queue with the page
+    ranges of a PDF file for the persistent word count workers.
+    
+    :param queue_dir: the directory that holds the queue
+    :param input_pdf: path of the PDF file
+    :param word: the word to count
+    :param number_of_pages: total number of pages in the PDF
+    :param workers: number of persistent workers
+    :param chunk_size: pages per range; by default every worker gets
+                       queue_tasks_per_worker ranges
+    :param terms: words and phrases to count together instead of the word
+    :return: The number of page ranges in the queue
+    """
+    if chunk_size:
+        page_ranges = [(start, min(start + chunk_size, number_of_pages))
+                       for start in range(0, number_of_pages, chunk_size)]
+    else:
+        page_ranges = split_page_ranges(number_of_pages, workers * queue_tasks_per_worker)
+    create_queue(queue_dir, [list(page_range) for page_range in page_ranges],\
+        info={'pdf_file': input_pdf, 'terms': terms} if terms else {'pdf_file': input_pdf, 'word': word})
+
+    return len(page_ranges)
+
+def get_split_page_files(cur_dir, manifest):
+    """
+    The get_split_page_files function returns the per-page PDFs that
+    split_pdf.py saved in the extracted_pages folder, but only if every
+    page of the current PDF file was split and is still intact.
+    
+    :param cur_dir: Specify the directory where the input file is located
+    :param manifest: the manifest of the input PDF file
+    :return: A list of page files relative to cur_dir, or None
+    """
+    output_folder = os.path.join(cur_dir, split_pages_folder)
+    state = load_split_state(output_folder, manifest['content_hash'])
+
+    page_files = []
+    for page_num in range(manifest['page_count']):
+        name = get_page_filename(page_num)
+        if not is_output_current(output_folder, state, name, [page_num]):
+            return None
+        page_files.append(os.path.join(split_pages_folder, name))
+
+    return page_files
+
+def submit_ganga_job(python_script, cur_dir, use_split_pages=False, persistent_workers=None, corpus=None,\
+                     chunk_size=None, terms=None):
     """
     The submit_ganga_job function is used to submit a Ganga job.
+    With use_split_pages, every word count subjob is pointed at the
+    single-page PDF of its page in extracted_pages, so that it parses a
+    one-page document instead of the whole PDF file.
+    With persistent_workers, the word count job gets one subjob per
+    worker instead of one per page. Each subjob runs count_it.py in a
+    single Python process that keeps taking page ranges from a local
+    work queue until all pages are counted.
+    With corpus, the word count job counts every PDF file in a directory
+    instead of a single PDF file.
+    With terms, persistent workers count all the terms on each page,
+    extracting its text only once.
     
     :param python_script: Specify the python script to be executed
     :param cur_dir: Specify the directory where the input file is located
+    :param use_split_pages: count from the pages saved by split_pdf.py
+    :param persistent_workers: number of persistent word count workers
+    :param corpus: a tuple of the corpus directory and the number of subjobs
+    :param chunk_size: pages per work queue range of the persistent workers
+    :param terms: list of words and phrases to count in one pass
     :return: A job object and a job name
     """
     script_filename = os.path.basename(python_script)
     job_name = os.path.splitext(script_filename)[0]
+    if terms and not persistent_workers:
+        persistent_workers = os.cpu_count() or 1
+    persistent = persistent_workers and script_filename == word_counting_script
+    corpus_job = corpus and script_filename == word_counting_script
 
     j = Job(name=job_name, backend=Local())
     j.application = Executable()
-    j.application.exe = File(call_script)
+    if persistent or corpus_job:
+        j.application.exe = 'python3'
+    else:
+        j.application.exe = File(call_script)
+
+    # GENAI_PROFILE=1 profiles every subjob and brings its profile back with its stdout
+    if is_profiling_enabled():
+        j.application.env = {profile_env_var: '1'}
+        j.outputfiles = [LocalFile('*' + profile_extension), LocalFile('*' + profile_stats_extension)]
+
+    if corpus_job:
+        split_corpus_job(j, os.path.join(cur_dir, script_filename), *corpus)
+        j.submit()
+
+        return j, job_name
+
+    # Scan the PDF once; the subjobs plan their work from this manifest
+    input_pdf = os.path.join(cur_dir, pdf_file)
+    check_file_existence(input_pdf)
+    manifest = load_manifest(input_pdf)
 
     # Create splitter for the word count job
-    if script_filename == word_counting_script:
-        input_pdf = os.path.join(cur_dir, pdf_file)
-        check_file_existence(input_pdf)
-        reader = PdfReader(input_pdf)
-        number_of_pages = len(reader.pages)
+    if persistent:
+        queue_dir = get_queue_dir(j)
+        tasks = create_page_queue(queue_dir, input_pdf, 'it', manifest['page_count'], persistent_workers,\
+            chunk_size, terms)
+
+        # every worker runs the same command and drains the same queue
+        worker_args = [os.path.join(cur_dir, script_filename), '--queue', queue_dir]
+        j.splitter = ArgSplitter(args=[worker_args for _ in range(min(persistent_workers, tasks))])
+
+        # merge using TextMerger
+        j.postprocessors.append(TextMerger(files=['stdout']))
+
+    elif script_filename == word_counting_script:
+        number_of_pages = manifest['page_count']
         word = 'it'
 
+        page_files = get_split_page_files(cur_dir, manifest) if use_split_pages else None
+        if use_split_pages and not page_files:
+            print(f"\nPages of {pdf_file} have not been split yet. Counting from {pdf_file} instead.")
+            print(f"Run 'ganga initial_task.py {split_pdf_script}' first to count from the split pages.\n")
+
         # split using ArgSplitter
-        splitter_args = [ [cur_dir, page_num, word] for page_num in range(number_of_pages)]
+        if page_files:
+            # every page file holds a single page, page 0
+            splitter_args = [ [cur_dir, 0, word, page_file] for page_file in page_files]
+        else:
+            splitter_args = [ [cur_dir, page_num, word] for page_num in range(number_of_pages)]
         j.splitter = ArgSplitter(args=splitter_args)
 
         # merge using TextMerger
@@ -124,6 +417,142 @@ def submit_ganga_job(python_script, cur_dir):
 
     return j, job_name
 
+def find_stored_word_count(cur_dir, word='it'):
+    """
+    The find_stored_word_count function looks up the word count of the
+    PDF file in the result store. A result is found only for the same
+    PDF content, the same word and the same text normalization, so a
+    changed file or a changed count_it.py is counted again.
+    
+    :param cur_dir: Specify the directory where the input file is located
+    :param word: the word to count
+    :return: The stored word count, or None
+    """
+    input_pdf = os.path.join(cur_dir, pdf_file)
+    check_file_existence(input_pdf)
+    manifest = load_manifest(input_pdf)
+
+    entry, stale = lookup_result(get_result_store_path(cur_dir), input_pdf,\
+        manifest['content_hash'], word, get_normalization_version())
+    if stale:
+        print(f"\nIgnoring {stale} stale stored result(s) for {pdf_file}: the file or the text normalization changed.")
+
+    return entry['word_count'] if entry else None
+
+def remember_word_count(cur_dir, word_count, word='it'):
+    """
+    The remember_word_count function stores the word count of the PDF
+    file in the result store, so that the same query is not counted again.
+    
+    :param cur_dir: Specify the directory where the input file is located
+    :param word_count: the total word count
+    :param word: the word that was counted
+    """
+    input_pdf = os.path.join(cur_dir, pdf_file)
+    manifest = load_manifest(input_pdf)
+    store_result(get_result_store_path(cur_dir), input_pdf, manifest['content_hash'], word,\
+        get_normalization_version(), word_count)
+
+def get_available_cores():
+    """
+    The get_available_cores function returns the number of CPU cores
+    this process may run on, which can be fewer than the machine has.
+    
+    :return: The number of available cores
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def plan_execution(manifest, cores):
+    """
+    The plan_execution function picks how to count a word in a PDF file,
+    from the estimated extraction cost of its pages and the available
+    cores:
+        - inline: in this process, for PDFs small enough that starting
+          any worker would cost more than counting
+        - pool: with a local process pool, one contiguous chunk of pages
+          per worker
+        - ganga: with a Ganga job of persistent workers that take chunks
+          of pages from a work queue
+    
+    :param manifest: the manifest of the PDF file
+    :param cores: the number of available cores
+    :return: The plan as a dictionary with the mode, the number of
+             workers, the chunk size in pages and the figures it is based on
+    """
+    number_of_pages = manifest['page_count']
+    estimated_cost = sum(estimate_page_cost(page) for page in manifest['pages'])
+
+    if estimated_cost <= inline_max_cost or cores == 1 and estimated_cost <= pool_max_cost:
+        mode, workers = 'inline', 1
+        chunk_size = number_of_pages
+    elif estimated_cost <= pool_max_cost:
+        mode = 'pool'
+        workers = min(cores, number_of_pages, max(2, math.ceil(estimated_cost / pool_min_cost_per_worker)))
+        chunk_size = math.ceil(number_of_pages / workers)
+    else:
+        mode, workers = 'ganga', min(cores, number_of_pages)
+        # several chunks per worker, so that fast workers take over more
+        chunk_size = max(1, number_of_pages // (workers * queue_tasks_per_worker))
+
+    return {
+        'mode': mode,
+        'workers': workers,
+        'chunk_size': max(1, chunk_size),
+        'page_count': number_of_pages,
+        'file_size': manifest['file_size'],
+        'estimated_cost': estimated_cost,
+        'cores': cores,
+    }
+
+def execute_planned_count(cur_dir, word='it'):
+    """
+    The execute_planned_count function counts a word in the PDF file the
+    way plan_execution picks, then reports the plan along with how long
+    planning and counting took. Small PDFs are counted without starting
+    a single worker, large ones are still fanned out.
+    
+    :param cur_dir: Specify the directory where the input file is located
+    :param word: the word to count
+    :return: The plan that was executed
+    """
+    planning_start = time.perf_counter()
+    input_pdf = os.path.join(cur_dir, pdf_file)
+    check_file_existence(input_pdf)
+    manifest = load_manifest(input_pdf)
+    plan = plan_execution(manifest, get_available_cores())
+    planning_time = time.perf_counter() - planning_start
+
+    print(f"\nExecution plan: {plan['mode']} with {plan['workers']} worker(s), {plan['chunk_size']} page(s) per chunk \
+({plan['page_count']} pages, {plan['file_size'] / 1e6:.1f} MB, estimated cost {plan['estimated_cost'] / 1e6:.2f} MB, \
+{plan['cores']} cores available; planned in {planning_time * 1000:.1f} ms)")
+
+    counting_start = time.perf_counter()
+    job_name = os.path.splitext(word_counting_script)[0]
+    if plan['mode'] == 'inline':
+        page_counts, _ = count_word_in_range(input_pdf, 0, plan['page_count'], word, manifest)
+        word_count = sum(page_counts)
+        write_word_count(word_count, job_name, cur_dir)
+    elif plan['mode'] == 'pool':
+        word_count = sum(count_word_parallel(input_pdf, word, plan['workers'], chunk_size=plan['chunk_size']))
+        write_word_count(word_count, job_name, cur_dir)
+    else:
+        job, job_name = submit_ganga_job(word_counting_script, cur_dir,\
+            persistent_workers=plan['workers'], chunk_size=plan['chunk_size'])
+        word_count = store_word_count(job, job_name, cur_dir)
+        shutil.rmtree(get_queue_dir(job), ignore_errors=True)
+    counting_time = time.perf_counter() - counting_start
+
+    if word_count is not None:
+        remember_word_count(cur_dir, word_count, word)
+
+    print(f"Measured cost: {plan['mode']} counting took {counting_time:.3f} s, \
+{plan['page_count'] / counting_time:.1f} pages/s\n")
+
+    return plan
+
 def count_frequency(output_file):
     """
     The count_frequency function takes a file as input and
@@ -132,70 +561,147 @@ def count_frequency(output_file):
     :param output_file: Specify the file that is being read
     :return: The sum of all integers in the file
     """
-    with open(output_file, 'r') as f:
-        lines = f.readlines()
+    aggregator = WordCountAggregator()
+    aggregator.fold_file(output_file)
 
-    word_count = 0
-    for line in lines:
-        # Check if the line does not start with '#'
-        if not line.startswith('#'):
-            try:
-                word_count += int(line.strip())
-            except ValueError:
-                continue
+    return aggregator.total
 
-    return word_count
+def report_status_change(aggregator, job, progress_bar, item, old_status, new_status):
+    """
+    The report_status_change function is called by the JobWaiter whenever
+    the job or one of its subjobs changes status. A subjob's count is
+    folded in as soon as it completes and the running total is shown.
+    
+    :param aggregator: the WordCountAggregator collecting the counts
+    :param job: the word-count job
+    :param progress_bar: the tqdm bar shown while waiting
+    :param item: the job or subjob whose status changed
+    :param old_status: the previous status, None on the first poll
+    :param new_status: the current status
+    """
+    if item is job or new_status != 'completed':
+        return
+
+    if aggregator.fold_subjob(item):
+        progress_bar.set_postfix_str(f"subjobs finished: {len(aggregator.folded_subjobs)}/\
+{len(job.subjobs)}, running total: {aggregator.total}")
 
 def store_word_count(job, job_name, cur_dir):
     '''
-    1. Wait (1 min) until job finishes with 'completed' status.
-    2. Extract the word counts from the merged file, calculate
-    the total word count and store it to a file
+    1. Wait until job finishes with 'completed' status, folding in
+    each subjob's count as soon as that subjob finishes. The wait
+    only times out if the job stops making progress.
+    2. Calculate the total word count and store it to a file. Jobs
+    without subjobs are counted from the merged file instead.
+    3. Return the total word count, or None if the job didn't complete.
     '''
-    start_time = time.time()
-    timeout = 60 # 1 minute
-
-    print("\nWaiting for job to finish. Maximum wait time: 1 minute\n")
-
-    with tqdm(total = timeout, \
-        leave=False, \
-        bar_format='{elapsed}') as progress_bar:
-
-        '''
-        Running this script externally does not provide direct access
-        to the jobs registry. So, we need to explicitly fetch it.
-        However running it from ganga doesn't have this issue as we 
-        have direct access to the registry there.
-        '''
-        if os.getenv("TEST_SCRIPT_OVERRIDE") == "true":
-            jobs = getRegistryProxy('jobs')
-            current_status = jobs(job.id).status
-
-            if not monitoring_component.enabled:
-                monitoring_component.enable()
-        else:
-            current_status = None
-
-        while current_status != 'completed' and job.status != 'completed':
-            if os.getenv("TEST_SCRIPT_OVERRIDE") == "true":
-                current_status = jobs(job.id).status
-
-            # update progress bar
-            elapsed_time = time.time() - start_time
-            progress_bar.update(elapsed_time - progress_bar.n)
-            
-            # timeout if job is still running, can be a monitoring or job issue
-            if elapsed_time > timeout:
-                if job.status == 'completed':
-                    break
-                else:
-                    print("Timeout reached. Job didn't finish. Exiting job...")
-                    return
-
-            time.sleep(1)
-
-    merged_output = job.outputdir + 'stdout'
-    word_count = count_frequency(merged_output)
+    aggregator = WordCountAggregator()
+    if wait_for_job(job, aggregator) != 'completed':
+        return
+
+    if job.subjobs:
+        aggregator.fold_completed_subjobs(job)
+        word_count = aggregator.total
+    else:
+        merged_output = job.outputdir + 'stdout'
+        word_count = count_frequency(merged_output)
+
+    # per-file counts of a corpus job
+    for file, file_count in aggregator.count_by_file().items():
+        print(f"{file}: {file_count}")
+
+    write_word_count(word_count, job_name, cur_dir)
+    print(f"\nRun this command to check the output from TextMerger: jobs({job.id}).peek('stdout')\n")
+
+    return word_count
+
+def wait_for_job(job, aggregator):
+    """
+    The wait_for_job function waits until a word count job finishes,
+    folding in each subjob's output as soon as that subjob completes.
+    The wait only times out if the job stops making progress.
+    
+    :param job: the word count job
+    :param aggregator: the aggregator collecting the counts
+    :return: The final status of the job, or None on timeout
+    """
+    '''
+    Running this script externally does not provide direct access
+    to the jobs registry. So, we need to explicitly fetch it.
+    However running it from ganga doesn't have this issue as we 
+    have direct access to the registry there.
+    '''
+    if os.getenv("TEST_SCRIPT_OVERRIDE") == "true" and not use_local_executor():
+        jobs = getRegistryProxy('jobs')
+        get_job = lambda: jobs(job.id)
+
+        if not monitoring_component.enabled:
+            monitoring_component.enable()
+    else:
+        get_job = None
+
+    with tqdm(leave=False, \
+        bar_format='{elapsed}{postfix}') as progress_bar:
+
+        waiter = JobWaiter(job, get_job=get_job,\
+            on_status_change=[partial(report_status_change, aggregator, job, progress_bar)],\
+            on_poll=lambda elapsed_time: progress_bar.update(elapsed_time - progress_bar.n))
+
+        print(f"\nWaiting for job to finish. Timeout: {waiter.timeout} seconds without progress\n")
+
+        # timeout if job stops progressing, can be a monitoring or job issue
+        status = waiter.wait()
+
+    if status is None:
+        print("Timeout reached. Job didn't finish. Exiting job...")
+    elif status != 'completed':
+        print(f"Job finished with status '{status}'. Exiting job...")
+
+    return status
+
+def store_term_counts(job, terms, number_of_pages, cur_dir):
+    """
+    The store_term_counts function waits for a multi-term word count job,
+    stores its term x page matrix as a CSV file with a row per term and
+    a column per page, and prints the total of every term.
+    
+    :param job: the multi-term word count job
+    :param terms: the terms that were counted
+    :param number_of_pages: total number of pages in the PDF
+    :param cur_dir: Specify the directory where the result is stored
+    :return: The term x page matrix, or None if the job didn't complete
+    """
+    aggregator = TermMatrixAggregator()
+    if wait_for_job(job, aggregator) != 'completed':
+        return
+
+    aggregator.fold_completed_subjobs(job)
+    matrix = aggregator.get_matrix(terms, range(number_of_pages))
+
+    result_file = os.path.join(cur_dir, term_matrix_file)
+    with open(result_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['term'] + [f"page_{page_num + 1}" for page_num in range(number_of_pages)] + ['total'])
+        for term, page_counts in zip(terms, matrix):
+            writer.writerow([term] + page_counts + [sum(page_counts)])
+
+    print()
+    for term, page_counts in zip(terms, matrix):
+        print(f">>> Frequency of '{term}' = {sum(page_counts)} <<<")
+    print(f"\nThe term x page counts have been stored in the same directory as this script: {result_file}\n")
+
+    return matrix
+
+def write_word_count(word_count, job_name, cur_dir):
+    """
+    The write_word_count function stores the total word count in a file
+    named after the job and reports where it is.
+    
+    :param word_count: the total word count
+    :param job_name: the name of the word count job
+    :param cur_dir: Specify the directory where the result is stored
+    :return: The path of the result file
+    """
     result_file = cur_dir + '/' + job_name + '.txt'
 
     with open(result_file, 'w') as f:
@@ -204,7 +710,37 @@ def store_word_count(job, job_name, cur_dir):
     print(f"\n>>> Frequency of the word 'it' = {word_count} <<<\n")
     print(f"The word count has been stored in the same directory as this script: {result_file}")    
     print(f"\nRun this command to see the stored result: cat {result_file}")
-    print(f"\nRun this command to check the output from TextMerger: jobs({job.id}).peek('stdout')\n")
+
+    return result_file
+
+def report_job_profile(job):
+    """
+    The report_job_profile function merges the profiles written by the
+    subjobs of a finished job into one hot-function report.
+    
+    :param job: the finished job
+    :return: The path of the report, or None if no profile was found
+    """
+    report_file = write_profile_report(job)
+    if report_file:
+        print(f"\nThe merged profile of the job's subjobs has been stored in: {report_file}")
+        print(f"Run this command to see it: cat {report_file}\n")
+    else:
+        print(f"\nNo profiles found in the output of job {job.id}.\n")
+
+    return report_file
+
+def remove_call_script(cur_dir):
+    """
+    The remove_call_script function removes the bash script created by
+    create_call_script once it is not needed any more.
+    
+    :param cur_dir: Specify the directory of the task scripts
+    """
+    try:
+        os.remove('run_initial_task.sh')
+    except FileNotFoundError:
+        print(f"run_initial_task.sh not found in {cur_dir}")
 
 def execute_initial_task():
     """
@@ -214,19 +750,57 @@ def execute_initial_task():
     The script can either be word_counting_script or split_pdf_script
     depending on what task has been chosen by the user.
     """
-    script, cur_dir = create_call_script()
-    job, job_name = submit_ganga_job(script, cur_dir)
+    persistent_workers = get_persistent_workers()
+    corpus = get_corpus_options()
+    auto = auto_flag in sys.argv
+    terms = get_terms_option()
+    direct = bool(persistent_workers or corpus or auto or terms)
+    script, cur_dir = create_call_script(direct=direct)
+
+    if terms and script == word_counting_script:
+        job, _ = submit_ganga_job(script, cur_dir, persistent_workers=persistent_workers, terms=terms)
+        store_term_counts(job, terms, load_manifest(os.path.join(cur_dir, pdf_file))['page_count'], cur_dir)
+        if is_profiling_enabled():
+            report_job_profile(job)
+        shutil.rmtree(get_queue_dir(job), ignore_errors=True)
+        return
+
+    # a corpus job has no single content hash to look its result up by
+    if script == word_counting_script and not corpus and force_flag not in sys.argv:
+        word_count = find_stored_word_count(cur_dir)
+        if word_count is not None:
+            write_word_count(word_count, os.path.splitext(script)[0], cur_dir)
+            print(f"\nThis result was stored by an earlier run, no job was submitted. \
+Pass {force_flag} to count again.\n")
+            if not direct:
+                remove_call_script(cur_dir)
+            return
+
+    if auto and script == word_counting_script:
+        execute_planned_count(cur_dir)
+        return
+
+    job, job_name = submit_ganga_job(script, cur_dir, split_pages_flag in sys.argv, persistent_workers, corpus)
 
     if script == word_counting_script:
-        store_word_count(job, job_name, cur_dir)
+        word_count = store_word_count(job, job_name, cur_dir)
+        if word_count is not None and not corpus:
+            remember_word_count(cur_dir, word_count)
     elif script == split_pdf_script:
         print(f"\nExtracted pages from {pdf_file} have been saved in the folder {cur_dir}/extracted_pages")
         print(f"\nFor a detailed stdout, run the command: jobs({job.id}).peek('stdout') in ganga prompt.\n")
-    
-    try:
-        os.remove('run_initial_task.sh')
-    except FileNotFoundError:
-        print(f"run_initial_task.sh not found in {cur_dir}")
+
+    if is_profiling_enabled():
+        # the split job isn't waited for otherwise
+        if script == split_pdf_script:
+            wait_for_job(job, WordCountAggregator())
+        report_job_profile(job)
+
+    if direct and script == word_counting_script:
+        shutil.rmtree(get_queue_dir(job), ignore_errors=True)
+        return
+
+    remove_call_script(cur_dir)
 
 
 # Prevent autorun if script is being imported by test_InitialTask.py
@@ -235,12 +809,20 @@ if os.getenv("FROM_TEST_SCRIPT") == "true":
 else:
     RUN_INITIAL_TASK = True
 
+# GENAI_EXECUTOR=local runs the jobs without Ganga: python3 initial_task.py ...
+if use_local_executor():
+    try:
+        from genai.local_ganga import Job, Local, Executable, File, LocalFile, ArgSplitter, TextMerger
+    except ImportError:
+        from local_ganga import Job, Local, Executable, File, LocalFile, ArgSplitter, TextMerger
+    if RUN_INITIAL_TASK or os.getenv("TEST_SCRIPT_OVERRIDE") == "true":
+        execute_initial_task()
 # TEST_SCRIPT_OVERRIDE helps mimic an entire system call from test scripts
-if RUN_INITIAL_TASK:
+elif RUN_INITIAL_TASK:
     execute_initial_task()
 elif os.getenv("TEST_SCRIPT_OVERRIDE") == "true":
     from ganga.ganga import ganga
-    from ganga import Job, Local, Executable, File, ArgSplitter, TextMerger
+    from ganga import Job, Local, Executable, File, LocalFile, ArgSplitter, TextMerger
     '''
     Importing sleep_until_completed() here throws a ConfigError,
     so I have used some of its logic to implements a sleep timer myself
@@ -250,6 +832,6 @@ elif os.getenv("TEST_SCRIPT_OVERRIDE") == "true":
     execute_initial_task()
 else:
     from ganga.ganga import ganga
-    from ganga import Job, Local, Executable, File, ArgSplitter, TextMerger
+    from ganga import Job, Local, Executable, File, LocalFile, ArgSplitter, TextMerger
     from GangaCore.Core.GangaRepository import getRegistryProxy
     from GangaCore.Core import monitoring_component
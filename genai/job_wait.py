@@ -0,0 +1,92 @@
+import time
+
+# statuses after which a job will not change any more
+final_statuses = ('completed', 'failed', 'killed')
+
+class JobWaiter:
+    """
+    The JobWaiter class waits for a Ganga job to finish. It polls with
+    exponential backoff, tracks the status of every subjob and fires
+    callbacks whenever the job or one of its subjobs changes status.
+    The timeout scales with the number of subjobs and is reset every
+    time a status changes, so only a job that stops making progress
+    times out.
+    """
+    def __init__(self, job, get_job=None,\
+                       base_timeout=60,\
+                       timeout_per_subjob=2,\
+                       initial_interval=0.1,\
+                       max_interval=5,\
+                       backoff=2,\
+                       on_status_change=None,\
+                       on_poll=None,\
+                       clock=time.monotonic,\
+                       sleep=time.sleep):
+
+        self.job = job
+        # refetch the job, e.g. from the jobs registry, on every poll
+        self.get_job = get_job if get_job else lambda: job
+        self.timeout = base_timeout + timeout_per_subjob * len(job.subjobs)
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.on_status_change = on_status_change if on_status_change else []
+        self.on_poll = on_poll
+        self.clock = clock
+        self.sleep = sleep
+        self.statuses = {}
+
+    def poll(self):
+        """
+        The poll method reads the status of the job and its subjobs once
+        and fires the status-change callbacks for everything that changed
+        since the previous poll.
+
+        :return: The current job and the number of status changes seen
+        """
+        job = self.get_job()
+        changes = 0
+
+        for key, item in [(None, job)] + [(subjob.id, subjob) for subjob in job.subjobs]:
+            status = item.status
+            old_status = self.statuses.get(key)
+            if status != old_status:
+                self.statuses[key] = status
+                changes += 1
+                for callback in self.on_status_change:
+                    callback(item, old_status, status)
+
+        return job, changes
+
+    def wait(self):
+        """
+        The wait method blocks until the job reaches a final status or
+        until no status has changed for longer than the timeout.
+
+        :return: The final status of the job, or None on timeout
+        """
+        start_time = self.clock()
+        last_progress = start_time
+        interval = self.initial_interval
+
+        while True:
+            job, changes = self.poll()
+            now = self.clock()
+
+            if self.on_poll:
+                self.on_poll(now - start_time)
+
+            if job.status in final_statuses:
+                return job.status
+
+            # back off while nothing happens, poll quickly again on progress
+            if changes:
+                last_progress = now
+                interval = self.initial_interval
+            else:
+                interval = min(interval * self.backoff, self.max_interval)
+
+            if now - last_progress > self.timeout:
+                return None
+
+            self.sleep(interval)
@@ -0,0 +1,304 @@
+import os
+import copy
+import shutil
+import tempfile
+import itertools
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# set to 'local' to run the scripts on this module instead of Ganga
+executor_env_var = 'GENAI_EXECUTOR'
+
+def use_local_executor():
+    """
+    The use_local_executor function tells whether the jobs of this
+    project should run on the local executor instead of Ganga.
+
+    :return: True if GENAI_EXECUTOR is set to 'local'
+    """
+    return os.getenv(executor_env_var) == 'local'
+
+def get_workspace():
+    """
+    The get_workspace function returns the folder that holds the input
+    and output directories of the local jobs, the counterpart of Ganga's
+    gangadir workspace.
+
+    :return: The path of the workspace
+    """
+    return os.getenv('GENAI_LOCAL_WORKSPACE',\
+        os.path.join(tempfile.gettempdir(), f"genai_local_jobs_{os.getuid()}"))
+
+
+class File:
+    """
+    The File class names a file to run as the executable of a job.
+    """
+    def __init__(self, name=''):
+        self.name = name
+
+
+class LocalFile:
+    """
+    The LocalFile class names output files a job keeps in its output
+    directory. Local jobs run in their output directory, so the files
+    are already there.
+    """
+    def __init__(self, namePattern=''):
+        self.namePattern = namePattern
+
+
+class Local:
+    """
+    The Local class runs the subjobs of a job as local processes,
+    at most max_workers of them at a time.
+    """
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers if max_workers else (os.cpu_count() or 1)
+
+
+class Executable:
+    """
+    The Executable class runs a command with arguments. Like Ganga's
+    Executable, it echoes 'Hello World' by default.
+    """
+    def __init__(self, exe='echo', args=None, env=None):
+        self.exe = exe
+        self.args = ['Hello World'] if args is None else args
+        self.env = env if env else {}
+
+
+class ArgSplitter:
+    """
+    The ArgSplitter class creates one subjob per list of arguments.
+    """
+    def __init__(self, args=None):
+        self.args = args if args else []
+
+    def split(self, job):
+        """
+        The split method creates the applications of the subjobs.
+
+        :param job: the master job
+        :return: A list of applications, one per subjob
+        """
+        applications = []
+        for args in self.args:
+            application = copy.deepcopy(job.application)
+            application.args = list(args)
+            applications.append(application)
+
+        return applications
+
+
+class TextMerger:
+    """
+    The TextMerger class concatenates an output file of every subjob into
+    the output directory of the master job. Every part starts with a
+    header line beginning with '#', as in Ganga's merged files.
+    """
+    def __init__(self, files=None):
+        self.files = files if files else []
+
+    def merge(self, job):
+        """
+        The merge method merges the files of the completed subjobs.
+
+        :param job: the master job
+        """
+        for name in self.files:
+            with open(os.path.join(job.outputdir, name), 'w') as merged:
+                for subjob in job.subjobs:
+                    part = os.path.join(subjob.outputdir, name)
+                    merged.write(f"# Start of file {part}\n")
+                    if os.path.exists(part):
+                        with open(part, 'r') as f:
+                            shutil.copyfileobj(f, merged)
+                    merged.write(f"# End of file {part}\n")
+
+
+class JobRegistry:
+    """
+    The JobRegistry class keeps the jobs of this process, so that
+    jobs(id) works as in the Ganga prompt.
+    """
+    def __init__(self):
+        self.jobs = {}
+        self.ids = itertools.count()
+
+    def __call__(self, job_id):
+        return self.jobs[job_id]
+
+    def __iter__(self):
+        return iter(self.jobs.values())
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add(self, job):
+        """
+        The add method registers a job and gives it the next free id,
+        skipping ids whose workspace folders are still in use.
+
+        :param job: the job to register
+        :return: The id of the job
+        """
+        job_id = next(self.ids)
+        while os.path.exists(os.path.join(get_workspace(), str(job_id))):
+            job_id = next(self.ids)
+
+        self.jobs[job_id] = job
+
+        return job_id
+
+jobs = JobRegistry()
+
+
+class Job:
+    """
+    The Job class is a lightweight stand-in for the part of Ganga's Job
+    that this project uses. Submitting a job runs its subjobs as local
+    processes on a thread pool, without Ganga's registry or monitoring
+    thread. The status is updated by the pool itself, so it can be read
+    at any time, and the output directories follow Ganga's layout.
+    """
+    def __init__(self, name='', backend=None, application=None, splitter=None, master=None, subjob_id=None):
+        self.name = name
+        self.backend = backend if backend else Local()
+        self.application = application if application else Executable()
+        self.splitter = splitter
+        self.postprocessors = []
+        self.outputfiles = []
+        self.subjobs = []
+        self.master = master
+        self.status = 'new'
+
+        if master is None:
+            self.id = jobs.add(self)
+            job_dir = os.path.join(get_workspace(), str(self.id))
+        else:
+            self.id = subjob_id
+            job_dir = os.path.join(get_workspace(), str(master.id), str(subjob_id))
+
+        # a trailing separator, as in Ganga
+        self.inputdir = os.path.join(job_dir, 'input', '')
+        self.outputdir = os.path.join(job_dir, 'output', '')
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._done = threading.Event()
+
+    def submit(self):
+        """
+        The submit method creates the subjobs and starts running them.
+        It returns as soon as every subjob has been queued.
+
+        :return: The job
+        """
+        if self.status != 'new':
+            raise RuntimeError(f"Job {self.id} has already been submitted")
+
+        # copy the executable into the input sandbox, as Ganga does, so
+        # that the job doesn't depend on the file after submission
+        if isinstance(self.application.exe, File):
+            os.makedirs(self.inputdir, exist_ok=True)
+            sandbox_exe = os.path.join(self.inputdir, os.path.basename(self.application.exe.name))
+            shutil.copy2(self.application.exe.name, sandbox_exe)
+            self.application.exe = File(sandbox_exe)
+
+        if self.splitter:
+            self.subjobs = [Job(name=self.name, backend=self.backend, application=application,\
+                                master=self, subjob_id=subjob_id)
+                            for subjob_id, application in enumerate(self.splitter.split(self))]
+        units = self.subjobs if self.subjobs else [self]
+
+        for job in [self] + self.subjobs:
+            os.makedirs(job.inputdir, exist_ok=True)
+            os.makedirs(job.outputdir, exist_ok=True)
+            job.status = 'submitted'
+
+        self._pending = len(units)
+        executor = ThreadPoolExecutor(max_workers=min(self.backend.max_workers, len(units)))
+        for unit in units:
+            executor.submit(self._run, unit)
+        executor.shutdown(wait=False)
+
+        return self
+
+    def _run(self, unit):
+        """
+        The _run method runs the application of one subjob, or of a job
+        without subjobs, and finishes the master job after the last one.
+        """
+        unit.status = 'running'
+        exe = unit.application.exe
+        command = [exe.name if isinstance(exe, File) else exe] + [str(arg) for arg in unit.application.args]
+
+        try:
+            with open(os.path.join(unit.outputdir, 'stdout'), 'w') as stdout,\
+                 open(os.path.join(unit.outputdir, 'stderr'), 'w') as stderr:
+                process = subprocess.run(command, stdout=stdout, stderr=stderr, cwd=unit.outputdir,\
+                    env=dict(os.environ, **unit.application.env))
+            status = 'completed' if process.returncode == 0 else 'failed'
+        except OSError as error:
+            with open(os.path.join(unit.outputdir, 'stderr'), 'a') as stderr:
+                stderr.write(f"{error}\n")
+            status = 'failed'
+
+        if unit is not self:
+            unit.status = status
+
+        with self._lock:
+            self._pending -= 1
+            finished = self._pending == 0
+
+        if finished:
+            self._finish(status)
+
+    def _finish(self, status):
+        """
+        The _finish method runs the postprocessors and sets the final
+        status of the master job.
+        """
+        if self.subjobs:
+            status = 'completed' if all(subjob.status == 'completed' for subjob in self.subjobs) else 'failed'
+
+        if status == 'completed':
+            try:
+                for postprocessor in self.postprocessors:
+                    postprocessor.merge(self)
+            except OSError:
+                status = 'failed'
+
+        self.status = status
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """
+        The wait method blocks until the job has finished.
+
+        :param timeout: maximum time to wait in seconds
+        :return: The final status of the job, or None on timeout
+        """
+        if not self._done.wait(timeout):
+            return None
+
+        return self.status
+
+    def peek(self, filename='stdout'):
+        """
+        The peek method prints an output file of the job.
+
+        :param filename: the name of the file in the output directory
+        """
+        with open(os.path.join(self.outputdir, filename), 'r') as f:
+            print(f.read())
+
+    def remove(self):
+        """
+        The remove method deletes the job and its workspace folder.
+        """
+        if self.master is None:
+            shutil.rmtree(os.path.join(get_workspace(), str(self.id)), ignore_errors=True)
+            jobs.jobs.pop(self.id, None)
@@ -0,0 +1,74 @@
+from collections import deque
+
+class TermMatcher:
+    """
+    The TermMatcher class counts many words and multi-word phrases in a
+    single pass over the tokens of a text. It is an Aho-Corasick automaton
+    whose alphabet is tokens rather than characters: the terms are stored
+    in a trie of token sequences, and failure links let the matcher carry
+    on after a partial phrase match without going back in the text.
+    Overlapping matches are all counted, so a single-word term is counted
+    exactly like Counter(tokens)[word].
+    """
+    def __init__(self, terms, tokenize=str.split):
+        self.terms = list(terms)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for term_index, term in enumerate(self.terms):
+            tokens = tokenize(term)
+            # a term without tokens can never match
+            if not tokens:
+                continue
+
+            state = 0
+            for token in tokens:
+                if token not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][token] = len(self.goto) - 1
+                state = self.goto[state][token]
+            self.output[state].append(term_index)
+
+        self.build_failure_links()
+
+    def build_failure_links(self):
+        """
+        The build_failure_links method links every state to the state of
+        the longest proper suffix of its token sequence that is also in
+        the trie, and merges the outputs along those links.
+        """
+        queue = deque(self.goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self.goto[state].items():
+                queue.append(next_state)
+
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(token, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def count(self, tokens):
+        """
+        The count method counts every term in a sequence of tokens.
+
+        :param tokens: an iterable of normalized tokens
+        :return: A list with the count of each term, in the order given
+        """
+        counts = [0] * len(self.terms)
+        goto, fail, output = self.goto, self.fail, self.output
+
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for term_index in output[state]:
+                counts[term_index] += 1
+
+        return counts
@@ -0,0 +1,175 @@
+import os
+import sys
+import mmap
+import resource
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+# read-only mappings set up by a parent process before forking its workers
+shared_pdfs = {}
+
+@contextmanager
+def open_pdf(file, use_mmap=True):
+    """
+    The open_pdf function opens a PDF file for PdfReader as a read-only
+    memory-mapped buffer. The mapped pages live in the page cache, so
+    every process that maps the same file (or is forked from one that
+    did) shares them instead of buffering its own copy of the file.
+    An already open file object or buffer is passed through untouched,
+    and so is a file that the parent process shared with share_pdf.
+
+    :param file: path of the PDF file, or an already open buffer
+    :param use_mmap: map the file; if False, yield a plain file object
+    :return: A readable, seekable buffer for PdfReader
+    """
+    if not isinstance(file, (str, bytes, os.PathLike)):
+        yield file
+        return
+
+    if file in shared_pdfs:
+        yield shared_pdfs[file]
+        return
+
+    with open(file, 'rb') as pdf:
+        if not use_mmap:
+            yield pdf
+            return
+        # the mapping stays valid after the file descriptor is closed
+        buffer = mmap.mmap(pdf.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        yield buffer
+    finally:
+        buffer.close()
+
+@contextmanager
+def share_pdf(file):
+    """
+    The share_pdf function maps a PDF file once in the parent process.
+    Workers forked while it is active get the same mapping back from
+    open_pdf instead of mapping the file themselves.
+
+    :param file: path of the PDF file
+    :return: The shared read-only buffer
+    """
+    with open_pdf(file) as pdf:
+        shared_pdfs[file] = pdf
+        try:
+            yield pdf
+        finally:
+            del shared_pdfs[file]
+
+def fork_pool(workers):
+    """
+    The fork_pool function creates a process pool whose workers are
+    forked, so that they inherit shared mappings and don't re-import
+    the calling script and retrigger its autorun.
+
+    :param workers: number of worker processes
+    :return: A ProcessPoolExecutor
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+
+def split_page_ranges(number_of_pages, workers):
+    """
+    The split_page_ranges function divides the pages of a document into
+    contiguous, near-equal ranges, one per worker.
+    
+    :param number_of_pages: total number of pages in the PDF
+    :param workers: number of workers to split the pages across
+    :return: A list of (start, stop) tuples, stop being exclusive
+    """
+    workers = max(1, min(workers, number_of_pages))
+    pages_per_worker, remainder = divmod(number_of_pages, workers)
+
+    ranges = []
+    start = 0
+    for worker in range(workers):
+        stop = start + pages_per_worker + (1 if worker < remainder else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+
+    return ranges
+
+def peak_rss_mb():
+    """
+    The peak_rss_mb function returns the peak resident set size of the
+    calling process.
+
+    :return: Peak memory usage in megabytes
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS reports bytes
+    if sys.platform == 'darwin':
+        return peak_rss / (1024 * 1024)
+
+    return peak_rss / 1024
+
+def read_memory_status(field):
+    """
+    The read_memory_status function reads a memory field of the calling
+    process from /proc/self/status, e.g. VmRSS or VmHWM.
+
+    :param field: the name of the field
+    :return: The value in megabytes, or None where /proc is not available
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    return None
+
+def reset_peak_rss():
+    """
+    The reset_peak_rss function resets the peak resident set size of the
+    calling process to its current size, which Linux allows through
+    /proc/self/clear_refs. The lifetime peak of getrusage is reset too,
+    so only worker processes should call it.
+
+    :return: True if the peak was reset
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+
+    return read_memory_status('VmHWM') is not None
+
+@contextmanager
+def track_memory(reset_peak=False):
+    """
+    The track_memory function measures the memory that a block of code
+    adds to the calling process. A forked worker starts out with the
+    resident pages and the peak of its parent, so a worker resets its
+    peak and measures from its resident set, where Linux allows it.
+    Otherwise the block is measured by the growth of the lifetime peak,
+    which is a lower bound.
+
+    :param reset_peak: reset the peak of the process, for worker processes
+    :return: A dictionary filled in when the block ends, with the
+             resident set size, or the lifetime peak, at its start, the
+             peak during the block and the increase of the peak over the
+             start, in megabytes
+    """
+    stats = {}
+    if reset_peak and reset_peak_rss():
+        start_rss = read_memory_status('VmRSS')
+        read_peak = lambda: read_memory_status('VmHWM')
+    else:
+        start_rss = peak_rss_mb()
+        read_peak = peak_rss_mb
+
+    try:
+        yield stats
+    finally:
+        peak_rss = read_peak()
+        stats.update({'start_rss_mb': start_rss, 'peak_rss_mb': peak_rss,\
+                      'peak_increase_mb': max(0.0, peak_rss - start_rss)})
@@ -0,0 +1,216 @@
+import os
+import json
+import hashlib
+from pypdf import PdfReader, PageObject
+from pypdf.generic import IndirectObject
+
+try:
+    from genai.pdf_io import open_pdf
+except ImportError:
+    # run as a script from the genai directory
+    from pdf_io import open_pdf
+
+manifest_version = 2
+manifest_dir_env_var = 'GENAI_MANIFEST_DIR'
+# next to the scripts, i.e. in the work directory of the job and its subjobs
+manifest_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdf_manifests')
+
+# page attributes a page may inherit from its ancestors in the page tree
+inheritable_attributes = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+def get_manifest_path(file):
+    """
+    The get_manifest_path function returns where the manifest of a PDF
+    file is stored: in the manifest folder of the work directory, or in
+    $GENAI_MANIFEST_DIR, so that directories of input PDF files are
+    never written to. The name includes a hash of the absolute path of
+    the PDF file, so files with the same name don't share a manifest.
+
+    :param file: path of the PDF file
+    :return: The path of the manifest file
+    """
+    path_hash = hashlib.sha256(os.path.abspath(file).encode()).hexdigest()[:16]
+
+    return os.path.join(os.getenv(manifest_dir_env_var, manifest_folder),\
+                        f"{os.path.basename(file)}.{path_hash}.manifest.json")
+
+def get_stream_length(stream):
+    """
+    The get_stream_length function returns the decoded length of a
+    content stream, i.e. the number of bytes the text extraction has
+    to interpret.
+
+    :param stream: a content stream, or an indirect reference to one
+    :return: The length of the stream in bytes
+    """
+    return len(stream.get_object().get_data())
+
+def get_content_size(page):
+    """
+    The get_content_size function adds up the lengths of the content
+    streams of a page, a cheap estimate of its text extraction cost.
+
+    :param page: the raw page dictionary
+    :return: The total length of the page's content streams in bytes
+    """
+    contents = page.get('/Contents')
+    if contents is None:
+        return 0
+
+    contents = contents.get_object()
+    if isinstance(contents, list):
+        return sum(get_stream_length(stream) for stream in contents)
+
+    return get_stream_length(contents)
+
+def walk_page_tree(node, inherited, pages):
+    """
+    The walk_page_tree function collects the leaf pages of a page tree
+    in document order. It records whether a page relies on attributes
+    inherited from its ancestors, since such a page cannot be loaded
+    on its own.
+
+    :param node: a page tree node, or an indirect reference to one
+    :param inherited: inheritable attributes set by the ancestors
+    :param pages: list that receives (reference, page, inherits) tuples
+    """
+    reference = node if isinstance(node, IndirectObject) else None
+    node = node.get_object()
+
+    if '/Kids' in node:
+        inherited = inherited | {attr for attr in inheritable_attributes if attr in node}
+        for kid in node['/Kids']:
+            walk_page_tree(kid, inherited, pages)
+    else:
+        pages.append((reference, node, any(attr not in node for attr in inherited)))
+
+def build_manifest(file):
+    """
+    The build_manifest function scans a PDF file once and records what
+    the splitter, the counter and the page splitter need to plan their
+    work: the page count, the content-stream size of every page, a hash
+    of the file content and the object number of every page, so that
+    pages can later be loaded without walking the page tree.
+
+    :param file: path of the PDF file
+    :return: The manifest as a dictionary
+    """
+    stat = os.stat(file)
+
+    with open_pdf(file) as pdf:
+        content_hash = hashlib.sha256(pdf).hexdigest()
+        reader = PdfReader(pdf)
+
+        page_tree = []
+        walk_page_tree(reader.trailer['/Root'].get_object()['/Pages'], frozenset(), page_tree)
+
+        pages = []
+        for page_num, (reference, page, inherits) in enumerate(page_tree):
+            if reference is not None:
+                obj = [reference.idnum, reference.generation]
+            else:
+                # inline page dictionary, can only be reached through the page tree
+                obj, inherits = None, True
+
+            pages.append({
+                'page': page_num,
+                'object': obj,
+                'content_size': get_content_size(page),
+                'inherits': inherits,
+            })
+
+    return {
+        'version': manifest_version,
+        'file_size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'content_hash': content_hash,
+        'page_count': len(pages),
+        'pages': pages,
+    }
+
+def is_manifest_current(manifest, file):
+    """
+    The is_manifest_current function checks that a manifest still
+    describes the PDF file, i.e. the file has not changed since.
+
+    :param manifest: a manifest dictionary
+    :param file: path of the PDF file
+    :return: True if the manifest can be used for the file
+    """
+    stat = os.stat(file)
+
+    return manifest.get('version') == manifest_version and\
+        manifest.get('file_size') == stat.st_size and\
+        manifest.get('mtime_ns') == stat.st_mtime_ns
+
+def save_manifest(manifest, file):
+    """
+    The save_manifest function stores the manifest of a PDF file in the
+    manifest folder. The manifest is a cache, so failing to write it is
+    not an error; a partly written temporary file is removed.
+
+    :param manifest: the manifest dictionary
+    :param file: path of the PDF file
+    :return: The path of the manifest file, or None if it was not written
+    """
+    manifest_path = get_manifest_path(file)
+    temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+
+    try:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(temp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, manifest_path)
+    except OSError:
+        return None
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return manifest_path
+
+def load_manifest(file, build=True):
+    """
+    The load_manifest function returns the manifest of a PDF file. A
+    stored manifest is used if it is still current; otherwise a new one
+    is built and stored, unless build is False.
+
+    :param file: path of the PDF file
+    :param build: build the manifest if there is no current one
+    :return: The manifest dictionary, or None
+    """
+    try:
+        with open(get_manifest_path(file), 'r') as f:
+            manifest = json.load(f)
+        if is_manifest_current(manifest, file):
+            return manifest
+    except (OSError, ValueError):
+        pass
+
+    if not build:
+        return None
+
+    manifest = build_manifest(file)
+    save_manifest(manifest, file)
+
+    return manifest
+
+def load_page(reader, manifest, page_num):
+    """
+    The load_page function returns a page of a PDF file. With a manifest,
+    a page that does not inherit attributes is looked up by its object
+    number in the cross-reference table that the reader has already
+    parsed, without walking the page tree of the whole document.
+
+    :param reader: the PdfReader of the PDF file
+    :param manifest: the manifest of the PDF file, or None
+    :param page_num: the page number, starting at 0
+    :return: A pypdf page object
+    """
+    if manifest:
+        page = manifest['pages'][page_num]
+        if not page['inherits']:
+            idnum, generation = page['object']
+            return PageObject(reader, IndirectObject(idnum, generation, reader))
+
+    return reader.pages[page_num]
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import subprocess
+import numpy as np
+
+try:
+    from genai.local_ganga import use_local_executor
+    from genai.job_wait import JobWaiter
+except ImportError:
+    # run as a script from the genai directory
+    from local_ganga import use_local_executor
+    from job_wait import JobWaiter
+
+# the task given to the LLM in run_InterfaceGanga.py
+total_samples = 1000000
+samples_per_subjob = 1000
+default_seed = 20240101
+# samples drawn at a time, which bounds the memory of a subjob
+chunk_size = 1 << 20
+pi_benchmark_file = 'pi_benchmark.json'
+
+def get_generator(seed, subjob_index):
+    """
+    The get_generator function returns the random generator of a subjob.
+    The seed sequence of subjob i is the i-th child that
+    SeedSequence(seed).spawn would create, so the streams of the subjobs
+    are independent and every subjob can build its own without the others.
+
+    :param seed: the seed of the whole job
+    :param subjob_index: the index of the subjob
+    :return: A NumPy Generator
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(subjob_index,)))
+
+def count_hits(samples, seed=default_seed, subjob_index=0, chunk=chunk_size):
+    """
+    The count_hits function draws random points in the unit square and
+    counts the ones that fall inside the quarter circle, the accept-reject
+    step of the Monte Carlo estimate of pi. The points are drawn in chunks
+    of NumPy arrays, so the memory stays bounded for any number of samples.
+
+    :param samples: the number of points
+    :param seed: the seed of the whole job
+    :param subjob_index: the index of the subjob
+    :param chunk: the number of points drawn at a time
+    :return: A tuple of the hits and the number of points
+    """
+    generator = get_generator(seed, subjob_index)
+    hits, remaining = 0, samples
+
+    while remaining > 0:
+        size = min(chunk, remaining)
+        x = generator.random(size)
+        y = generator.random(size)
+        hits += int(np.count_nonzero(x * x + y * y <= 1.0))
+        remaining -= size
+
+    return hits, samples
+
+def estimate_pi_python(samples, seed=default_seed):
+    """
+    The estimate_pi_python function is the plain Python loop that LLMs
+    usually write for this task, kept as a baseline for the benchmark.
+
+    :param samples: the number of points
+    :param seed: the seed of the random module
+    :return: A tuple of the hits and the number of points
+    """
+    generator = random.Random(seed)
+    hits = 0
+    for _ in range(samples):
+        x, y = generator.random(), generator.random()
+        if x * x + y * y <= 1.0:
+            hits += 1
+
+    return hits, samples
+
+def get_splitter_args(samples=total_samples, per_subjob=samples_per_subjob, seed=default_seed, script=None):
+    """
+    The get_splitter_args function returns the ArgSplitter arguments of a
+    job that draws the samples in subjobs of per_subjob points each; the
+    last subjob draws what is left.
+
+    :param samples: the number of points of the whole job
+    :param per_subjob: the number of points of a subjob
+    :param seed: the seed of the whole job
+    :param script: the path of this script, to run it with python3
+    :return: A list of argument lists, one per subjob
+    """
+    args = []
+    for subjob_index, start in enumerate(range(0, samples, per_subjob)):
+        subjob_args = [str(min(per_subjob, samples - start)), str(seed), str(subjob_index)]
+        args.append([script] + subjob_args if script else subjob_args)
+
+    return args
+
+def merge_hits(lines):
+    """
+    The merge_hits function combines the output of the subjobs, e.g. the
+    stdout merged by TextMerger. The hits and the points are added up
+    before pi is estimated, so subjobs of different sizes are weighted
+    correctly, which averaging their estimates would not do. Other
+    output of a subjob, e.g. a warning, is skipped and counted.
+
+    :param lines: lines of 'hits<TAB>samples'; header lines starting with '#' are skipped
+    :return: A dictionary with the hits, the points, the subjobs, the
+             estimate of pi, its standard error and the number of
+             skipped lines that are not two integers
+    """
+    hits, samples, subjobs, skipped_lines = 0, 0, 0, 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fields = line.split()
+        if len(fields) != 2 or not all(re.fullmatch(r'\d+', field) for field in fields):
+            skipped_lines += 1
+            continue
+        hits += int(fields[0])
+        samples += int(fields[1])
+        subjobs += 1
+
+    if not samples:
+        return {'hits': 0, 'samples': 0, 'subjobs': subjobs, 'pi': None, 'standard_error': None,
+                'skipped_lines': skipped_lines}
+
+    accepted = hits / samples
+
+    return {
+        'hits': hits,
+        'samples': samples,
+        'subjobs': subjobs,
+        'pi': 4 * accepted,
+        'standard_error': 4 * math.sqrt(accepted * (1 - accepted) / samples),
+        'skipped_lines': skipped_lines,
+    }
+
+def submit_pi_job(samples=total_samples, per_subjob=samples_per_subjob, seed=default_seed):
+    """
+    The submit_pi_job function submits the Monte Carlo estimate of pi as
+    a job with a subjob per per_subjob points, split with ArgSplitter and
+    merged with TextMerger, as the LLM is asked to do. It runs on Ganga,
+    or on the local executor with GENAI_EXECUTOR=local.
+
+    :param samples: the number of points of the whole job
+    :param per_subjob: the number of points of a subjob
+    :param seed: the seed of the whole job
+    :return: The job
+    """
+    if use_local_executor():
+        try:
+            from genai.local_ganga import Job, Local, Executable, ArgSplitter, TextMerger
+        except ImportError:
+            from local_ganga import Job, Local, Executable, ArgSplitter, TextMerger
+    else:
+        from ganga.ganga import ganga
+        from ganga import Job, Local, Executable, ArgSplitter, TextMerger
+
+    j = Job(name='pi_estimator', backend=Local())
+    j.application = Executable()
+    j.application.exe = 'python3'
+    j.splitter = ArgSplitter(args=get_splitter_args(samples, per_subjob, seed, os.path.abspath(__file__)))
+    j.postprocessors.append(TextMerger(files=['stdout']))
+    j.submit()
+
+    return j
+
+def merge_job(job):
+    """
+    The merge_job function estimates pi from the merged stdout of a job.
+
+    :param job: the finished job
+    :return: The result of merge_hits
+    """
+    with open(os.path.join(job.outputdir, 'stdout'), 'r') as f:
+        return merge_hits(f)
+
+def run_generated_script(script, timeout=600):
+    """
+    The run_generated_script function runs a pi script written by the LLM
+    and reads its estimate, the last number with a decimal point that it
+    prints.
+
+    :param script: the path of the script
+    :param timeout: the time limit in seconds
+    :return: A tuple of the estimate, or None, and the wall time
+    """
+    start_time = time.perf_counter()
+    try:
+        process = subprocess.run([sys.executable, script], capture_output=True, text=True, timeout=timeout)
+        output = process.stdout
+    except subprocess.TimeoutExpired:
+        output = ''
+    seconds = time.perf_counter() - start_time
+
+    numbers = re.findall(r'\d+\.\d+', output)
+
+    return (float(numbers[-1]) if numbers else None), seconds
+
+def benchmark_pi(samples=total_samples, generated_scripts=None, seed=default_seed, output_file=pi_benchmark_file):
+    """
+    The benchmark_pi function compares the throughput and the error of the
+    NumPy reference with the plain Python loop and with the pi scripts
+    generated by the LLM. The generated scripts choose their own number
+    of points, so their throughput is only comparable if they draw as
+    many as the reference.
+
+    :param samples: the number of points of the reference runs
+    :param generated_scripts: paths of LLM-generated pi scripts
+    :param seed: the seed of the reference runs
+    :param output_file: the JSON file to write, or None
+    :return: A dictionary of results by implementation
+    """
+    results = {}
+    for name, function in [('numpy_reference', count_hits), ('python_loop', estimate_pi_python)]:
+        start_time = time.perf_counter()
+        hits, _ = function(samples, seed)
+        seconds = time.perf_counter() - start_time
+        results[name] = {
+            'samples': samples,
+            'seconds': seconds,
+            'samples_per_second': samples / seconds if seconds else None,
+            'pi': 4 * hits / samples,
+            'error': abs(4 * hits / samples - math.pi),
+        }
+
+    for script in generated_scripts if generated_scripts else []:
+        estimate, seconds = run_generated_script(script)
+        results[os.path.basename(script)] = {
+            'seconds': seconds,
+            'pi': estimate,
+            'error': abs(estimate - math.pi) if estimate is not None else None,
+            'slowdown': seconds / results['numpy_reference']['seconds'] if results['numpy_reference']['seconds'] else None,
+        }
+
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return results
+
+def execute_script():
+    """
+    The execute_script function runs a subjob, submits the whole job or
+    runs the benchmark:
+        python3 pi_estimator.py SAMPLES SEED SUBJOB_INDEX
+        python3 pi_estimator.py --submit [SAMPLES [PER_SUBJOB [SEED]]]
+        python3 pi_estimator.py --benchmark [GENERATED_SCRIPT ...]
+    """
+    if len(sys.argv) > 1 and sys.argv[1] == '--submit':
+        options = [int(value) for value in sys.argv[2:5]]
+        job = submit_pi_job(*options)
+        status = JobWaiter(job).wait()
+        if status != 'completed':
+            print(f"Job finished with status '{status}'.")
+            sys.exit(1)
+        result = merge_job(job)
+        if result['skipped_lines']:
+            print(f"WARNING: Skipped {result['skipped_lines']} lines of the merged output that are not hits and points.")
+        if result['pi'] is None:
+            print("The merged output does not contain any hits.")
+            sys.exit(1)
+        print(f"pi = {result['pi']:.6f} +/- {result['standard_error']:.6f} from {result['samples']} points \
+in {result['subjobs']} subjobs")
+    elif len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        results = benchmark_pi(generated_scripts=sys.argv[2:])
+        for name, result in results.items():
+            estimate = f"pi = {result['pi']:.6f}" if result['pi'] is not None else 'no estimate'
+            print(f"{name}: {result['seconds']:.3f} s, {estimate}")
+        print(f"\nThe results have been stored in: {pi_benchmark_file}")
+    elif len(sys.argv) == 4:
+        hits, samples = count_hits(int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]))
+        print(f"{hits}\t{samples}")
+    else:
+        print("Usage: python3 pi_estimator.py SAMPLES SEED SUBJOB_INDEX")
+        print("       python3 pi_estimator.py --submit [SAMPLES [PER_SUBJOB [SEED]]]")
+        print("       python3 pi_estimator.py --benchmark [GENERATED_SCRIPT ...]")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    execute_script()
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import platform
+
+try:
+    from genai.backends import get_library_version
+except ImportError:
+    # run as a script from the genai directory
+    from backends import get_library_version
+
+# fastest first is not known in advance, it depends on the host
+candidate_dtypes = ('bfloat16', 'float16', 'float32')
+dtype_env_var = 'GENAI_DTYPE'
+precision_cache_env_var = 'GENAI_PRECISION_CACHE'
+# relative error of a matmul against float32 that a dtype may have
+max_relative_error = 1e-2
+
+def check_dtype(dtype_name):
+    """
+    The check_dtype function makes sure a forced precision, e.g. from
+    $GENAI_DTYPE, names one of the candidate dtypes before it is looked
+    up in torch.
+
+    :param dtype_name: the name of the dtype
+    :return: The name of the dtype
+    """
+    if dtype_name not in candidate_dtypes:
+        raise ValueError(f"Unknown dtype '{dtype_name}', expected one of {candidate_dtypes}")
+
+    return dtype_name
+
+def get_precision_cache_path():
+    """
+    The get_precision_cache_path function returns where the probe results
+    are kept, $GENAI_PRECISION_CACHE or ~/.cache/genai/precision.json.
+
+    :return: The path of the cache file
+    """
+    return os.getenv(precision_cache_env_var,\
+        os.path.join(os.path.expanduser('~'), '.cache', 'genai', 'precision.json'))
+
+def get_cpu_model():
+    """
+    The get_cpu_model function reads the name of the CPU, which tells
+    e.g. whether it has native bfloat16 instructions.
+
+    :return: The CPU model name
+    """
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+
+    return platform.processor() or platform.machine()
+
+def get_host_key(device='cpu'):
+    """
+    The get_host_key function names the machine and device a probe ran on.
+    A new torch version can change the kernels, so it is part of the key.
+
+    :param device: 'cpu' or 'cuda'
+    :return: The key of the host
+    """
+    return f"{platform.node()}|{get_cpu_model()}|{os.cpu_count()} cores|torch {get_library_version('torch')}|{device}"
+
+def probe_dtype(dtype_name, device='cpu', size=512, repeats=5):
+    """
+    The probe_dtype function measures the matmul throughput of a dtype on
+    this host and its error against a float32 matmul of the same inputs.
+
+    :param dtype_name: the name of a torch dtype, e.g. 'bfloat16'
+    :param device: 'cpu' or 'cuda'
+    :param size: the size of the square matrices
+    :param repeats: the number of timed matmuls
+    :return: A dictionary with the GFLOPS and the relative error, or None
+             if the dtype isn't supported on the device
+    """
+    import torch
+
+    dtype = getattr(torch, dtype_name)
+    generator = torch.Generator().manual_seed(0)
+    a = torch.randn(size, size, generator=generator).to(device)
+    b = torch.randn(size, size, generator=generator).to(device)
+    reference = a @ b
+
+    try:
+        a_dtype, b_dtype = a.to(dtype), b.to(dtype)
+        # warm-up, e.g. to pick the kernel
+        result = a_dtype @ b_dtype
+        if device == 'cuda':
+            torch.cuda.synchronize()
+
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            result = a_dtype @ b_dtype
+        if device == 'cuda':
+            torch.cuda.synchronize()
+        seconds = time.perf_counter() - start_time
+    except (RuntimeError, TypeError):
+        return None
+
+    error = (torch.linalg.norm(reference - result.float()) / torch.linalg.norm(reference)).item()
+
+    return {'gflops': 2 * size ** 3 * repeats / max(seconds, 1e-9) / 1e9, 'relative_error': error}
+
+def choose_dtype(results, max_error=max_relative_error):
+    """
+    The choose_dtype function picks the fastest dtype whose error is
+    acceptable. float32 is the fallback if no probe succeeded.
+
+    :param results: dictionary of probe results by dtype name
+    :param max_error: the largest acceptable relative error
+    :return: The name of the dtype
+    """
+    accurate = {dtype: result for dtype, result in results.items()
+                if result and result['relative_error'] <= max_error}
+    if not accurate:
+        return 'float32'
+
+    return max(accurate, key=lambda dtype: accurate[dtype]['gflops'])
+
+def load_precision_cache(cache_path):
+    """
+    The load_precision_cache function reads the probe results of every
+    host seen so far. A missing or unreadable cache is an empty one.
+
+    :param cache_path: path of the cache file
+    :return: A dictionary of probe results by host key
+    """
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    return cache if isinstance(cache, dict) else {}
+
+def get_best_dtype(device='cpu', cache_path=None, force=False, probe=probe_dtype):
+    """
+    The get_best_dtype function returns the precision to load a model in
+    on this host. $GENAI_DTYPE overrides it. Otherwise, the candidate
+    dtypes are probed once per host and device and the result is cached,
+    so later runs start without probing.
+
+    :param device: 'cpu' or 'cuda'
+    :param cache_path: path of the cache file; defaults to get_precision_cache_path
+    :param force: probe again even if the host is in the cache
+    :param probe: the function that probes a dtype
+    :return: A tuple of the dtype name and the probe results it was chosen from
+    """
+    if os.getenv(dtype_env_var):
+        return check_dtype(os.getenv(dtype_env_var)), {}
+
+    cache_path = cache_path if cache_path else get_precision_cache_path()
+    cache = load_precision_cache(cache_path)
+    host_key = get_host_key(device)
+
+    if not force and host_key in cache:
+        return cache[host_key]['dtype'], cache[host_key]['results']
+
+    results = {dtype: probe(dtype, device) for dtype in candidate_dtypes}
+    dtype = choose_dtype(results)
+    cache[host_key] = {'dtype': dtype, 'results': results, 'probed_at': time.time()}
+
+    # the cache is only an optimization, so failing to write it is not an error
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        with open(temp_path, 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
+
+    return dtype, results
@@ -0,0 +1,157 @@
+import os
+import io
+import glob
+import json
+import time
+import pstats
+import cProfile
+
+try:
+    from genai.pdf_io import peak_rss_mb
+except ImportError:
+    # run as a script from the genai directory
+    from pdf_io import peak_rss_mb
+
+# set to 1 to profile count_it.py and split_pdf.py, e.g. inside subjobs
+profile_env_var = 'GENAI_PROFILE'
+profile_extension = '.prof'
+profile_stats_extension = '.profile.json'
+merged_profile_file = 'merged.prof'
+profile_report_file = 'profile_report.txt'
+
+def is_profiling_enabled():
+    """
+    The is_profiling_enabled function tells whether profiling was asked
+    for through the GENAI_PROFILE environment variable.
+
+    :return: True if GENAI_PROFILE is set to 1
+    """
+    return os.getenv(profile_env_var) == '1'
+
+def run_profiled(function, name, output_dir=None):
+    """
+    The run_profiled function runs a function, e.g. the execute_script
+    function of a script. With profiling enabled, it runs it under
+    cProfile and writes the profile and the wall time, CPU time and peak
+    memory of the run to the working directory of the subjob, so that
+    they end up next to its stdout.
+
+    :param function: the function to run
+    :param name: the name of the profile files, e.g. the script name
+    :param output_dir: where to write the profile; defaults to the
+                       working directory
+    :return: The return value of the function
+    """
+    if not is_profiling_enabled():
+        return function()
+
+    output_dir = output_dir if output_dir else os.getcwd()
+    profiler = cProfile.Profile()
+    start_time, cpu_start_time = time.perf_counter(), time.process_time()
+
+    profiler.enable()
+    try:
+        return function()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(os.path.join(output_dir, name + profile_extension))
+
+        stats = {
+            'name': name,
+            'wall_seconds': time.perf_counter() - start_time,
+            'cpu_seconds': time.process_time() - cpu_start_time,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        with open(os.path.join(output_dir, name + profile_stats_extension), 'w') as f:
+            json.dump(stats, f)
+
+def find_job_profiles(job):
+    """
+    The find_job_profiles function collects the profiles written by the
+    subjobs of a job, or by the job itself if it has no subjobs.
+
+    :param job: the master job
+    :return: A tuple of the lists of profile files and run statistics files
+    """
+    output_dirs = [subjob.outputdir for subjob in job.subjobs] if job.subjobs else [job.outputdir]
+
+    profiles, stats_files = [], []
+    for output_dir in output_dirs:
+        profiles.extend(sorted(glob.glob(os.path.join(output_dir, '*' + profile_extension))))
+        stats_files.extend(sorted(glob.glob(os.path.join(output_dir, '*' + profile_stats_extension))))
+
+    return profiles, stats_files
+
+def merge_profiles(profiles):
+    """
+    The merge_profiles function adds up the profiles of several runs.
+
+    :param profiles: list of profile files written by run_profiled
+    :return: A pstats.Stats object, or None if there are no profiles
+    """
+    if not profiles:
+        return None
+
+    stats = pstats.Stats(profiles[0], stream=io.StringIO())
+    for profile in profiles[1:]:
+        stats.add(profile)
+
+    return stats
+
+def summarize_runs(stats_files):
+    """
+    The summarize_runs function adds up the wall time, CPU time and peak
+    memory of the profiled runs.
+
+    :param stats_files: list of run statistics files written by run_profiled
+    :return: A dictionary with the totals and the slowest run
+    """
+    runs = []
+    for stats_file in stats_files:
+        with open(stats_file, 'r') as f:
+            runs.append(dict(json.load(f), file=stats_file))
+
+    slowest = max(runs, key=lambda run: run['wall_seconds'], default=None)
+
+    return {
+        'runs': len(runs),
+        'wall_seconds': sum(run['wall_seconds'] for run in runs),
+        'cpu_seconds': sum(run['cpu_seconds'] for run in runs),
+        'max_wall_seconds': slowest['wall_seconds'] if slowest else 0,
+        'slowest_run': slowest['file'] if slowest else None,
+        'max_peak_rss_mb': max((run['peak_rss_mb'] for run in runs), default=0),
+    }
+
+def write_profile_report(job, top=30):
+    """
+    The write_profile_report function merges the profiles of every subjob
+    of a job into a single profile and a hot-function report, both stored
+    in the output directory of the job.
+
+    :param job: the master job
+    :param top: the number of functions to list
+    :return: The path of the report, or None if no profile was found
+    """
+    profiles, stats_files = find_job_profiles(job)
+    stats = merge_profiles(profiles)
+    if stats is None:
+        return None
+
+    stats.dump_stats(os.path.join(job.outputdir, merged_profile_file))
+    summary = summarize_runs(stats_files)
+
+    report = io.StringIO()
+    report.write(f"Profiled runs: {summary['runs']}\n")
+    report.write(f"Total wall time: {summary['wall_seconds']:.3f} s, total CPU time: {summary['cpu_seconds']:.3f} s\n")
+    report.write(f"Slowest run: {summary['max_wall_seconds']:.3f} s ({summary['slowest_run']})\n")
+    report.write(f"Highest peak RSS: {summary['max_peak_rss_mb']:.1f} MB\n\n")
+
+    stats.stream = report
+    stats.sort_stats('cumulative').print_stats(top)
+    stats.sort_stats('tottime').print_stats(top)
+
+    report_path = os.path.join(job.outputdir, profile_report_file)
+    with open(report_path, 'w') as f:
+        f.write(report.getvalue())
+
+    return report_path
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+
+result_store_file = '.word_count_results.json'
+
+def get_result_store_path(cur_dir):
+    """
+    The get_result_store_path function returns where the results of the
+    word count jobs are remembered.
+
+    :param cur_dir: the directory the results are stored in
+    :return: The path of the result store
+    """
+    return os.path.join(cur_dir, result_store_file)
+
+def get_result_key(content_hash, word, normalization_version):
+    """
+    The get_result_key function names a word count result. A result only
+    depends on the content of the PDF file, the word and the way the text
+    is normalized before counting.
+
+    :param content_hash: the content hash from the manifest of the PDF file
+    :param word: the word that was counted
+    :param normalization_version: the version of the text normalization
+    :return: The key of the result
+    """
+    return f"{content_hash}:{word}:{normalization_version}"
+
+def load_results(store_path):
+    """
+    The load_results function reads the result store. A missing or
+    unreadable store is an empty one.
+
+    :param store_path: path of the result store
+    :return: A dictionary of results by key
+    """
+    try:
+        with open(store_path, 'r') as f:
+            results = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    return results if isinstance(results, dict) else {}
+
+def is_stale(entry, file, content_hash, word, normalization_version):
+    """
+    The is_stale function tells whether a stored result has been
+    superseded: it was counted for the same file before the file changed,
+    or for the same document and word with an older text normalization.
+
+    :param entry: a stored result
+    :param file: path of the PDF file being counted
+    :param content_hash: its current content hash
+    :param word: the word being counted
+    :param normalization_version: the current version of the text normalization
+    :return: True if the entry can never be used again for this file
+    """
+    if entry.get('file') == file and entry.get('content_hash') != content_hash:
+        return True
+
+    return entry.get('content_hash') == content_hash and entry.get('word') == word and\
+        entry.get('normalization_version') != normalization_version
+
+def lookup_result(store_path, file, content_hash, word, normalization_version):
+    """
+    The lookup_result function looks for the result of a word count that
+    has already been done.
+
+    :param store_path: path of the result store
+    :param file: path of the PDF file
+    :param content_hash: its current content hash
+    :param word: the word to count
+    :param normalization_version: the current version of the text normalization
+    :return: A tuple of the stored result, or None, and the number of
+             stale results found for this query
+    """
+    results = load_results(store_path)
+    stale = sum(is_stale(entry, file, content_hash, word, normalization_version) for entry in results.values())
+
+    return results.get(get_result_key(content_hash, word, normalization_version)), stale
+
+def store_result(store_path, file, content_hash, word, normalization_version, word_count):
+    """
+    The store_result function remembers the result of a word count and
+    drops the results it makes stale. The store is rewritten atomically;
+    it is a cache, so failing to write it is not an error.
+
+    :param store_path: path of the result store
+    :param file: path of the PDF file
+    :param content_hash: its content hash
+    :param word: the word that was counted
+    :param normalization_version: the version of the text normalization
+    :param word_count: the total word count
+    :return: The stored result
+    """
+    results = {key: entry for key, entry in load_results(store_path).items()
+               if not is_stale(entry, file, content_hash, word, normalization_version)}
+
+    entry = {
+        'file': file,
+        'content_hash': content_hash,
+        'word': word,
+        'normalization_version': normalization_version,
+        'word_count': word_count,
+        'stored_at': time.time(),
+    }
+    results[get_result_key(content_hash, word, normalization_version)] = entry
+
+    temp_path = f"{store_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(results, f)
+        os.replace(temp_path, store_path)
+    except OSError:
+        pass
+
+    return entry
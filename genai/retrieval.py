@@ -0,0 +1,365 @@
+import os
+import re
+import sys
+import json
+import numpy as np
+from array import array
+from pypdf import PdfReader
+
+try:
+    from genai.pdf_io import open_pdf
+    from genai.count_it import preprocess_text
+except ImportError:
+    # run as a script from the genai directory
+    from pdf_io import open_pdf
+    from count_it import preprocess_text
+
+index_folder = 'retrieval_index'
+index_info_file = 'index.json'
+chunks_file = 'chunks.jsonl'
+# postings and statistics, loaded as memory-mapped arrays
+index_arrays = ('offsets', 'doc_ids', 'frequencies', 'doc_lengths', 'idf', 'chunk_offsets')
+text_extensions = ('.py', '.sh', '.md', '.txt', '.rst')
+words_per_chunk = 120
+
+def split_words(text, location, chunk_words=words_per_chunk):
+    """
+    The split_words function cuts a text into chunks of about chunk_words
+    words, keeping the original text so that it reads well in a prompt.
+
+    :param text: the text to cut
+    :param location: where the text comes from, e.g. 'page 3'
+    :param chunk_words: the number of words per chunk
+    :return: A generator of (location, chunk text) tuples
+    """
+    words = text.split()
+    for start in range(0, len(words), chunk_words):
+        yield location, ' '.join(words[start:start + chunk_words])
+
+def iter_pdf_chunks(file, chunk_words=words_per_chunk):
+    """
+    The iter_pdf_chunks function extracts the pages of a PDF file one at a
+    time and cuts their text into chunks.
+
+    :param file: path of the PDF file
+    :param chunk_words: the number of words per chunk
+    :return: A generator of (location, chunk text) tuples
+    """
+    with open_pdf(file) as pdf:
+        reader = PdfReader(pdf)
+        for page_num, page in enumerate(reader.pages):
+            yield from split_words(page.extract_text() or '', f"page {page_num}", chunk_words)
+
+def iter_text_chunks(file, chunk_words=words_per_chunk):
+    """
+    The iter_text_chunks function cuts a text file, e.g. a Ganga example
+    script, into chunks of whole paragraphs. A paragraph longer than a
+    chunk is a chunk of its own. Line breaks are kept, so code stays
+    readable.
+
+    :param file: path of the text file
+    :param chunk_words: the number of words per chunk
+    :return: A generator of (location, chunk text) tuples
+    """
+    paragraph, chunk, chunk_line, chunk_size = [], [], 1, 0
+    with open(file, 'r', errors='replace') as f:
+        lines = f.read().splitlines() + ['']
+
+    for line_num, line in enumerate(lines, 1):
+        if line.strip():
+            paragraph.append(line)
+            continue
+        if not paragraph:
+            continue
+
+        size = sum(len(paragraph_line.split()) for paragraph_line in paragraph)
+        if chunk and chunk_size + size > chunk_words:
+            yield f"line {chunk_line}", '\n'.join(chunk)
+            chunk, chunk_size = [], 0
+        if not chunk:
+            chunk_line = line_num - len(paragraph)
+        chunk.extend(paragraph + [''])
+        chunk_size += size
+        paragraph = []
+
+    if chunk:
+        yield f"line {chunk_line}", '\n'.join(chunk).rstrip()
+
+def iter_source_files(sources):
+    """
+    The iter_source_files function lists the PDF and text files to index,
+    walking through directories in name order.
+
+    :param sources: list of files and directories
+    :return: A generator of file paths
+    """
+    for source in sources:
+        if not os.path.isdir(source):
+            yield source
+            continue
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(('.pdf',) + text_extensions):
+                    yield os.path.join(root, name)
+
+def iter_chunks(sources, chunk_words=words_per_chunk):
+    """
+    The iter_chunks function streams the chunks of every source file.
+
+    :param sources: list of files and directories
+    :param chunk_words: the number of words per chunk
+    :return: A generator of chunk dictionaries with the source, the
+             location in the source and the text
+    """
+    for file in iter_source_files(sources):
+        if file.lower().endswith('.pdf'):
+            chunks = iter_pdf_chunks(file, chunk_words)
+        else:
+            chunks = iter_text_chunks(file, chunk_words)
+        for location, text in chunks:
+            yield {'source': file, 'location': location, 'text': text}
+
+def build_index(sources, index_dir=index_folder, chunk_words=words_per_chunk, k1=1.5, b=0.75):
+    """
+    The build_index function builds a BM25 index over PDF and text files
+    in a single streaming pass. The chunks are written to disk as they
+    are read, and only the postings are kept in memory until they are
+    saved as NumPy arrays.
+
+    :param sources: list of files and directories to index
+    :param index_dir: the folder of the index
+    :param chunk_words: the number of words per chunk
+    :param k1: BM25 term frequency saturation
+    :param b: BM25 document length normalization
+    :return: The index information
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    vocabulary = {}
+    postings = []
+    doc_lengths = array('i')
+    chunk_offsets = array('q')
+
+    with open(os.path.join(index_dir, chunks_file), 'wb') as chunks:
+        for doc_id, chunk in enumerate(iter_chunks(sources, chunk_words)):
+            chunk_offsets.append(chunks.tell())
+            chunks.write((json.dumps(chunk) + '\n').encode())
+
+            tokens = preprocess_text(chunk['text']).split()
+            doc_lengths.append(len(tokens))
+            term_counts = {}
+            for token in tokens:
+                term_counts[token] = term_counts.get(token, 0) + 1
+
+            for term, count in term_counts.items():
+                if term not in vocabulary:
+                    vocabulary[term] = len(postings)
+                    postings.append((array('i'), array('i')))
+                term_docs, term_frequencies = postings[vocabulary[term]]
+                term_docs.append(doc_id)
+                term_frequencies.append(count)
+
+    documents = len(doc_lengths)
+    document_frequencies = np.array([len(term_docs) for term_docs, _ in postings], dtype=np.int64)
+    offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+    np.cumsum(document_frequencies, out=offsets[1:])
+
+    arrays = {
+        'offsets': offsets,
+        'doc_ids': np.array([doc for term_docs, _ in postings for doc in term_docs], dtype=np.int32),
+        'frequencies': np.array([tf for _, term_frequencies in postings for tf in term_frequencies], dtype=np.float32),
+        'doc_lengths': np.array(doc_lengths, dtype=np.float32),
+        'idf': np.log1p((documents - document_frequencies + 0.5) / (document_frequencies + 0.5)).astype(np.float32),
+        'chunk_offsets': np.array(chunk_offsets, dtype=np.int64),
+    }
+    for name in index_arrays:
+        np.save(os.path.join(index_dir, name + '.npy'), arrays[name])
+
+    info = {
+        'documents': documents,
+        'average_length': float(arrays['doc_lengths'].mean()) if documents else 0.0,
+        'k1': k1,
+        'b': b,
+        'sources': [str(source) for source in sources],
+        'vocabulary': vocabulary,
+    }
+    with open(os.path.join(index_dir, index_info_file), 'w') as f:
+        json.dump(info, f)
+
+    return info
+
+
+class RetrievalIndex:
+    """
+    The RetrievalIndex class answers top-k queries on an index written by
+    build_index. The postings are memory-mapped, so opening an index is
+    cheap and only the postings of the query terms are read from disk.
+    """
+    def __init__(self, index_dir=index_folder):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, index_info_file), 'r') as f:
+            self.info = json.load(f)
+        self.vocabulary = self.info['vocabulary']
+
+        for name in index_arrays:
+            setattr(self, name, np.load(os.path.join(index_dir, name + '.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        return self.info['documents']
+
+    def get_chunk(self, doc_id):
+        """
+        The get_chunk method reads a chunk back from the chunk file.
+
+        :param doc_id: the number of the chunk
+        :return: The chunk dictionary
+        """
+        with open(os.path.join(self.index_dir, chunks_file), 'rb') as f:
+            f.seek(int(self.chunk_offsets[doc_id]))
+            return json.loads(f.readline())
+
+    def score(self, query):
+        """
+        The score method computes the BM25 score of every chunk for a query.
+
+        :param query: the query text
+        :return: A NumPy array with the score of every chunk
+        """
+        scores = np.zeros(len(self), dtype=np.float32)
+        if not len(self):
+            return scores
+
+        k1, b = self.info['k1'], self.info['b']
+        length_norm = k1 * (1 - b + b * np.asarray(self.doc_lengths) / max(self.info['average_length'], 1e-9))
+
+        for term in set(preprocess_text(query).split()):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, stop = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+            docs = np.asarray(self.doc_ids[start:stop])
+            frequencies = np.asarray(self.frequencies[start:stop])
+            scores[docs] += self.idf[term_id] * frequencies * (k1 + 1) / (frequencies + length_norm[docs])
+
+        return scores
+
+    def search(self, query, k=3):
+        """
+        The search method finds the chunks that match a query best.
+
+        :param query: the query text
+        :param k: the number of chunks to return
+        :return: A list of chunk dictionaries with their score, best first;
+                 chunks that share no term with the query are left out
+        """
+        scores = self.score(query)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        return [dict(self.get_chunk(doc_id), score=float(scores[doc_id])) for doc_id in top if scores[doc_id] > 0]
+
+
+def format_reference(chunks):
+    """
+    The format_reference function writes chunks as the reference material
+    that goes before the task of a prompt.
+
+    :param chunks: chunks returned by RetrievalIndex.search
+    :return: The reference section, or an empty string without chunks
+    """
+    if not chunks:
+        return ''
+
+    context = '\n\n'.join(f"[{os.path.basename(chunk['source'])}, {chunk['location']}]\n{chunk['text']}"
+                          for chunk in chunks)
+
+    return f"Reference material:\n\n{context}\n\nTask:\n"
+
+def fit_chunks(chunks, prompt, count_tokens, max_tokens):
+    """
+    The fit_chunks function keeps as much of the chunks as fits in front
+    of a prompt within max_tokens. The prompt itself is never shortened:
+    the most relevant chunks are kept whole, and the start of the next
+    one fills the tokens that are left.
+
+    :param chunks: chunks returned by RetrievalIndex.search, best first
+    :param prompt: the prompt
+    :param count_tokens: a function counting the tokens of a text
+    :param max_tokens: the maximum number of tokens of the grounded prompt
+    :return: The list of chunks that fit, the last one possibly trimmed
+    """
+    def fits(kept):
+        return count_tokens(format_reference(kept) + prompt) <= max_tokens
+
+    kept = []
+    for chunk in chunks:
+        if not fits(kept + [chunk]):
+            break
+        kept.append(chunk)
+    if len(kept) == len(chunks):
+        return kept
+
+    # the longest start of the next chunk that fits, found by bisection
+    # over its word ends so that the original layout is kept
+    chunk = chunks[len(kept)]
+    ends = [match.end() for match in re.finditer(r'\S+', chunk['text'])]
+
+    def trimmed(words):
+        return dict(chunk, text=chunk['text'][:ends[words - 1]] + ' ...')
+
+    low, high = 0, len(ends) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(kept + [trimmed(middle)]):
+            low = middle
+        else:
+            high = middle - 1
+
+    return kept + [trimmed(low)] if low else kept
+
+def ground_prompt(prompt, index, k=3, query=None, count_tokens=None, max_tokens=None):
+    """
+    The ground_prompt function prepends the chunks that are most relevant
+    to a prompt, so that the LLM sees the relevant documentation instead
+    of hand-written hints.
+
+    :param prompt: the prompt
+    :param index: a RetrievalIndex
+    :param k: the number of chunks to prepend
+    :param query: the text to search for; defaults to the prompt
+    :param count_tokens: a function counting the tokens of a text, to fit
+                         the chunks in max_tokens with fit_chunks
+    :param max_tokens: the maximum number of tokens of the grounded prompt
+    :return: A tuple of the grounded prompt and the chunks used
+    """
+    chunks = index.search(query if query else prompt, k)
+    if count_tokens and max_tokens is not None:
+        chunks = fit_chunks(chunks, prompt, count_tokens, max_tokens)
+
+    return format_reference(chunks) + prompt, chunks
+
+def execute_script():
+    """
+    The execute_script function builds an index or queries it:
+        python3 retrieval.py build INDEX_DIR SOURCE [SOURCE ...]
+        python3 retrieval.py query INDEX_DIR QUERY [K]
+    """
+    if len(sys.argv) >= 4 and sys.argv[1] == 'build':
+        info = build_index(sys.argv[3:], sys.argv[2])
+        print(f"Indexed {info['documents']} chunks with {len(info['vocabulary'])} terms in {sys.argv[2]}")
+    elif len(sys.argv) >= 4 and sys.argv[1] == 'query':
+        k = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+        for chunk in RetrievalIndex(sys.argv[2]).search(sys.argv[3], k):
+            print(f"{chunk['score']:.3f}\t{chunk['source']}, {chunk['location']}\n{chunk['text']}\n")
+    else:
+        print("Usage: python3 retrieval.py build INDEX_DIR SOURCE [SOURCE ...]")
+        print("       python3 retrieval.py query INDEX_DIR QUERY [K]")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    execute_script()
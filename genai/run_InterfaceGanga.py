@@ -1,11 +1,45 @@
+import os
 from genai.InterfaceGanga import InterfaceGanga
+from genai.retrieval import RetrievalIndex, index_folder
 
-def run_ganga_llm():
+telemetry_file = 'llm_telemetry.jsonl'
+
+def print_stage(record):
+    """
+    The print_stage function prints the timing of an inference stage as
+    soon as it ends.
+    
+    :param record: the telemetry record of the stage
+    """
+    details = f"{record['stage']}: {record['seconds']:.2f} s, peak RSS {record['peak_rss_mb']:.0f} MB"
+    if record.get('tokens') is not None:
+        details += f", {record['tokens']} tokens"
+    if record.get('tokens_per_second'):
+        details += f", {record['tokens_per_second']:.2f} tokens/s"
+    print(f"[telemetry] {details}")
+
+def run_ganga_llm(telemetry_path=telemetry_file, index_dir=index_folder, top_k=3, backend='eager',\
+                  publish_dir=None):
     """
     The run_ganga_llm function runs inference on the LLM using a prmopt.
     It returns a boolean indicating whether or not the output generated
     by the LLM contain any meaningful code.
+    The time spent in every stage is printed as it ends and appended to
+    a JSON lines file.
+    If a retrieval index has been built, e.g. over LHC.pdf and Ganga
+    examples with `python3 retrieval.py build`, the most relevant chunks
+    are prepended to the prompt, as many as fit in the context window
+    next to the task.
+    The generated files are kept in the artifact store under the run id.
+    They are only copied to publish_dir, e.g. '.' to run the Ganga job
+    from there, if it is given, as runs sharing a folder overwrite each
+    other's copies.
     
+    :param telemetry_path: the JSON lines file for the stage timings
+    :param index_dir: the folder of the retrieval index
+    :param top_k: the number of chunks to prepend
+    :param backend: how to run generate: 'eager', 'compile' or 'onnx'
+    :param publish_dir: the folder to copy the generated files to, or None
     :return: True if it receives a meaningful code snippet from llm
     """
     prompt = "I want to use Ganga to calculate an approximation to the number \
@@ -28,11 +62,17 @@ def run_ganga_llm():
     7. Run the ganga job: j.submit() \
     Do not give me code as IPython or Jupyter prompts. Give me the python script."
 
-    llm = InterfaceGanga(llm_input=prompt)
+    retrieval_index = RetrievalIndex(index_dir) if index_dir and os.path.isdir(index_dir) else None
+    llm = InterfaceGanga(llm_input=prompt, backend=backend, retrieval_index=retrieval_index, top_k=top_k,\
+                         publish_dir=publish_dir)
+    llm.add_telemetry_callback(print_stage)
+
     output = llm.run_llm_inference()
     print(output)
 
     # Write code snippets to file and return a bool indicatory
     received_code_from_llm = llm.write_code_snippet_to_file(output)
+    print(f"The generated files of run {llm.run_id} are in {llm.artifact_store.root}")
+    llm.export_telemetry(telemetry_path)
 
     return received_code_from_llm
@@ -1,8 +1,37 @@
 #!/usr/bin/env python3
 import sys
 import os
+import json
+import time
+import queue
+import hashlib
+import multiprocessing
+from io import BytesIO
 from pypdf import PdfReader, PdfWriter
 
+try:
+    from genai.pdf_io import open_pdf, share_pdf, fork_pool, split_page_ranges
+    from genai.pdf_manifest import load_manifest, load_page
+    from genai.profiling import run_profiled
+except ImportError:
+    # run as a script from the genai directory
+    from pdf_io import open_pdf, share_pdf, fork_pool, split_page_ranges
+    from pdf_manifest import load_manifest, load_page
+    from profiling import run_profiled
+
+# pages between two saves of the state file
+state_save_interval = 50
+# output layouts, see get_output_units
+output_modes = ('pages', 'shards', 'archive')
+default_shard_size = 100
+# maps every page of a sharded or archived split to its pack file
+index_filename = 'index.json'
+# set up by split_pdf before forking its workers, which put every output
+# file on it as soon as it is written
+unit_results = None
+# seconds between two checks for a failed worker while waiting for output files
+result_poll_interval = 1
+
 def get_current_directory(cur_dir=None, pdf=None):
     """
     The get_current_directory function takes two optional arguments
@@ -22,14 +51,445 @@ def get_current_directory(cur_dir=None, pdf=None):
 
     return current_dir, pdf_file
 
-def split_pdf(file, cur_dir=None):
+def get_options():
+    """
+    The get_options function reads the optional arguments that may come
+    before the current directory and pdf file name:
+        split_pdf.py [--workers N] [--output pages|shards|archive]
+                     [--shard-size N] current_dir pdf_file
+    
+    :return: A tuple of the options dictionary, current directory and pdf file name
+    """
+    options = {'workers': 1, 'output_mode': 'pages', 'shard_size': default_shard_size}
+    option_names = {'--workers': 'workers', '--output': 'output_mode', '--shard-size': 'shard_size'}
+
+    args = sys.argv[1:]
+    while args and args[0] in option_names:
+        if len(args) < 2:
+            print(f"The option {args[0]} needs a value.")
+            sys.exit(1)
+
+        name = option_names[args[0]]
+        try:
+            options[name] = args[1] if name == 'output_mode' else int(args[1])
+        except ValueError:
+            print(f"The value of {args[0]} must be an integer, got '{args[1]}'")
+            sys.exit(1)
+        args = args[2:]
+
+    if len(args) != 2:
+        print(f"You must specify the current directory path and pdf file name as arguments.")
+        sys.exit(1)
+
+    if options['output_mode'] not in output_modes:
+        print(f"The output mode must be one of {', '.join(output_modes)}.")
+        sys.exit(1)
+
+    if options['shard_size'] < 1:
+        print(f"The value of --shard-size must be at least 1, got {options['shard_size']}")
+        sys.exit(1)
+
+    return options, args[0], args[1]
+
+def get_page_filename(page_num):
+    """
+    The get_page_filename function returns the name of the file a page
+    is saved as.
+    
+    :param page_num: the page number, starting at 0
+    :return: The filename of the extracted page
+    """
+    return f"LHC_page_{page_num+1}.pdf"
+
+def get_file_checksum(filename):
+    """
+    The get_file_checksum function returns the SHA-256 hash of a file.
+    
+    :param filename: path of the file
+    :return: The hex digest of the file content
+    """
+    checksum = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            checksum.update(block)
+
+    return checksum.hexdigest()
+
+def get_state_file(output_folder):
+    """
+    The get_state_file function returns the path of the state file that
+    records the source hash and the checksum of every extracted page.
+    It is kept next to the output folder, so that the folder only holds
+    the extracted pages.
+    
+    :param output_folder: the folder holding the extracted pages
+    :return: The path of the state file
+    """
+    parent_folder, folder_name = os.path.split(os.path.normpath(output_folder))
+
+    return os.path.join(parent_folder, f".{folder_name}.state.json")
+
+def load_split_state(output_folder, source_hash):
+    """
+    The load_split_state function reads the state file of an earlier run.
+    The state is only kept if it was written for the same source PDF.
+    
+    :param output_folder: the folder holding the extracted pages
+    :param source_hash: content hash of the PDF file being split
+    :return: The state dictionary
+    """
+    try:
+        with open(get_state_file(output_folder), 'r') as f:
+            state = json.load(f)
+        if state.get('source_hash') == source_hash:
+            return state
+    except (OSError, ValueError):
+        pass
+
+    return {'source_hash': source_hash, 'outputs': {}}
+
+def save_split_state(output_folder, state):
+    """
+    The save_split_state function atomically replaces the state file, so
+    that a crash never leaves a half-written state behind.
+    
+    :param output_folder: the folder holding the extracted pages
+    :param state: the state dictionary
+    """
+    state_file = get_state_file(output_folder)
+    temp_file = f"{state_file}.{os.getpid()}.tmp"
+
+    with open(temp_file, 'w') as f:
+        json.dump(state, f)
+    os.replace(temp_file, state_file)
+
+def is_output_current(output_folder, state, name, page_nums=None):
+    """
+    The is_output_current function checks if an output file of an earlier
+    run can be kept. It must hold exactly the pages planned for it now,
+    since a pack file of another shard size has the same name. A file
+    whose size and modification time match the state is trusted without
+    reading it; if only the modification time changed, its checksum decides.
+    
+    :param output_folder: the folder holding the extracted pages
+    :param state: the state dictionary
+    :param name: name of the output file
+    :param page_nums: the page numbers planned for the file
+    :return: True if the output file is already extracted correctly
+    """
+    entry = state['outputs'].get(name)
+    if not entry:
+        return False
+    if page_nums is not None and [page[0] for page in entry.get('pages', [])] != list(page_nums):
+        return False
+
+    try:
+        stat = os.stat(os.path.join(output_folder, name))
+    except OSError:
+        return False
+
+    if stat.st_size != entry['size']:
+        return False
+    if stat.st_mtime_ns == entry['mtime_ns']:
+        return True
+
+    if get_file_checksum(os.path.join(output_folder, name)) == entry['sha256']:
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+
+    return False
+
+def record_output(output_folder, state, name, size, checksum, pages):
+    """
+    The record_output function adds a freshly written output file to the
+    state.
+    
+    :param output_folder: the folder holding the extracted pages
+    :param state: the state dictionary
+    :param name: name of the output file
+    :param size: number of bytes written
+    :param checksum: SHA-256 hash of the bytes written
+    :param pages: [page number, offset, length] of every page in the file
+    """
+    stat = os.stat(os.path.join(output_folder, name))
+    state['outputs'][name] = {'size': size, 'mtime_ns': stat.st_mtime_ns,\
+        'sha256': checksum, 'pages': pages}
+
+def remove_stale_outputs(output_folder, state, units):
+    """
+    The remove_stale_outputs function deletes the output files of an
+    earlier run that are not part of the current plan, e.g. after a
+    change of output mode or shard size, and drops them from the state.
+    The index of the earlier run points into those files, so it is
+    deleted too.
+    
+    :param output_folder: the folder holding the extracted pages
+    :param state: the state dictionary
+    :param units: (output file name, page numbers) tuples of the current plan
+    :return: The number of files removed
+    """
+    planned = {name for name, _ in units}
+    stale = [name for name in state['outputs'] if name not in planned]
+
+    for name in stale:
+        del state['outputs'][name]
+        try:
+            os.remove(os.path.join(output_folder, name))
+        except FileNotFoundError:
+            pass
+
+    if stale:
+        remove_index(output_folder)
+        save_split_state(output_folder, state)
+
+    return len(stale)
+
+def get_output_units(number_of_pages, output_mode, shard_size):
+    """
+    The get_output_units function plans which pages go into which output
+    file:
+        - pages: one PDF file per page
+        - shards: one pack file per shard_size consecutive pages
+        - archive: a single pack file holding every page
+    A pack file is a concatenation of single-page PDFs; the index written
+    next to it records where each page starts, so one page can be read
+    without unpacking the rest.
+    
+    :param number_of_pages: total number of pages in the PDF
+    :param output_mode: 'pages', 'shards' or 'archive'
+    :param shard_size: number of pages per shard
+    :return: A list of (output file name, page numbers) tuples
+    """
+    if output_mode == 'pages':
+        return [(get_page_filename(page_num), [page_num]) for page_num in range(number_of_pages)]
+
+    if output_mode == 'shards':
+        if shard_size < 1:
+            raise ValueError(f"The shard size must be at least 1, got {shard_size}")
+        return [(f"LHC_shard_{shard+1}.pdfpack", list(range(start, min(start + shard_size, number_of_pages))))
+                for shard, start in enumerate(range(0, number_of_pages, shard_size))]
+
+    if output_mode == 'archive':
+        return [("LHC_pages.pdfpack", list(range(number_of_pages)))] if number_of_pages else []
+
+    raise ValueError(f"Unknown output mode '{output_mode}'")
+
+def serialize_page(page):
+    """
+    The serialize_page function turns a single page into a PDF document.
+    
+    :param page: the page to serialize
+    :return: The bytes of the single-page PDF
+    """
+    writer = PdfWriter()
+    writer.add_page(page)
+    data = BytesIO()
+    writer.write(data)
+
+    return data.getvalue()
+
+def write_unit(reader, manifest, name, page_nums, output_folder):
+    """
+    The write_unit function writes one output file: a single-page PDF, or
+    a pack of single-page PDFs written one after the other.
+    
+    :param reader: the PdfReader of the PDF file
+    :param manifest: the manifest of the PDF file, or None
+    :param name: name of the output file
+    :param page_nums: the page numbers that go into the file
+    :param output_folder: the folder to save the file in
+    :return: A tuple of the file name, [page number, offset, length] of
+             every page, bytes written and their SHA-256 hash
+    """
+    checksum = hashlib.sha256()
+    pages = []
+    offset = 0
+
+    with open(os.path.join(output_folder, name), 'wb') as output_file:
+        for page_num in page_nums:
+            data = serialize_page(load_page(reader, manifest, page_num))
+            output_file.write(data)
+            checksum.update(data)
+            pages.append([page_num, offset, len(data)])
+            offset += len(data)
+
+    return name, pages, offset, checksum.hexdigest()
+
+def extract_units(reader, manifest, units, output_folder):
+    """
+    The extract_units function writes the given output files one at a time.
+    
+    :param reader: the PdfReader of the PDF file
+    :param manifest: the manifest of the PDF file, or None
+    :param units: (output file name, page numbers) tuples
+    :param output_folder: the folder to save the files in
+    :return: A generator of the tuples returned by write_unit
+    """
+    for name, page_nums in units:
+        yield write_unit(reader, manifest, name, page_nums, output_folder)
+
+def split_units(file, units, output_folder, manifest=None, first_position=0):
+    """
+    The split_units function is run by each process-pool worker.
+    It opens the PDF file once, with its own reader, and writes every
+    output file in its share of the work. Every file is put on
+    unit_results as soon as it is written, so that the parent can report
+    it without waiting for the rest of the share.
+    
+    :param file: the PDF file to split
+    :param units: (output file name, page numbers) tuples
+    :param output_folder: the folder to save the files in
+    :param manifest: the manifest of the PDF file, or None
+    :param first_position: the position of the first unit in the plan
+    :return: The number of output files written
+    """
+    with open_pdf(file) as pdf:
+        reader = PdfReader(pdf)
+        for position, extracted_unit in enumerate(extract_units(reader, manifest, units, output_folder),\
+                                                  first_position):
+            unit_results.put((position, extracted_unit))
+
+    return len(units)
+
+def receive_units(futures, count):
+    """
+    The receive_units function collects the output files written by the
+    workers, in the order they finish. A failed worker raises its error
+    here instead of leaving the parent waiting for its files.
+    
+    :param futures: the futures of the split_units calls
+    :param count: the number of output files to wait for
+    :return: A generator of (position in the plan, write_unit tuple) tuples
+    """
+    for _ in range(count):
+        while True:
+            try:
+                yield unit_results.get(timeout=result_poll_interval)
+                break
+            except queue.Empty:
+                for future in futures:
+                    if future.done() and future.exception():
+                        raise future.exception()
+
+def report_extracted_units(file, extracted_units, output_folder, state):
+    """
+    The report_extracted_units function records every written output
+    file in the state as soon as it arrives and prints a line for it.
+    Files may arrive in any order; their lines are held back until every
+    file before them has been reported, so the lines always follow page
+    order. The state is saved every few pages and when the run fails,
+    so that a crashed run picks up where it stopped, including the files
+    that workers finished ahead of the others.
+    
+    :param file: the PDF file that was split
+    :param extracted_units: (position in the plan, write_unit tuple) tuples
+    :param output_folder: the folder holding the extracted pages
+    :param state: the state dictionary
+    :return: The number of pages and the number of bytes written
+    """
+    number_of_pages = 0
+    bytes_written = 0
+    unsaved_pages = 0
+    next_position, waiting = 0, {}
+    try:
+        for position, extracted_unit in extracted_units:
+            name, pages, size, checksum = extracted_unit
+            number_of_pages += len(pages)
+            unsaved_pages += len(pages)
+            bytes_written += size
+            record_output(output_folder, state, name, size, checksum, pages)
+            if unsaved_pages >= state_save_interval:
+                save_split_state(output_folder, state)
+                unsaved_pages = 0
+
+            waiting[position] = extracted_unit
+            while next_position in waiting:
+                name, pages, _, _ = waiting.pop(next_position)
+                next_position += 1
+                filename = os.path.join(output_folder, name)
+                first_page, last_page = pages[0][0] + 1, pages[-1][0] + 1
+                if first_page == last_page:
+                    print(f"Extracted page {first_page} from {file} and saved as {filename}")
+                else:
+                    print(f"Extracted pages {first_page}-{last_page} from {file} and saved as {filename}")
+    finally:
+        save_split_state(output_folder, state)
+
+    return number_of_pages, bytes_written
+
+def write_index(output_folder, state, units):
+    """
+    The write_index function writes the index of a sharded or archived
+    split: for every page, the pack file it is in, its offset and length.
+    
+    :param output_folder: the folder holding the pack files
+    :param state: the state dictionary
+    :param units: (output file name, page numbers) tuples
+    """
+    index = {'source_hash': state['source_hash'], 'pages': {}}
+    for name, _ in units:
+        for page_num, offset, length in state['outputs'][name]['pages']:
+            index['pages'][str(page_num)] = [name, offset, length]
+
+    index_file = os.path.join(output_folder, index_filename)
+    temp_file = f"{index_file}.{os.getpid()}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(index, f)
+    os.replace(temp_file, index_file)
+
+def remove_index(output_folder):
+    """
+    The remove_index function deletes the index of a sharded or archived
+    split, if there is one.
+    
+    :param output_folder: the folder holding the pack files
+    """
+    try:
+        os.remove(os.path.join(output_folder, index_filename))
+    except FileNotFoundError:
+        pass
+
+def read_page(output_folder, page_num, index=None):
+    """
+    The read_page function opens a single page of a sharded or archived
+    split, reading only that page's bytes from its pack file.
+    
+    :param output_folder: the folder holding the pack files
+    :param page_num: the page number, starting at 0
+    :param index: the loaded index, to avoid reading it for every page
+    :return: A pypdf page object
+    """
+    if index is None:
+        with open(os.path.join(output_folder, index_filename), 'r') as f:
+            index = json.load(f)
+
+    name, offset, length = index['pages'][str(page_num)]
+    with open(os.path.join(output_folder, name), 'rb') as pack:
+        pack.seek(offset)
+        data = pack.read(length)
+
+    return PdfReader(BytesIO(data)).pages[0]
+
+def split_pdf(file, cur_dir=None, workers=1, output_mode='pages', shard_size=None):
     """
     The split_pdf function takes a PDF file and splits it into individual pages.
-    It saves each page as a separate PDF file in the extracted_pages folder.
+    It saves each page as a separate PDF file in the extracted_pages folder,
+    or, with output_mode 'shards' or 'archive', packs the pages into a few
+    larger files plus an index (see get_output_units).
+    With more than one worker, the output files are written in parallel by a
+    process pool; progress is still reported in page order, file by file.
+    A state file next to the extracted_pages folder records the hash of the
+    PDF file and a checksum of every output file. Files that were already
+    written correctly from the same PDF file are skipped on a rerun.
     
     :param file: the PDF file that you want to split
     :param cur_dir: the directory where the extracted pages will be saved
+    :param workers: number of worker processes
+    :param output_mode: 'pages', 'shards' or 'archive'
+    :param shard_size: number of pages per shard in 'shards' mode
     """
+    global unit_results
+
     if not cur_dir:
         current_dir, _ = get_current_directory()
     else:
@@ -40,18 +500,55 @@ def split_pdf(file, cur_dir=None):
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
-    reader = PdfReader(file)
-    pages = reader.pages
+    # use the manifest written by initial_task.py, if there is one
+    manifest = load_manifest(file, build=False)
+    start_time = time.time()
+
+    # read from a memory-mapped buffer instead of a private copy of the file
+    with share_pdf(file) as pdf:
+        source_hash = manifest['content_hash'] if manifest else hashlib.sha256(pdf).hexdigest()
+        state = load_split_state(output_folder, source_hash)
+
+        reader = PdfReader(pdf)
+        number_of_pages = manifest['page_count'] if manifest else len(reader.pages)
+        units = get_output_units(number_of_pages, output_mode, shard_size or default_shard_size)
+        removed = remove_stale_outputs(output_folder, state, units)
+        if removed:
+            print(f"Removed {removed} output files of an earlier split with a different layout")
+        pending_units = [(name, page_nums) for name, page_nums in units
+                         if not is_output_current(output_folder, state, name, page_nums)]
 
-    for page_num, page in enumerate(pages):
-        filename = os.path.join(output_folder, f"LHC_page_{page_num+1}.pdf")
+        skipped_pages = number_of_pages - sum(len(page_nums) for _, page_nums in pending_units)
+        if skipped_pages:
+            print(f"Skipped {skipped_pages} pages of {file} already extracted in {output_folder}")
 
-        with open(filename, 'wb') as output_file:
-            writer = PdfWriter()
-            writer.add_page(page)
-            writer.write(output_file)
+        ranges = split_page_ranges(len(pending_units), workers)
+
+        if len(ranges) > 1:
+            unit_results = multiprocessing.get_context('fork').Queue()
+            try:
+                with fork_pool(len(ranges)) as executor:
+                    futures = [executor.submit(split_units, file, pending_units[start:stop], output_folder,\
+                                               manifest, start) for start, stop in ranges]
+                    number_of_pages, bytes_written = report_extracted_units(file,\
+                        receive_units(futures, len(pending_units)), output_folder, state)
+            finally:
+                unit_results = None
+        else:
+            extracted_units = enumerate(extract_units(reader, manifest, pending_units, output_folder))
+            number_of_pages, bytes_written = report_extracted_units(file, extracted_units,\
+                output_folder, state)
+
+    if output_mode != 'pages':
+        write_index(output_folder, state, units)
+    else:
+        # single-page files are found by name, an index would only point to old packs
+        remove_index(output_folder)
 
-        print(f"Extracted page {page_num+1} from {file} and saved as {filename}")
+    elapsed_time = time.time() - start_time
+    pages_per_second = number_of_pages / elapsed_time if elapsed_time > 0 else 0.0
+    print(f"Split {number_of_pages} pages with {max(len(ranges), 1)} worker(s) in {elapsed_time:.2f} s: \
+{pages_per_second:.1f} pages/s, {bytes_written / (1024 * 1024):.2f} MB written")
 
 def execute_script():
     """
@@ -61,9 +558,9 @@ def execute_script():
     This function will call necessary functions to split the PDF
     into individual pages and save them to a new folder.
     """
-    current_dir, pdf_file = get_current_directory()
+    options, current_dir, pdf_file = get_options()
     filepath = os.path.join(current_dir, pdf_file)
-    split_pdf(filepath)
+    split_pdf(filepath, current_dir, **options)
 
 
 # Prevent autorun if script is being imported by test_InitialTask.py
@@ -72,5 +569,7 @@ if os.getenv("FROM_TEST_SCRIPT") == "true":
 else:
     RUN_INITIAL_TASK = True
 
-if RUN_INITIAL_TASK or os.getenv("TEST_SCRIPT_OVERRIDE") == "true":
-    execute_script()
+# initial_task.py imports this module to check for already split pages
+if __name__ == '__main__' and (RUN_INITIAL_TASK or os.getenv("TEST_SCRIPT_OVERRIDE") == "true"):
+    # GENAI_PROFILE=1 profiles the run, e.g. inside a subjob
+    run_profiled(execute_script, 'split_pdf')
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    from genai.pdf_io import peak_rss_mb
+except ImportError:
+    # run as a script from the genai directory
+    from pdf_io import peak_rss_mb
+
+class InferenceTelemetry:
+    """
+    The InferenceTelemetry class records how long every stage of an LLM
+    run takes, e.g. model load, tokenization, prefill and decode, along
+    with its CPU time, the peak memory of the process so far and counters
+    such as token counts. Callbacks are fired as soon as a stage ends and
+    the records can be exported as JSON lines.
+    """
+    def __init__(self, run_id=None, clock=time.perf_counter, cpu_clock=time.process_time):
+        self.run_id = run_id if run_id else uuid.uuid4().hex[:12]
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.records = []
+        self.callbacks = []
+
+    def add_callback(self, callback):
+        """
+        The add_callback method registers a function that is called with
+        the record of every stage as soon as the stage ends.
+
+        :param callback: a function taking a record dictionary
+        """
+        self.callbacks.append(callback)
+
+    def record_stage(self, stage, seconds, cpu_seconds=None, **counters):
+        """
+        The record_stage method records a stage that was timed elsewhere,
+        e.g. prefill and decode, which are both timed within generate.
+
+        :param stage: the name of the stage
+        :param seconds: the wall time of the stage
+        :param cpu_seconds: the CPU time of the stage, if known
+        :param counters: further counters of the stage, e.g. tokens=128
+        :return: The record of the stage
+        """
+        record = {
+            'run_id': self.run_id,
+            'stage': stage,
+            'timestamp': time.time(),
+            'seconds': seconds,
+            'cpu_seconds': cpu_seconds,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        record.update(counters)
+
+        self.records.append(record)
+        for callback in self.callbacks:
+            callback(record)
+
+        return record
+
+    @contextmanager
+    def stage(self, stage, **counters):
+        """
+        The stage method times the code in a with block as a stage.
+        Counters known only inside the block can be added to the dictionary
+        it yields.
+
+        :param stage: the name of the stage
+        :param counters: counters of the stage known up front
+        :return: A dictionary of counters to fill in
+        """
+        start, cpu_start = self.clock(), self.cpu_clock()
+        try:
+            yield counters
+        finally:
+            self.record_stage(stage, self.clock() - start, self.cpu_clock() - cpu_start, **counters)
+
+    def summary(self):
+        """
+        The summary method adds up the recorded stages.
+
+        :return: A dictionary with the total time, the time of every stage,
+                 the share of the total it took and the overall peak memory
+        """
+        total = sum(record['seconds'] for record in self.records)
+
+        stages = {}
+        for record in self.records:
+            stages[record['stage']] = stages.get(record['stage'], 0) + record['seconds']
+
+        return {
+            'run_id': self.run_id,
+            'stage': 'summary',
+            'seconds': total,
+            'stages': {stage: {'seconds': seconds, 'share': seconds / total if total else 0}
+                       for stage, seconds in stages.items()},
+            'peak_rss_mb': max((record['peak_rss_mb'] for record in self.records), default=peak_rss_mb()),
+        }
+
+    def export_jsonl(self, path):
+        """
+        The export_jsonl method appends the records of this run and its
+        summary to a JSON lines file, one object per line, so that several
+        runs can be collected in the same file.
+
+        :param path: path of the JSON lines file
+        :return: The path of the file
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with open(path, 'a') as f:
+            for record in self.records + [self.summary()]:
+                f.write(json.dumps(record) + '\n')
+
+        return path
@@ -0,0 +1,113 @@
+import os
+import json
+
+# a task moves from pending to claimed to done; a rename is atomic, so
+# exactly one worker wins each task
+queue_states = ('pending', 'claimed', 'done')
+queue_info_file = 'queue.json'
+
+def write_json(filename, data):
+    """
+    The write_json function writes a JSON file atomically, so that a
+    worker never sees a half-written task.
+
+    :param filename: path of the file to write
+    :param data: the data to store
+    """
+    temp_file = f"{filename}.{os.getpid()}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp_file, filename)
+
+def create_queue(queue_dir, tasks, info=None):
+    """
+    The create_queue function creates a local work queue in a directory.
+    Each task is stored as a file in the pending folder; workers running
+    on the same host claim tasks by moving them to the claimed folder.
+
+    :param queue_dir: the directory that holds the queue
+    :param tasks: list of JSON-serializable tasks
+    :param info: data shared by all tasks, e.g. the input file
+    :return: The queue directory
+    """
+    for state in queue_states:
+        os.makedirs(os.path.join(queue_dir, state), exist_ok=True)
+
+    write_json(os.path.join(queue_dir, queue_info_file), info if info else {})
+
+    # zero-padded names, so that tasks are claimed in the order given
+    for task_num, task in enumerate(tasks):
+        write_json(os.path.join(queue_dir, 'pending', f"{task_num:08d}.json"), task)
+
+    return queue_dir
+
+def load_queue_info(queue_dir):
+    """
+    The load_queue_info function returns the data shared by all tasks.
+
+    :param queue_dir: the directory that holds the queue
+    :return: The info dictionary given to create_queue
+    """
+    with open(os.path.join(queue_dir, queue_info_file), 'r') as f:
+        return json.load(f)
+
+def claim_task(queue_dir):
+    """
+    The claim_task function claims the next pending task. If another
+    worker claims the same task first, the next one is tried.
+
+    :param queue_dir: the directory that holds the queue
+    :return: A tuple of the task name and the task, or None if the queue is empty
+    """
+    pending_dir = os.path.join(queue_dir, 'pending')
+
+    for name in sorted(os.listdir(pending_dir)):
+        if not name.endswith('.json'):
+            continue
+
+        claimed_file = os.path.join(queue_dir, 'claimed', name)
+        try:
+            os.rename(os.path.join(pending_dir, name), claimed_file)
+        except FileNotFoundError:
+            continue
+
+        with open(claimed_file, 'r') as f:
+            return name, json.load(f)
+
+    return None
+
+def complete_task(queue_dir, name):
+    """
+    The complete_task function marks a claimed task as done.
+
+    :param queue_dir: the directory that holds the queue
+    :param name: the task name returned by claim_task
+    """
+    os.rename(os.path.join(queue_dir, 'claimed', name), os.path.join(queue_dir, 'done', name))
+
+def iter_tasks(queue_dir):
+    """
+    The iter_tasks function claims tasks until the queue is empty. A task
+    is marked as done once the caller asks for the next one.
+
+    :param queue_dir: the directory that holds the queue
+    :return: A generator of tasks
+    """
+    while True:
+        claimed = claim_task(queue_dir)
+        if claimed is None:
+            return
+
+        name, task = claimed
+        yield task
+        complete_task(queue_dir, name)
+
+def count_tasks(queue_dir, state='done'):
+    """
+    The count_tasks function counts the tasks in one state of the queue.
+
+    :param queue_dir: the directory that holds the queue
+    :param state: 'pending', 'claimed' or 'done'
+    :return: The number of tasks in that state
+    """
+    return len([name for name in os.listdir(os.path.join(queue_dir, state)) if name.endswith('.json')])
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+
+class TestWordCountAggregator(unittest.TestCase):
+    def make_subjob(self, root, subjob_id, status, output):
+        """
+        The make_subjob helper function mimics a Ganga subjob whose
+        stdout contains the given output.
+        """
+        outputdir = os.path.join(root, str(subjob_id), 'output')
+        os.makedirs(outputdir)
+        with open(os.path.join(outputdir, 'stdout'), 'w') as f:
+            f.write(output)
+
+        return SimpleNamespace(id=subjob_id, status=status, outputdir=outputdir)
+
+    def testFoldLines(self):
+        """
+        The testFoldLines function tests that merger headers and other
+        non-integer lines are skipped while the integers are summed.
+        """
+        from genai.aggregator import WordCountAggregator
+
+        aggregator = WordCountAggregator()
+        aggregator.fold_lines(["#sometext\n", "1\n", "2\n", "oops\n", "3\n", "#sometest\n"])
+        self.assertEqual(aggregator.total, 6, 'Folded word count is incorrect.')
+
+    def testFoldCompletedSubjobs(self):
+        """
+        The testFoldCompletedSubjobs function tests that only completed
+        subjobs are folded in, that each subjob is folded in once and that
+        per-page counts are kept alongside the running total.
+        """
+        from genai.aggregator import WordCountAggregator
+
+        root = tempfile.mkdtemp()
+        subjobs = [self.make_subjob(root, 0, 'completed', '5\n'),
+                   self.make_subjob(root, 1, 'running', '7\n'),
+                   self.make_subjob(root, 2, 'completed', '1\n')]
+        job = SimpleNamespace(subjobs=subjobs)
+
+        aggregator = WordCountAggregator()
+        self.assertEqual(aggregator.fold_completed_subjobs(job), 2)
+        self.assertEqual(aggregator.total, 6, 'Partial word count is incorrect.')
+
+        subjobs[1].status = 'completed'
+        self.assertEqual(aggregator.fold_completed_subjobs(job), 1)
+        self.assertEqual(aggregator.total, 13, 'Final word count is incorrect.')
+        self.assertEqual(aggregator.page_counts, {0: 5, 1: 7, 2: 1}, 'Per-page counts are incorrect.')
+
+        shutil.rmtree(root)
+
+    def testFoldPageMarkers(self):
+        """
+        The testFoldPageMarkers function tests that the counts printed by
+        a persistent worker are attributed to the pages named by its page
+        markers rather than to the subjob id.
+        """
+        from genai.aggregator import WordCountAggregator
+
+        root = tempfile.mkdtemp()
+        subjob = self.make_subjob(root, 0, 'completed', '# page 3\n2\n# page 4\n0\n# page 7\n5\n')
+
+        aggregator = WordCountAggregator()
+        aggregator.fold_subjob(subjob)
+        self.assertEqual(aggregator.total, 7, 'Folded word count is incorrect.')
+        self.assertEqual(aggregator.page_counts, {3: 2, 4: 0, 7: 5}, 'Per-page counts are incorrect.')
+
+        shutil.rmtree(root)
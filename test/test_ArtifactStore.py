@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def testRunsAndDeduplication(self):
+        """
+        The testRunsAndDeduplication function tests that every run has its
+        own manifest, that identical snippets are stored once and that a
+        run can be copied to a folder.
+        """
+        from genai.artifact_store import ArtifactStore
+
+        store = ArtifactStore(os.path.join(self.folder, 'store'))
+        snippet = "def estimate_pi(n):\n    return 3.14\n"
+
+        first = store.add_artifacts('run-1', {'estimate_pi.py': snippet, 'run_ganga.sh': 'python3 estimate_pi.py'})
+        store.add_artifacts('run-1', {'llm_output.txt': 'output'}, {'llm_model': 'model'})
+        second = store.add_artifacts('run-2', {'estimate_pi.py': snippet})
+
+        self.assertFalse(first['artifacts']['estimate_pi.py']['deduplicated'])
+        self.assertTrue(second['artifacts']['estimate_pi.py']['deduplicated'], 'Identical snippet stored twice.')
+        self.assertEqual(first['artifacts']['estimate_pi.py']['hash'], second['artifacts']['estimate_pi.py']['hash'])
+        self.assertEqual(sorted(store.read_manifest('run-1')['artifacts']),
+                         ['estimate_pi.py', 'llm_output.txt', 'run_ganga.sh'])
+        self.assertEqual(store.read_manifest('run-1')['metadata'], {'llm_model': 'model'})
+        self.assertEqual(store.list_runs(), ['run-1', 'run-2'])
+        self.assertEqual(store.read_artifact('run-2', 'estimate_pi.py'), snippet)
+        with self.assertRaises(KeyError):
+            store.read_artifact('run-2', 'run_ganga.sh')
+
+        target = os.path.join(self.folder, 'published')
+        paths = store.materialize('run-1', target, ['estimate_pi.py'])
+        self.assertEqual(paths, [os.path.join(target, 'estimate_pi.py')])
+        with open(paths[0], 'r') as f:
+            self.assertEqual(f.read(), snippet)
+
+    def testConcurrentRuns(self):
+        """
+        The testConcurrentRuns function tests that many runs written at the
+        same time keep their own files and leave no temporary files.
+        """
+        from genai.artifact_store import ArtifactStore, new_run_id
+
+        store = ArtifactStore(os.path.join(self.folder, 'store'))
+
+        def generate(index):
+            run_id = new_run_id()
+            store.add_artifacts(run_id, {'run_ganga_job.py': f"print({index % 4})\n", 'llm_output.txt': str(index)})
+            return run_id, index
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            runs = list(executor.map(generate, range(32)))
+
+        self.assertEqual(len(set(run_id for run_id, _ in runs)), 32, 'Run ids clashed.')
+        for run_id, index in runs:
+            self.assertEqual(store.read_artifact(run_id, 'run_ganga_job.py'), f"print({index % 4})\n")
+            self.assertEqual(store.read_artifact(run_id, 'llm_output.txt'), str(index))
+
+        objects = [name for _, _, files in os.walk(os.path.join(store.root, 'objects')) for name in files]
+        self.assertEqual(len(objects), 4 + 32, 'Identical snippets not deduplicated.')
+        self.assertFalse([name for name in objects if name.endswith('.tmp')], 'Temporary files left behind.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+
+class TestBackends(unittest.TestCase):
+    def testBackendCacheDir(self):
+        """
+        The testBackendCacheDir function tests that a compiled artifact is
+        cached per model, backend and library version.
+        """
+        from genai.backends import get_backend_cache_dir, write_backend_info, backend_info_file
+
+        cache_root = tempfile.mkdtemp()
+        versions = {'torch': '2.3.0', 'transformers': '4.41.0'}
+        model = 'deepseek-ai/deepseek-coder-1.3b-instruct'
+
+        cache_dir = get_backend_cache_dir(model, 'compile', versions, cache_root)
+        self.assertEqual(cache_dir, get_backend_cache_dir(model, 'compile', dict(versions), cache_root))
+        self.assertTrue(cache_dir.startswith(os.path.join(cache_root, 'deepseek-ai_deepseek-coder-1.3b-instruct')))
+        self.assertNotEqual(cache_dir, get_backend_cache_dir(model, 'onnx', versions, cache_root))
+        self.assertNotEqual(cache_dir, get_backend_cache_dir(model, 'compile', dict(versions, torch='2.4.0'), cache_root))
+
+        with self.assertRaises(ValueError):
+            get_backend_cache_dir(model, 'tensorrt', versions, cache_root)
+
+        write_backend_info(cache_dir, {'backend': 'compile'})
+        with open(os.path.join(cache_dir, backend_info_file), 'r') as f:
+            self.assertEqual(json.load(f), {'backend': 'compile'})
+        shutil.rmtree(cache_root)
+
+    def testSummarizeBenchmark(self):
+        """
+        The testSummarizeBenchmark function tests that the throughput of
+        every backend is compared to eager.
+        """
+        from genai.backends import summarize_benchmark
+
+        runs = [{'backend': 'eager', 'seconds': 4.0, 'tokens': 20},
+                {'backend': 'eager', 'seconds': 6.0, 'tokens': 30},
+                {'backend': 'compile', 'seconds': 2.0, 'tokens': 20},
+                {'backend': 'compile', 'seconds': 3.0, 'tokens': 30}]
+        summary = summarize_benchmark(runs)
+
+        self.assertEqual(summary['eager'], {'runs': 2, 'seconds': 10.0, 'tokens': 50,
+                                            'tokens_per_second': 5.0, 'speedup': 1.0})
+        self.assertEqual((summary['compile']['tokens_per_second'], summary['compile']['speedup']), (10.0, 2.0))
+        self.assertIsNone(summarize_benchmark(runs[2:])['compile']['speedup'], 'Speedup without an eager baseline.')
+
+
+if __name__ == '__main__':
+    unittest.main()
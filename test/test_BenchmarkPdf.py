@@ -0,0 +1,98 @@
+import os
+import json
+import tempfile
+import unittest
+
+
+class TestBenchmarkPdf(unittest.TestCase):
+    def testGeneratePdf(self):
+        """
+        The testGeneratePdf function tests that a synthetic PDF file has
+        the requested pages and exactly the planted number of terms.
+        """
+        from genai.benchmark_pdf import generate_pdf, count_word_single_open
+        from genai.count_it import count_word
+        from pypdf import PdfReader
+
+        pdf_file = os.path.join(tempfile.mkdtemp(), 'synthetic.pdf')
+        expected = generate_pdf(pdf_file, 3, words_per_page=200, term='it', term_frequency=0.05)
+
+        self.assertEqual(expected, 30)
+        self.assertEqual(len(PdfReader(pdf_file).pages), 3, 'A page of text spilled onto another page.')
+        self.assertEqual(count_word(pdf_file, '1', 'it'), 10)
+        self.assertEqual(count_word_single_open(pdf_file, 3, 'it'), expected)
+
+        os.remove(pdf_file)
+        os.rmdir(os.path.dirname(pdf_file))
+
+    def testFitScaling(self):
+        """
+        The testFitScaling function tests the split of a stage's time into
+        a fixed part and a part per page.
+        """
+        from genai.benchmark_pdf import fit_scaling
+
+        fit = fit_scaling([(1, 0.6), (4, 1.2), (16, 3.6)])
+        self.assertAlmostEqual(fit['fixed_seconds'], 0.4)
+        self.assertAlmostEqual(fit['per_page_seconds'], 0.2)
+        self.assertEqual(fit_scaling([(4, 2.0)]), {'fixed_seconds': None, 'per_page_seconds': 0.5})
+
+    def testRunBenchmark(self):
+        """
+        The testRunBenchmark function tests that the in-process stages are
+        measured, checked and written as JSON for every size.
+        """
+        from genai.benchmark_pdf import run_benchmark
+
+        output_file = os.path.join(tempfile.mkdtemp(), 'pdf_benchmark.json')
+        run_benchmark([1, 2], words_per_page=50, term_frequency=0.1, output_file=output_file, workers=2)
+
+        with open(output_file, 'r') as f:
+            benchmark = json.load(f)
+        self.assertEqual([result['pages'] for result in benchmark['results']], [1, 2])
+        self.assertEqual(sorted(benchmark['scaling']), ['count_word_in_range', 'count_word_parallel',\
+                                                        'count_word_per_page', 'split_pdf'])
+        for result in benchmark['results']:
+            self.assertTrue(result['count_word_per_page']['correct'], 'Per-page count incorrect.')
+            self.assertTrue(result['count_word_in_range']['correct'], 'Single-open count incorrect.')
+            self.assertTrue(result['count_word_parallel']['correct'], 'Process-pool count incorrect.')
+            for stage in benchmark['scaling']:
+                self.assertGreaterEqual(result[stage]['peak_increase_mb'], 0)
+                self.assertNotIn('peak_rss_mb', result[stage], 'Peak of the whole process recorded for a stage.')
+            worker_stats = result['count_word_parallel']['worker_stats']
+            self.assertEqual([stats['pages'] for stats in worker_stats], [[0, 1]] if result['pages'] == 1 else [[0, 1], [1, 2]])
+            self.assertTrue(all('peak_increase_mb' in stats for stats in worker_stats), 'Worker memory not recorded.')
+
+        os.remove(output_file)
+        os.rmdir(os.path.dirname(output_file))
+
+
+    def testCompareEngines(self):
+        """
+        The testCompareEngines function tests that the extraction engines
+        are compared with pypdf and that an engine with identical counts
+        is chosen.
+        """
+        from genai.benchmark_pdf import generate_pdf, compare_engines, choose_engine
+
+        pdf_file = os.path.join(tempfile.mkdtemp(), 'synthetic.pdf')
+        expected = generate_pdf(pdf_file, 2, words_per_page=100, term_frequency=0.05)
+        comparison = compare_engines(pdf_file, 'it', output_file=None)
+
+        self.assertEqual(comparison['pages'], 2)
+        self.assertEqual(sorted(comparison['engines']), ['content_stream', 'pypdf', 'pypdf_upright'])
+        for engine, result in comparison['engines'].items():
+            self.assertEqual(result['word_count'], expected, f"Word count incorrect with {engine}.")
+            self.assertEqual((result['identical_pages'], result['token_agreement']), (2, 1.0))
+        self.assertIn(comparison['best_engine'], comparison['engines'])
+
+        engines = {'pypdf': {'seconds': 2.0, 'identical_counts': True},
+                   'content_stream': {'seconds': 0.5, 'identical_counts': False},
+                   'pypdf_upright': {'seconds': 1.5, 'identical_counts': True}}
+        self.assertEqual(choose_engine(engines), 'pypdf_upright')
+
+        os.remove(pdf_file)
+        os.rmdir(os.path.dirname(pdf_file))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -207,6 +207,94 @@ class TestInitialTask(unittest.TestCase):
         j.remove()
         os.remove(result_file)
 
+    def testGetSplitPageFiles(self):
+        """
+        The testGetSplitPageFiles function tests that the word count job
+        only uses the pages saved by split_pdf when every page of the
+        current PDF file has been split and is intact.
+        """
+        from fpdf import FPDF
+        from genai.initial_task import get_split_page_files
+        from genai.pdf_manifest import build_manifest
+        from genai.split_pdf import split_pdf
+
+        current_dir = os.getcwd()
+        test_pdf = 'test_split_pages.pdf'
+        pdf_writer = FPDF()
+        for i in range(3):
+            pdf_writer.add_page()
+            pdf_writer.set_font('Times')
+            pdf_writer.cell(ln=0, align='L', w=0, txt=f"it is page {i+1}", border=0)
+        pdf_writer.output(test_pdf, 'F')
+        manifest = build_manifest(test_pdf)
+
+        self.assertIsNone(get_split_page_files(current_dir, manifest), 'Pages are not split yet.')
+
+        split_pdf(test_pdf, current_dir)
+        self.assertEqual(get_split_page_files(current_dir, manifest),\
+            [os.path.join('extracted_pages', f'LHC_page_{i}.pdf') for i in range(1, 4)],\
+            'Split pages not found.')
+
+        os.remove(os.path.join('extracted_pages', 'LHC_page_2.pdf'))
+        self.assertIsNone(get_split_page_files(current_dir, manifest), 'Missing page not detected.')
+
+        os.remove(test_pdf)
+        shutil.rmtree('extracted_pages')
+        os.remove('.extracted_pages.state.json')
+
+    def testPlanExecution(self):
+        """
+        The testPlanExecution function tests that the planner counts small
+        PDFs inline, fans medium ones out to a process pool and sends
+        large ones to Ganga, with a chunk size that covers every page.
+        """
+        from genai.initial_task import plan_execution
+
+        def make_manifest(number_of_pages, content_size):
+            pages = [{'page': page_num, 'content_size': content_size} for page_num in range(number_of_pages)]
+            return {'page_count': number_of_pages, 'file_size': number_of_pages * content_size, 'pages': pages}
+
+        plan = plan_execution(make_manifest(3, 2000), cores=8)
+        self.assertEqual((plan['mode'], plan['workers'], plan['chunk_size']), ('inline', 1, 3))
+
+        plan = plan_execution(make_manifest(400, 20000), cores=8)
+        self.assertEqual(plan['mode'], 'pool')
+        self.assertEqual(plan['workers'], 8)
+        self.assertEqual(plan['chunk_size'], 50)
+
+        plan = plan_execution(make_manifest(400, 20000), cores=1)
+        self.assertEqual(plan['mode'], 'inline', 'A pool is planned with a single core.')
+
+        plan = plan_execution(make_manifest(4000, 100000), cores=8)
+        self.assertEqual((plan['mode'], plan['workers'], plan['chunk_size']), ('ganga', 8, 125))
+
+    def testExecutePlannedCount(self):
+        """
+        The testExecutePlannedCount function tests that a small PDF is
+        counted inline, without submitting a job, and that the result is
+        stored like the result of the word count job and remembered.
+        """
+        import tempfile
+        from fpdf import FPDF
+        from genai.initial_task import execute_planned_count, find_stored_word_count
+
+        cur_dir = tempfile.mkdtemp()
+        pdf_writer = FPDF()
+        for i in range(3):
+            pdf_writer.add_page()
+            pdf_writer.set_font('Times')
+            pdf_writer.cell(ln=0, align='L', w=0, txt=f"it is page {i+1}, it is", border=0)
+        pdf_writer.output(os.path.join(cur_dir, 'LHC.pdf'), 'F')
+
+        plan = execute_planned_count(cur_dir)
+        self.assertEqual(plan['mode'], 'inline')
+
+        with open(os.path.join(cur_dir, 'count_it.txt'), 'r') as f:
+            self.assertEqual(f.read().strip(), '6', 'Stored word count is incorrect.')
+        self.assertEqual(find_stored_word_count(cur_dir), 6, 'Word count not remembered.')
+
+        shutil.rmtree(cur_dir)
+
 '''
 These are complete system calls to count_it.py and split_pdf.py
 through the calling script initial_task.py
@@ -0,0 +1,36 @@
+import unittest
+
+
+class TestContentStream(unittest.TestCase):
+    def testDecodeStrings(self):
+        """
+        The testDecodeStrings function tests the escape sequences of
+        literal strings and hex strings.
+        """
+        from genai.content_stream import decode_string
+
+        self.assertEqual(decode_string(rb'(it\051s \(LHC\) a\\b)'), 'it)s (LHC) a\\b')
+        self.assertEqual(decode_string(b'(line\\\ncontinued)'), 'linecontinued')
+        self.assertEqual(decode_string(b'<48 61 64726F6E>'), 'Hadron')
+        self.assertEqual(decode_string(b'<4>'), '@')
+
+    def testScanText(self):
+        """
+        The testScanText function tests that only text-showing operators
+        are read, that positioning and large TJ offsets end words and that
+        inline images are skipped.
+        """
+        from genai.content_stream import scan_text
+
+        stream = (b"q 1 0 0 1 0 0 cm /Im0 Do Q\n"
+                  b"BT /F1 12 Tf 72 712 Td (Large) Tj (Hadron) ' 60 0 Td [(Col) 20 (lider) -250 (at)] TJ ET\n"
+                  b"BI /W 2 /H 1 /BPC 8 ID \x00(Tj)\xff EI\n"
+                  b"% (comment) Tj\n"
+                  b"BT 0 -14 TD <434552 4E> Tj 1 0 0 1 72 600 Tm (aka) Tj T* 2 1 (LHC) \" ET")
+
+        self.assertEqual(scan_text(stream).split(), ['Large', 'Hadron', 'Collider', 'at', 'CERN', 'aka', 'LHC'])
+        self.assertEqual(scan_text(b''), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+
+
+class WhitespaceTokenizer:
+    """
+    The WhitespaceTokenizer class stands in for a Hugging Face tokenizer:
+    every word is a token and a BOS token is added by default.
+    """
+    def encode(self, text, add_special_tokens=True):
+        ids = text.split()
+        return (['<s>'] + ids) if add_special_tokens else ids
+
+    def decode(self, ids, skip_special_tokens=False):
+        return ' '.join(token for token in ids if not (skip_special_tokens and token == '<s>'))
+
+
+class TestContextWindow(unittest.TestCase):
+    def testPromptThatFits(self):
+        """
+        The testPromptThatFits function tests that a short prompt is kept
+        as it is and leaves the rest of the context for generation.
+        """
+        from genai.context_window import ContextWindowManager
+
+        manager = ContextWindowManager(WhitespaceTokenizer(), context_length=20, generation_tokens=10)
+        split = manager.fit('estimate   pi with Monte Carlo')
+
+        self.assertEqual(split['prompt'], 'estimate   pi with Monte Carlo')
+        self.assertEqual((split['prompt_tokens'], split['generation_tokens'], split['actions']), (6, 14, []))
+
+    def testPolicies(self):
+        """
+        The testPolicies function tests that a long prompt is refused,
+        truncated from the middle or compressed, and that the generation
+        budget is always kept.
+        """
+        from genai.context_window import ContextWindowManager
+
+        prompt = 'Write code. Here are some instructions that you can follow. ' +\
+            ' '.join(f"step{i}." for i in range(10)) + ' Write code. Give me the python script.'
+
+        with self.assertRaises(ValueError):
+            ContextWindowManager(WhitespaceTokenizer(), 20, 10, policy='error').fit(prompt)
+
+        truncated = ContextWindowManager(WhitespaceTokenizer(), 20, 10, policy='truncate').fit(prompt)
+        self.assertEqual(truncated['actions'], ['truncate'])
+        self.assertEqual(truncated['prompt_tokens'], 10)
+        self.assertEqual(truncated['generation_tokens'], 10)
+        self.assertTrue(truncated['prompt'].startswith('Write code.'), 'Start of the prompt dropped.')
+        self.assertTrue(truncated['prompt'].endswith('python script.'), 'End of the prompt dropped.')
+
+        compressed = ContextWindowManager(WhitespaceTokenizer(), 30, 10, policy='compress').fit(prompt)
+        self.assertEqual(compressed['actions'], ['compress'])
+        self.assertEqual(compressed['prompt'], 'Write code. ' + ' '.join(f"step{i}." for i in range(10)) +\
+            ' Give me the python script.')
+        self.assertEqual(compressed['original_prompt_tokens'], 28)
+        self.assertEqual(compressed['generation_tokens'], 30 - compressed['prompt_tokens'])
+
+        with self.assertRaises(ValueError):
+            ContextWindowManager(WhitespaceTokenizer(), 20, 20)
+
+    def testCompressKeepsStructure(self):
+        """
+        The testCompressKeepsStructure function tests that compressing only
+        drops boilerplate at the start of sentences and keeps line breaks
+        and the indentation of code.
+        """
+        from genai.context_window import ContextWindowManager
+
+        prompt = """
+            Please write a script.   It must print "Please wait" first.
+            Please note that it runs on Ganga.
+            Steps:
+            1. Split the job.
+            2. Merge the output.
+
+                for job in jobs:
+                    job.submit()
+            Please write a script.
+        """
+        compressed = ContextWindowManager(WhitespaceTokenizer()).compress(prompt)
+        self.assertEqual(compressed, 'Write a script. It must print "Please wait" first.\n'
+                                     'It runs on Ganga.\n'
+                                     'Steps:\n'
+                                     '1. Split the job.\n'
+                                     '2. Merge the output.\n'
+                                     '\n'
+                                     '    for job in jobs:\n'
+                                     '        job.submit()')
+
+    def testProtectedParts(self):
+        """
+        The testProtectedParts function tests that only the text between
+        the protected prefix and suffix is shortened, and that protected
+        parts that don't fit on their own are refused.
+        """
+        from genai.context_window import ContextWindowManager
+
+        reference = ' '.join(f"ref{i}" for i in range(30))
+        task = ' Task: write code that splits the job. Give me the python script.'
+
+        for policy in ('truncate', 'compress'):
+            split = ContextWindowManager(WhitespaceTokenizer(), 40, 20, policy=policy).fit(\
+                reference, protected_prefix='Context:', protected_suffix=task)
+            self.assertLessEqual(split['prompt_tokens'], 20)
+            self.assertTrue(split['prompt'].startswith('Context:'), 'Protected prefix dropped.')
+            self.assertTrue(split['prompt'].endswith(task), f"Protected suffix shortened with {policy}.")
+            self.assertIn('ref0', split['prompt'])
+            self.assertEqual(split['actions'][-1], 'truncate')
+
+        with self.assertRaises(ValueError):
+            ContextWindowManager(WhitespaceTokenizer(), 20, 10).fit(reference, protected_suffix=task)
+
+
+if __name__ == '__main__':
+    unittest.main()
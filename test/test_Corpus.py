@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+from fpdf import FPDF
+
+os.environ["FROM_TEST_SCRIPT"] = "true"
+
+
+class TestCorpus(unittest.TestCase):
+    def make_manifest(self, content_sizes):
+        """
+        The make_manifest helper function mimics the manifest of a PDF
+        file whose pages have the given content-stream sizes.
+        """
+        pages = [{'page': page_num, 'content_size': size} for page_num, size in enumerate(content_sizes)]
+
+        return {'page_count': len(pages), 'pages': pages}
+
+    def testMakeWorkUnits(self):
+        """
+        The testMakeWorkUnits function tests that pages are cut into
+        contiguous units covering every page once, and that a page more
+        expensive than a unit gets a unit of its own.
+        """
+        from genai.corpus import make_work_units, page_overhead_bytes
+
+        manifest = self.make_manifest([0, 0, 100000, 0, 0, 0])
+        units = make_work_units(3, manifest, 4 * page_overhead_bytes)
+
+        self.assertEqual([unit[1:3] for unit in units], [[0, 2], [2, 3], [3, 6]], 'Units cut incorrectly.')
+        self.assertTrue(all(unit[0] == 3 for unit in units), 'File index not kept.')
+        self.assertEqual(sum(unit[3] for unit in units), 100000 + 6 * page_overhead_bytes)
+
+    def testPackWorkUnits(self):
+        """
+        The testPackWorkUnits function tests that units are packed into
+        subjobs of balanced cost, whatever order they come in.
+        """
+        from genai.corpus import pack_work_units
+
+        units = [[0, page, page + 1, cost] for page, cost in enumerate([1, 8, 3, 5, 2, 7, 4, 6])]
+        subjobs = pack_work_units(units, 3)
+
+        self.assertEqual(len(subjobs), 3)
+        self.assertEqual(sorted(unit for work in subjobs for unit in work['units']), units, 'Units lost or repeated.')
+        # a perfect split costs 12 per subjob; the greedy packing gets within one unit of it
+        self.assertEqual(sorted(work['cost'] for work in subjobs), [11, 12, 13], 'Subjobs are unbalanced.')
+        self.assertEqual(len(pack_work_units(units[:2], 4)), 2, 'Empty subjobs planned.')
+
+    def testCountCorpus(self):
+        """
+        The testCountCorpus function plans a word count over a directory
+        with a heavy and a light PDF file and tests that the subjobs
+        together count every page of both files exactly once.
+        """
+        from genai.corpus import plan_corpus, save_plan
+        from genai.count_it import count_word, count_word_from_plan
+        from genai.aggregator import WordCountAggregator, page_marker
+
+        corpus_dir = tempfile.mkdtemp()
+        for name, number_of_pages in [('heavy.pdf', 12), ('light.pdf', 2)]:
+            pdf_writer = FPDF()
+            for i in range(number_of_pages):
+                pdf_writer.add_page()
+                pdf_writer.set_xy(0, 0)
+                pdf_writer.set_font('Times')
+                pdf_writer.multi_cell(w=0, h=5, txt="it " * (i % 3) + "The Large Hadron Collider. " * 20)
+            pdf_writer.output(os.path.join(corpus_dir, name), 'F')
+
+        # a corrupt file is skipped instead of stopping the whole plan
+        with open(os.path.join(corpus_dir, 'corrupt.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4\nnot really a PDF file')
+
+        plan = plan_corpus(corpus_dir, 'it', 3)
+        self.assertEqual(plan['files'], ['heavy.pdf', 'light.pdf'])
+        self.assertEqual(plan['skipped_files'], ['corrupt.pdf'])
+        self.assertEqual(plan['page_count'], 14)
+        self.assertEqual(len(plan['subjobs']), 3)
+        self.assertTrue(all(any(unit[0] == 0 for unit in work['units']) for work in plan['subjobs']),\
+            'The heavy file was not spread over every subjob.')
+
+        plan_file = os.path.join(corpus_dir, 'plan.json')
+        save_plan(plan, plan_file)
+
+        aggregator = WordCountAggregator()
+        for index in range(len(plan['subjobs'])):
+            lines = []
+            for page_key, page_count in count_word_from_plan(plan_file, index):
+                lines.extend([f"{page_marker}{page_key}\n", f"{page_count}\n"])
+            aggregator.fold_lines(lines)
+
+        expected = {f"{name}:{page_num}": count_word(os.path.join(corpus_dir, name), page_num, 'it')
+                    for name, number_of_pages in [('heavy.pdf', 12), ('light.pdf', 2)]
+                    for page_num in range(number_of_pages)}
+        self.assertEqual(aggregator.page_counts, expected, 'Corpus word count differs from per-page word count.')
+        self.assertEqual(aggregator.count_by_file(), {'heavy.pdf': 12, 'light.pdf': 1})
+
+        shutil.rmtree(corpus_dir)
+
+    def testEmptyCorpusPlan(self):
+        """
+        The testEmptyCorpusPlan function tests that a corpus whose PDF files
+        have no pages stops the job with a message instead of a crash.
+        """
+        from pypdf import PdfWriter
+        from genai.initial_task import split_corpus_job
+
+        corpus_dir = tempfile.mkdtemp()
+        PdfWriter().write(os.path.join(corpus_dir, 'empty.pdf'))
+
+        class EmptyJob:
+            inputdir = corpus_dir
+            postprocessors = []
+
+        with self.assertRaises(SystemExit):
+            split_corpus_job(EmptyJob(), 'count_it.py', corpus_dir, 2)
+
+        shutil.rmtree(corpus_dir)
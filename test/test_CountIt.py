@@ -56,3 +56,118 @@ class TestCountIt(unittest.TestCase):
 
         self.assertEqual(count_word(pdf_file, "0", "hadron"), 2, "Word count incorrect.")
         os.remove(pdf_file)
+
+    def testExtractionEngines(self):
+        """
+        The testExtractionEngines function tests that every extraction
+        engine gives the same count on a simple page, and that the engine
+        is part of the normalization version of its counts.
+        """
+        from genai.count_it import count_word, extraction_engines, get_normalization_version,\
+            normalization_version
+
+        pdf_file = 'test_pdf.pdf'
+        pdf_writer = FPDF()
+        pdf_writer.add_page()
+        pdf_writer.set_font('Times')
+        text = "The Large Hadron Collider (CERN) aka LHC aka large-hadron-collider."
+        pdf_writer.cell(ln=0, align='L', w=0, txt=text, border=0)
+        pdf_writer.output(pdf_file, 'F')
+
+        previous = os.environ.pop('GENAI_EXTRACTION_ENGINE', None)
+        for engine in extraction_engines:
+            os.environ['GENAI_EXTRACTION_ENGINE'] = engine
+            self.assertEqual(count_word(pdf_file, "0", "hadron"), 2, f"Word count incorrect with {engine}.")
+            self.assertEqual(count_word(pdf_file, "0", "cern"), 1, f"Word count incorrect with {engine}.")
+        os.environ.pop('GENAI_EXTRACTION_ENGINE')
+        if previous is not None:
+            os.environ['GENAI_EXTRACTION_ENGINE'] = previous
+        os.remove(pdf_file)
+
+        self.assertEqual(get_normalization_version('pypdf'), normalization_version)
+        self.assertEqual(get_normalization_version('content_stream'), f"{normalization_version}+content_stream")
+        with self.assertRaises(ValueError):
+            get_normalization_version('ocr')
+
+    def testSplitPageRanges(self):
+        """
+        The testSplitPageRanges function tests that split_page_ranges
+        covers every page exactly once with contiguous, balanced ranges.
+        """
+        from genai.count_it import split_page_ranges
+
+        self.assertEqual(split_page_ranges(29, 4),\
+            [(0, 8), (8, 15), (15, 22), (22, 29)], "Page ranges incorrect.")
+        self.assertEqual(split_page_ranges(2, 8), [(0, 1), (1, 2)],\
+            "More workers than pages not handled.")
+        self.assertEqual(split_page_ranges(0, 4), [], "Empty PDF not handled.")
+
+    def testCountWordParallel(self):
+        """
+        The testCountWordParallel function tests that the process-pool mode
+        of count_it gives the same per-page counts as counting every page
+        separately, which is what the Ganga job does.
+        """
+        from genai.count_it import count_word, count_word_parallel
+
+        pdf_file = 'test_pdf.pdf'
+        pdf_writer = FPDF()
+        for i in range(5):
+            pdf_writer.add_page()
+            pdf_writer.set_xy(0, 0)
+            pdf_writer.set_font('Times')
+            text = "it " * i + "The Large Hadron Collider at CERN."
+            pdf_writer.cell(ln=0, align='L', w=0, txt=text, border=0)
+        pdf_writer.output(pdf_file, 'F')
+
+        expected = [count_word(pdf_file, str(page_num), "it") for page_num in range(5)]
+        self.assertEqual(expected, [0, 1, 2, 3, 4], "Word count incorrect.")
+        worker_stats = []
+        self.assertEqual(count_word_parallel(pdf_file, "it", 2, worker_stats), expected,\
+            "Process-pool word count differs from per-page word count.")
+        self.assertEqual([stats['pages'] for stats in worker_stats], [(0, 3), (3, 5)],\
+            "Worker page ranges not reported.")
+        self.assertTrue(all(stats['peak_rss_mb'] > 0 for stats in worker_stats),\
+            "Worker peak memory not reported.")
+        self.assertTrue(all(0 <= stats['peak_increase_mb'] < stats['peak_rss_mb'] for stats in worker_stats),\
+            "Worker memory increase includes the memory inherited from the parent.")
+
+        worker_stats = []
+        self.assertEqual(count_word_parallel(pdf_file, "it", 2, worker_stats, chunk_size=2), expected,\
+            "Process-pool word count with a chunk size differs from per-page word count.")
+        self.assertEqual([stats['pages'] for stats in worker_stats], [(0, 2), (2, 4), (4, 5)],\
+            "Chunk size not used for the page ranges.")
+        os.remove(pdf_file)
+
+    def testCountWordFromQueue(self):
+        """
+        The testCountWordFromQueue function tests that a persistent worker
+        drains the work queue and counts every page exactly once, with
+        the same counts as counting every page separately.
+        """
+        import shutil
+        import tempfile
+        from genai.count_it import count_word, count_word_from_queue
+        from genai.work_queue import create_queue, count_tasks
+
+        pdf_file = 'test_pdf.pdf'
+        pdf_writer = FPDF()
+        for i in range(5):
+            pdf_writer.add_page()
+            pdf_writer.set_xy(0, 0)
+            pdf_writer.set_font('Times')
+            text = "it " * i + "The Large Hadron Collider at CERN."
+            pdf_writer.cell(ln=0, align='L', w=0, txt=text, border=0)
+        pdf_writer.output(pdf_file, 'F')
+
+        queue_dir = tempfile.mkdtemp()
+        create_queue(queue_dir, [[0, 2], [2, 4], [4, 5]], info={'pdf_file': pdf_file, 'word': 'it'})
+
+        expected = [(page_num, count_word(pdf_file, str(page_num), "it")) for page_num in range(5)]
+        self.assertEqual(list(count_word_from_queue(queue_dir)), expected,\
+            "Queue word count differs from per-page word count.")
+        self.assertEqual(count_tasks(queue_dir, 'done'), 3, "Not every task was marked as done.")
+        self.assertEqual(count_tasks(queue_dir, 'pending'), 0, "Tasks left in the queue.")
+
+        shutil.rmtree(queue_dir)
+        os.remove(pdf_file)
@@ -11,8 +11,9 @@ class TestGangaLLM(unittest.TestCase):
         ''' 
         from genai.run_InterfaceGanga import run_ganga_llm
 
-        # Check if LLM was able to generate code
-        self.assertTrue(run_ganga_llm(), "LLM failed to generate code.")
+        # Check if LLM was able to generate code; the ganga job is run
+        # from the current directory
+        self.assertTrue(run_ganga_llm(publish_dir='.'), "LLM failed to generate code.")
 
         # set up file paths
         current_dir = os.getcwd()
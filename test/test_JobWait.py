@@ -0,0 +1,88 @@
+import unittest
+from types import SimpleNamespace
+
+
+class FakeClock:
+    """
+    The FakeClock class stands in for time.monotonic and time.sleep so
+    that the waits can be tested without sleeping.
+    """
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, interval):
+        self.sleeps.append(interval)
+        self.now += interval
+
+
+class TestJobWaiter(unittest.TestCase):
+    def make_job(self, number_of_subjobs):
+        subjobs = [SimpleNamespace(id=i, status='running') for i in range(number_of_subjobs)]
+        return SimpleNamespace(status='running', subjobs=subjobs)
+
+    def testWaitFiresCallbacksAndBacksOff(self):
+        """
+        The testWaitFiresCallbacksAndBacksOff function finishes one subjob
+        per poll and checks that a callback fires for every status change
+        and that the poll interval grows only while nothing changes.
+        """
+        from genai.job_wait import JobWaiter
+
+        job = self.make_job(2)
+        fake = FakeClock()
+        changes = []
+        polls = []
+
+        # first subjob finishes on the 5th poll, the job on the 7th
+        def advance():
+            if len(polls) == 4:
+                job.subjobs[0].status = 'completed'
+            elif len(polls) == 6:
+                job.subjobs[1].status = 'completed'
+                job.status = 'completed'
+            polls.append(fake.now)
+            return job
+
+        waiter = JobWaiter(job, get_job=advance, initial_interval=1, max_interval=4,\
+            on_status_change=[lambda item, old, new: changes.append((getattr(item, 'id', None), old, new))],\
+            clock=fake.clock, sleep=fake.sleep)
+
+        self.assertEqual(waiter.wait(), 'completed', 'Job did not complete.')
+        self.assertIn((0, 'running', 'completed'), changes, 'Subjob completion not reported.')
+        self.assertIn((None, 'running', 'completed'), changes, 'Job completion not reported.')
+        self.assertEqual(fake.sleeps, [1, 2, 4, 4, 1, 2], 'Poll interval did not back off and reset.')
+
+    def testTimeoutScalesAndResetsOnProgress(self):
+        """
+        The testTimeoutScalesAndResetsOnProgress function checks that the
+        timeout grows with the number of subjobs, that a job making steady
+        progress never times out and that a stalled job does.
+        """
+        from genai.job_wait import JobWaiter
+
+        job = self.make_job(50)
+        self.assertEqual(JobWaiter(job, base_timeout=60, timeout_per_subjob=2).timeout, 160)
+
+        # one subjob finishes every 100 seconds: slower than 160s in total,
+        # but never 160s without progress
+        fake = FakeClock()
+        def progress():
+            finished = min(int(fake.now // 100), 50)
+            for subjob in job.subjobs[:finished]:
+                subjob.status = 'completed'
+            if finished == 50:
+                job.status = 'completed'
+            return job
+
+        waiter = JobWaiter(job, get_job=progress, clock=fake.clock, sleep=fake.sleep)
+        self.assertEqual(waiter.wait(), 'completed', 'Progressing job timed out.')
+
+        stalled = self.make_job(1)
+        fake = FakeClock()
+        waiter = JobWaiter(stalled, clock=fake.clock, sleep=fake.sleep)
+        self.assertIsNone(waiter.wait(), 'Stalled job did not time out.')
+        self.assertLessEqual(fake.now, waiter.timeout + waiter.max_interval)
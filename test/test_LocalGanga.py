@@ -0,0 +1,72 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+os.environ["GENAI_LOCAL_WORKSPACE"] = tempfile.mkdtemp()
+
+
+class TestLocalGanga(unittest.TestCase):
+    def testHelloJob(self):
+        """
+        The testHelloJob function tests that a default job echoes
+        'Hello World', as the hello.py job does on Ganga.
+        """
+        from genai.local_ganga import Job, Local, jobs
+
+        job = Job(name='hello', backend=Local())
+        job.submit()
+
+        self.assertEqual(job.wait(timeout=30), 'completed', 'Job did not complete.')
+        self.assertIs(jobs(job.id), job, 'Job not registered.')
+        with open(os.path.join(job.outputdir, 'stdout'), 'r') as f:
+            self.assertEqual(f.read().strip(), 'Hello World', "Output doesn't match expected 'Hello World'.")
+
+        job.remove()
+        self.assertFalse(os.path.exists(job.outputdir), 'Job workspace not removed.')
+
+    def testArgSplitterJob(self):
+        """
+        The testArgSplitterJob function tests that every ArgSplitter
+        argument list runs as a subjob and that TextMerger merges their
+        stdout in subjob order, which the word count aggregator can read.
+        """
+        from genai.local_ganga import Job, Local, Executable, ArgSplitter, TextMerger
+        from genai.aggregator import WordCountAggregator
+
+        job = Job(name='count', backend=Local(max_workers=2))
+        job.application = Executable(exe=sys.executable)
+        job.splitter = ArgSplitter(args=[['-c', f"print({count})"] for count in range(5)])
+        job.postprocessors.append(TextMerger(files=['stdout']))
+        job.submit()
+
+        self.assertEqual(job.wait(timeout=60), 'completed', 'Job did not complete.')
+        self.assertEqual([subjob.status for subjob in job.subjobs], ['completed'] * 5)
+        aggregator = WordCountAggregator()
+        self.assertEqual(aggregator.fold_file(job.outputdir + 'stdout'), 10, 'Merged output is incorrect.')
+
+        job.remove()
+
+    def testFailedSubjob(self):
+        """
+        The testFailedSubjob function tests that a failing subjob fails
+        the master job and that nothing is merged.
+        """
+        from genai.local_ganga import Job, Executable, ArgSplitter, TextMerger
+
+        job = Job(name='fail')
+        job.application = Executable(exe=sys.executable)
+        job.splitter = ArgSplitter(args=[['-c', 'print(1)'], ['-c', 'raise SystemExit(3)']])
+        job.postprocessors.append(TextMerger(files=['stdout']))
+        job.submit()
+
+        self.assertEqual(job.wait(timeout=60), 'failed', 'Job did not fail.')
+        self.assertEqual([subjob.status for subjob in job.subjobs], ['completed', 'failed'])
+        self.assertFalse(os.path.exists(job.outputdir + 'stdout'), 'Output of a failed job was merged.')
+
+        job.remove()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(os.environ.pop("GENAI_LOCAL_WORKSPACE"), ignore_errors=True)
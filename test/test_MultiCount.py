@@ -0,0 +1,95 @@
+import os
+import unittest
+from collections import Counter
+from fpdf import FPDF
+
+os.environ["FROM_TEST_SCRIPT"] = "true"
+
+
+class TestMultiCount(unittest.TestCase):
+    def testTermMatcher(self):
+        """
+        The testTermMatcher function tests that words and phrases are
+        counted in one pass, including matches that overlap or that only
+        appear after a longer phrase failed to match.
+        """
+        from genai.multi_count import TermMatcher
+
+        tokens = "a b c d b c a b c b".split()
+        matcher = TermMatcher(["a b c", "b c d", "b c", "c", "b b", "", "x"])
+
+        self.assertEqual(matcher.count(tokens), [2, 1, 3, 3, 0, 0, 0], 'Term counts are incorrect.')
+
+    def testSingleWordsMatchCounter(self):
+        """
+        The testSingleWordsMatchCounter function tests that single-word
+        terms are counted exactly like count_it counts a single word.
+        """
+        from genai.multi_count import TermMatcher
+
+        tokens = "it is what it is and it it is".split()
+        words = ["it", "is", "what", "nothing"]
+        self.assertEqual(TermMatcher(words).count(tokens), [Counter(tokens)[word] for word in words])
+
+    def testCountTerms(self):
+        """
+        The testCountTerms function tests that the term x page matrix of a
+        PDF file matches counting every word on every page separately, and
+        that phrases are normalized like the text.
+        """
+        from genai.count_it import count_terms, count_word
+
+        pdf_file = 'test_pdf.pdf'
+        pdf_writer = FPDF()
+        for i in range(3):
+            pdf_writer.add_page()
+            pdf_writer.set_xy(0, 0)
+            pdf_writer.set_font('Times')
+            text = "it " * i + "The Large Hadron Collider at CERN aka large-hadron-collider."
+            pdf_writer.cell(ln=0, align='L', w=0, txt=text, border=0)
+        pdf_writer.output(pdf_file, 'F')
+
+        matrix = count_terms(pdf_file, ["it", "cern", "Large Hadron-Collider"])
+        self.assertEqual(matrix[0], [count_word(pdf_file, page_num, "it") for page_num in range(3)])
+        self.assertEqual(matrix[1], [1, 1, 1], 'Word counts are incorrect.')
+        self.assertEqual(matrix[2], [2, 2, 2], 'Phrase counts are incorrect.')
+
+        os.remove(pdf_file)
+
+    def testTermMatrixAggregator(self):
+        """
+        The testTermMatrixAggregator function tests that the output of
+        multi-term subjobs is folded into a term x page matrix.
+        """
+        from genai.aggregator import TermMatrixAggregator
+
+        aggregator = TermMatrixAggregator()
+        aggregator.fold_lines(["# page 1\n", "2\tit\n", "1\tlarge hadron\n", "#header\n"])
+        aggregator.fold_lines(["# page 0\n", "0\tit\n", "3\tlarge hadron\n", "oops\n"])
+
+        self.assertEqual(aggregator.get_matrix(["it", "large hadron", "cern"], [0, 1]),\
+            [[0, 2], [3, 1], [0, 0]], 'Term x page matrix is incorrect.')
+        self.assertEqual(aggregator.total, 6)
+
+    def testTermsOption(self):
+        """
+        The testTermsOption function tests that --terms is read as a list
+        of distinct terms and that options it can't be combined with stop
+        the run instead of being ignored.
+        """
+        import sys
+        from genai.initial_task import get_terms_option
+
+        argv = sys.argv
+        try:
+            sys.argv = ["initial_task.py", "count_it.py", "--terms", "it, the,it,,large hadron collider"]
+            self.assertEqual(get_terms_option(), ["it", "the", "large hadron collider"])
+            sys.argv.append("--persistent-workers")
+            self.assertEqual(len(get_terms_option()), 3)
+
+            for flag in ["--corpus", "--auto", "--split-pages"]:
+                sys.argv = ["initial_task.py", "count_it.py", flag, "--terms", "it,the"]
+                with self.assertRaises(SystemExit, msg=f"--terms combined with {flag}."):
+                    get_terms_option()
+        finally:
+            sys.argv = argv
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+from fpdf import FPDF
+
+
+class TestPdfManifest(unittest.TestCase):
+    def create_pdf(self, pdf_file):
+        """
+        The create_pdf function creates a 3-page PDF file with some
+        text on every page. FPDF puts the page size on the page tree,
+        so its pages inherit attributes from their parent.
+        """
+        pdf_writer = FPDF()
+        for i in range(3):
+            pdf_writer.add_page()
+            pdf_writer.set_xy(0, 0)
+            pdf_writer.set_font('Times')
+            pdf_writer.cell(ln=0, align='L', w=0, txt=f"page {i+1} of it", border=0)
+        pdf_writer.output(pdf_file, 'F')
+
+    def testBuildManifest(self):
+        """
+        The testBuildManifest function checks the page count, page entries
+        and content hash recorded in the manifest of a PDF file.
+        """
+        from genai.pdf_manifest import build_manifest
+
+        pdf_file = 'test_pdf.pdf'
+        self.create_pdf(pdf_file)
+        manifest = build_manifest(pdf_file)
+
+        self.assertEqual(manifest['page_count'], 3, 'Page count incorrect.')
+        self.assertEqual([page['page'] for page in manifest['pages']], [0, 1, 2])
+        self.assertTrue(all(page['content_size'] > 0 for page in manifest['pages']),\
+            'Content stream sizes not recorded.')
+        self.assertTrue(all(page['inherits'] for page in manifest['pages']),\
+            'Inherited page attributes not detected.')
+        self.assertEqual(len(manifest['content_hash']), 64, 'Content hash not recorded.')
+
+        os.remove(pdf_file)
+
+    def testLoadPageDirectly(self):
+        """
+        The testLoadPageDirectly function checks that pages which do not
+        inherit attributes are loaded straight from the manifest and give
+        the same text as pages reached through the page tree.
+        """
+        from pypdf import PdfReader, PdfWriter
+        from genai.pdf_manifest import load_manifest, load_page, get_manifest_path
+
+        pdf_file = 'test_pdf.pdf'
+        self.create_pdf(pdf_file)
+
+        # pypdf writes the inherited attributes into every page
+        writer = PdfWriter()
+        for page in PdfReader(pdf_file).pages:
+            writer.add_page(page)
+        writer.write(pdf_file)
+
+        self.assertIsNone(load_manifest(pdf_file, build=False), 'Manifest should not exist yet.')
+        manifest = load_manifest(pdf_file)
+        self.assertFalse(any(page['inherits'] for page in manifest['pages']))
+        self.assertEqual(load_manifest(pdf_file, build=False), manifest, 'Stored manifest not reused.')
+        self.assertEqual(os.listdir(os.path.dirname(os.path.abspath(pdf_file))).count(pdf_file + '.manifest.json'), 0,\
+            'Manifest written next to the PDF file.')
+
+        reader = PdfReader(pdf_file)
+        for page_num in range(3):
+            page = load_page(reader, manifest, page_num)
+            self.assertEqual(page.extract_text(), reader.pages[page_num].extract_text(),\
+                'Directly loaded page differs.')
+
+        # a changed file makes the stored manifest stale
+        with open(pdf_file, 'ab') as f:
+            f.write(b'\n')
+        self.assertIsNone(load_manifest(pdf_file, build=False), 'Stale manifest was used.')
+
+        os.remove(pdf_file)
+        os.remove(get_manifest_path(pdf_file))
+
+
+    def testSaveManifestFailure(self):
+        """
+        The testSaveManifestFailure function checks that a manifest that
+        cannot be written leaves no temporary file behind.
+        """
+        from genai.pdf_manifest import save_manifest, get_manifest_path
+
+        manifest_dir = tempfile.mkdtemp()
+        os.environ['GENAI_MANIFEST_DIR'] = manifest_dir
+        try:
+            # a folder in the way of the manifest makes the rename fail
+            os.makedirs(get_manifest_path('test_pdf.pdf'))
+            self.assertIsNone(save_manifest({'page_count': 0}, 'test_pdf.pdf'))
+            self.assertEqual(os.listdir(manifest_dir), [os.path.basename(get_manifest_path('test_pdf.pdf'))],\
+                'Temporary manifest file left behind.')
+        finally:
+            del os.environ['GENAI_MANIFEST_DIR']
+            shutil.rmtree(manifest_dir)
@@ -0,0 +1,53 @@
+import math
+import unittest
+
+
+class TestPiEstimator(unittest.TestCase):
+    def testCountHits(self):
+        """
+        The testCountHits function tests that every subjob draws its own
+        reproducible stream and that the estimate is close to pi.
+        """
+        from genai.pi_estimator import count_hits, merge_hits
+
+        self.assertEqual(count_hits(10000, 7, 3), count_hits(10000, 7, 3), 'Subjob not reproducible.')
+        self.assertNotEqual(count_hits(10000, 7, 3), count_hits(10000, 7, 4), 'Subjobs share a stream.')
+        self.assertNotEqual(count_hits(10000, 7, 3), count_hits(10000, 8, 3), 'Seed ignored.')
+
+        # more points than a chunk
+        lines = ["%d\t%d" % count_hits(50000, 1, subjob_index, chunk=4096) for subjob_index in range(4)]
+        result = merge_hits(lines)
+        self.assertEqual((result['samples'], result['subjobs']), (200000, 4))
+        self.assertLess(abs(result['pi'] - math.pi), 4 * result['standard_error'], 'Estimate too far from pi.')
+
+    def testSplitterArgsAndMerge(self):
+        """
+        The testSplitterArgsAndMerge function tests that the subjobs cover
+        every point and that the merger adds up hits and points instead
+        of averaging the estimates of the subjobs.
+        """
+        from genai.pi_estimator import get_splitter_args, merge_hits
+
+        args = get_splitter_args(2500, 1000, 42, script='pi_estimator.py')
+        self.assertEqual(args, [['pi_estimator.py', '1000', '42', '0'],
+                                ['pi_estimator.py', '1000', '42', '1'],
+                                ['pi_estimator.py', '500', '42', '2']])
+        self.assertEqual(len(get_splitter_args()), 1000)
+
+        # merged stdout of TextMerger, with its header lines
+        merged = ["# Start of file 0/output/stdout", "800\t1000", "# End of file 0/output/stdout",
+                  "# Start of file 1/output/stdout", "300\t500", "# End of file 1/output/stdout", ""]
+        result = merge_hits(merged)
+        self.assertEqual((result['hits'], result['samples'], result['subjobs']), (1100, 1500, 2))
+        self.assertAlmostEqual(result['pi'], 4 * 1100 / 1500)
+        self.assertEqual(result['skipped_lines'], 0)
+        self.assertIsNone(merge_hits([])['pi'])
+
+        # stray output of a subjob
+        result = merge_hits(merged + ["Warning: slow host", "12 of 30", "1.5\t2", "100\t200"])
+        self.assertEqual((result['hits'], result['samples'], result['subjobs']), (1200, 1700, 3))
+        self.assertEqual(result['skipped_lines'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import json
+import tempfile
+import unittest
+
+
+class TestPrecision(unittest.TestCase):
+    def testChooseDtype(self):
+        """
+        The testChooseDtype function tests that the fastest dtype with an
+        acceptable error is chosen, and float32 when no probe succeeded.
+        """
+        from genai.precision import choose_dtype
+
+        results = {'bfloat16': {'gflops': 50.0, 'relative_error': 3e-3},
+                   'float16': {'gflops': 80.0, 'relative_error': 0.5},
+                   'float32': {'gflops': 40.0, 'relative_error': 0.0}}
+        self.assertEqual(choose_dtype(results), 'bfloat16')
+
+        # e.g. a CPU without native bfloat16 support
+        results['bfloat16']['gflops'] = 5.0
+        self.assertEqual(choose_dtype(results), 'float32')
+        self.assertEqual(choose_dtype({'bfloat16': None, 'float16': None}), 'float32')
+
+    def testProbeCache(self):
+        """
+        The testProbeCache function tests that the dtypes are probed once
+        per host and that GENAI_DTYPE overrides the probe if it names a
+        candidate dtype.
+        """
+        from genai.precision import get_best_dtype, get_host_key
+
+        probed = []
+        def fake_probe(dtype, device):
+            probed.append(dtype)
+            return {'gflops': {'bfloat16': 10.0, 'float16': 30.0, 'float32': 20.0}[dtype], 'relative_error': 1e-3}
+
+        previous = os.environ.pop('GENAI_DTYPE', None)
+        cache_path = os.path.join(tempfile.mkdtemp(), 'precision.json')
+
+        self.assertEqual(get_best_dtype('cpu', cache_path, probe=fake_probe)[0], 'float16')
+        self.assertEqual(get_best_dtype('cpu', cache_path, probe=fake_probe)[0], 'float16')
+        self.assertEqual(probed, ['bfloat16', 'float16', 'float32'], 'Host probed more than once.')
+        with open(cache_path, 'r') as f:
+            self.assertEqual(json.load(f)[get_host_key('cpu')]['dtype'], 'float16')
+
+        get_best_dtype('cpu', cache_path, force=True, probe=fake_probe)
+        self.assertEqual(len(probed), 6, 'Forced probe not run.')
+
+        os.environ['GENAI_DTYPE'] = 'float32'
+        self.assertEqual(get_best_dtype('cpu', cache_path, probe=fake_probe), ('float32', {}))
+        os.environ['GENAI_DTYPE'] = 'float64'
+        with self.assertRaises(ValueError):
+            get_best_dtype('cpu', cache_path, probe=fake_probe)
+
+        if previous is None:
+            os.environ.pop('GENAI_DTYPE', None)
+        else:
+            os.environ['GENAI_DTYPE'] = previous
+        os.remove(cache_path)
+        os.rmdir(os.path.dirname(cache_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
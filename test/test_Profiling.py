@@ -0,0 +1,78 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+
+def busy_loop(n):
+    """
+    The busy_loop function gives the profiler something to measure.
+    """
+    return sum(i * i for i in range(n))
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.previous = os.environ.get('GENAI_PROFILE')
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        if self.previous is None:
+            os.environ.pop('GENAI_PROFILE', None)
+        else:
+            os.environ['GENAI_PROFILE'] = self.previous
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def testRunProfiled(self):
+        """
+        The testRunProfiled function tests that a run writes its profile
+        and statistics only when profiling is enabled.
+        """
+        from genai.profiling import run_profiled
+
+        os.environ.pop('GENAI_PROFILE', None)
+        self.assertEqual(run_profiled(lambda: busy_loop(10), 'count_it', self.folder), 285)
+        self.assertEqual(os.listdir(self.folder), [], 'Profile written with profiling disabled.')
+
+        os.environ['GENAI_PROFILE'] = '1'
+        self.assertEqual(run_profiled(lambda: busy_loop(10), 'count_it', self.folder), 285)
+        self.assertTrue(os.path.exists(os.path.join(self.folder, 'count_it.prof')), 'Profile not written.')
+        with open(os.path.join(self.folder, 'count_it.profile.json'), 'r') as f:
+            stats = json.load(f)
+        self.assertEqual(stats['name'], 'count_it')
+        self.assertGreaterEqual(stats['wall_seconds'], 0)
+        self.assertGreater(stats['peak_rss_mb'], 0)
+
+    def testWriteProfileReport(self):
+        """
+        The testWriteProfileReport function tests that the profiles of
+        every subjob are merged into one report in the master job's
+        output directory.
+        """
+        from genai.profiling import run_profiled, write_profile_report
+
+        os.environ['GENAI_PROFILE'] = '1'
+        subjobs = []
+        for subjob_id in range(2):
+            outputdir = os.path.join(self.folder, str(subjob_id), 'output')
+            os.makedirs(outputdir)
+            run_profiled(lambda: busy_loop(1000), 'count_it', outputdir)
+            subjobs.append(SimpleNamespace(outputdir=outputdir))
+
+        job = SimpleNamespace(outputdir=self.folder, subjobs=subjobs)
+        report_path = write_profile_report(job)
+
+        self.assertTrue(os.path.exists(os.path.join(self.folder, 'merged.prof')), 'Merged profile not written.')
+        with open(report_path, 'r') as f:
+            report = f.read()
+        self.assertIn('Profiled runs: 2', report)
+        self.assertIn('busy_loop', report)
+
+        empty_job = SimpleNamespace(outputdir=self.folder, subjobs=[SimpleNamespace(outputdir=tempfile.gettempdir() + '/none')])
+        self.assertIsNone(write_profile_report(empty_job), 'Report written without profiles.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestResultStore(unittest.TestCase):
+    def testLookupResult(self):
+        """
+        The testLookupResult function tests that a result is found only
+        for the same content hash, word and normalization version.
+        """
+        from genai.result_store import lookup_result, store_result
+
+        store_dir = tempfile.mkdtemp()
+        store_path = os.path.join(store_dir, 'results.json')
+
+        self.assertEqual(lookup_result(store_path, 'a.pdf', 'hash1', 'it', 1), (None, 0), 'Empty store not handled.')
+
+        store_result(store_path, 'a.pdf', 'hash1', 'it', 1, 31)
+        entry, stale = lookup_result(store_path, 'a.pdf', 'hash1', 'it', 1)
+        self.assertEqual((entry['word_count'], stale), (31, 0), 'Stored result not found.')
+
+        self.assertIsNone(lookup_result(store_path, 'a.pdf', 'hash1', 'the', 1)[0], 'Result found for another word.')
+        self.assertIsNone(lookup_result(store_path, 'b.pdf', 'hash2', 'it', 1)[0], 'Result found for another PDF.')
+
+        # the same content under another name is the same document
+        self.assertEqual(lookup_result(store_path, 'copy.pdf', 'hash1', 'it', 1)[0]['word_count'], 31)
+
+        shutil.rmtree(store_dir)
+
+    def testStaleResults(self):
+        """
+        The testStaleResults function tests that results for a changed file
+        or an older text normalization are reported as stale, never
+        returned, and dropped when a new result is stored.
+        """
+        from genai.result_store import lookup_result, store_result, load_results
+
+        store_dir = tempfile.mkdtemp()
+        store_path = os.path.join(store_dir, 'results.json')
+        store_result(store_path, 'a.pdf', 'hash1', 'it', 1, 31)
+        store_result(store_path, 'b.pdf', 'hash2', 'it', 1, 5)
+
+        # a.pdf was edited
+        self.assertEqual(lookup_result(store_path, 'a.pdf', 'hash3', 'it', 1), (None, 1), 'Changed file not detected.')
+        # the text normalization changed
+        self.assertEqual(lookup_result(store_path, 'b.pdf', 'hash2', 'it', 2), (None, 1), 'Old version not detected.')
+
+        store_result(store_path, 'a.pdf', 'hash3', 'it', 1, 30)
+        store_result(store_path, 'b.pdf', 'hash2', 'it', 2, 6)
+        results = load_results(store_path)
+        self.assertEqual(sorted(entry['word_count'] for entry in results.values()), [6, 30], 'Stale results not dropped.')
+
+        shutil.rmtree(store_dir)
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from fpdf import FPDF
+
+
+class TestRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        docs = os.path.join(self.folder, 'docs')
+        os.makedirs(docs)
+
+        pdf_writer = FPDF()
+        for text in ["The Large Hadron Collider accelerates protons at CERN.",
+                     "Detectors record the collisions of the protons."]:
+            pdf_writer.add_page()
+            pdf_writer.set_font('Times')
+            pdf_writer.cell(ln=0, align='L', w=0, txt=text, border=0)
+        pdf_writer.output(os.path.join(docs, 'LHC.pdf'), 'F')
+
+        with open(os.path.join(docs, 'ganga_example.py'), 'w') as f:
+            f.write("j = Job(name='pi', backend=Local())\nj.application = Executable()\n\n"
+                    "j.splitter = ArgSplitter(args=[[1], [2]])\n"
+                    "j.postprocessors.append(TextMerger(files=['stdout']))\nj.submit()\n")
+        self.docs = docs
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def testBuildAndSearch(self):
+        """
+        The testBuildAndSearch function tests that PDF pages and text files
+        are indexed in chunks, that the postings are memory-mapped and that
+        the best matching chunks come first.
+        """
+        from genai.retrieval import build_index, RetrievalIndex, iter_text_chunks
+
+        index_dir = os.path.join(self.folder, 'index')
+        info = build_index([self.docs], index_dir, chunk_words=20)
+        self.assertEqual(info['documents'], 3, 'One chunk per page and per text file expected.')
+
+        index = RetrievalIndex(index_dir)
+        self.assertIsInstance(index.doc_ids, np.memmap, 'Postings not memory-mapped.')
+
+        results = index.search('How do I split a Ganga job with ArgSplitter?', k=2)
+        self.assertEqual([os.path.basename(chunk['source']) for chunk in results], ['ganga_example.py'])
+        self.assertIn('ArgSplitter', results[0]['text'])
+
+        results = index.search('protons collisions', k=3)
+        self.assertEqual([chunk['location'] for chunk in results], ['page 1', 'page 0'])
+        self.assertEqual(index.search('unrelated words only', k=3), [])
+
+        self.assertEqual([location for location, _ in iter_text_chunks(os.path.join(self.docs, 'ganga_example.py'), 5)],
+                         ['line 1', 'line 4'], 'Text files not cut at paragraphs.')
+
+    def testGroundPrompt(self):
+        """
+        The testGroundPrompt function tests that only matching chunks are
+        prepended to the prompt.
+        """
+        from genai.retrieval import build_index, RetrievalIndex, ground_prompt
+
+        index_dir = os.path.join(self.folder, 'index')
+        build_index([self.docs], index_dir)
+        index = RetrievalIndex(index_dir)
+
+        prompt, chunks = ground_prompt('Merge stdout using TextMerger', index, k=2)
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(prompt.startswith('Reference material:\n\n[ganga_example.py, line 1]'))
+        self.assertTrue(prompt.endswith('Task:\nMerge stdout using TextMerger'))
+
+        self.assertEqual(ground_prompt('nothing relevant', index), ('nothing relevant', []))
+
+
+    def testGroundPromptBudget(self):
+        """
+        The testGroundPromptBudget function tests that chunks are kept
+        whole or trimmed to fit the token budget, and that the task is kept whole.
+        """
+        from genai.retrieval import fit_chunks, format_reference
+
+        def count_words(text):
+            return len(text.split())
+
+        chunks = [{'source': f"doc{i}.txt", 'location': 'line 1', 'text': ' '.join(f"w{i}_{n}" for n in range(30)),
+                   'score': 3.0 - i} for i in range(3)]
+        task = 'Split the job into subjobs with ArgSplitter and merge stdout with TextMerger.'
+
+        self.assertEqual(fit_chunks(chunks, task, count_words, 1000), chunks)
+
+        kept = fit_chunks(chunks, task, count_words, 60)
+        self.assertEqual([chunk['source'] for chunk in kept], ['doc0.txt', 'doc1.txt'], 'Least relevant chunk not dropped.')
+        self.assertEqual(kept[0], chunks[0])
+        self.assertTrue(kept[1]['text'].startswith('w1_0 w1_1') and kept[1]['text'].endswith(' ...'))
+        grounded = format_reference(kept) + task
+        self.assertLessEqual(count_words(grounded), 60)
+        self.assertGreater(count_words(grounded), 55, 'Chunk trimmed more than needed.')
+        self.assertTrue(grounded.endswith('Task:\n' + task))
+
+        self.assertEqual(fit_chunks(chunks, task, count_words, count_words(task)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,16 +25,17 @@ class TestSplitPDF(unittest.TestCase):
         sys.argv = ["split_pdf.py", "current_dir", "pdf_file"]
         self.assertEqual(get_current_directory(), ("current_dir", "pdf_file"), "Arguments not retrieved correctly.")
 
-    def create_pdf_with_numbers(self):
+    def create_pdf_with_numbers(self, pages=3):
         """
-        The create_pdf_with_numbers function creates a PDF file with 3 pages.
+        The create_pdf_with_numbers function creates a PDF file with 3 pages,
+        or the given number of pages.
         Each page has its number written on it in the top left corner.
         """
         pdf_file = 'test_pdf.pdf'
         pdf_writer = FPDF()
 
         # Add blank pages and write their page numbers inside
-        for i in range(3):
+        for i in range(pages):
             pdf_writer.add_page()
             pdf_writer.set_xy(0, 0)
             pdf_writer.set_font('Times')
@@ -69,3 +70,184 @@ class TestSplitPDF(unittest.TestCase):
         # remove dummy files
         os.remove(pdf_file)
         shutil.rmtree('extracted_pages')
+        os.remove('.extracted_pages.state.json')
+
+    def testSplitPdfParallel(self):
+        """
+        The testSplitPdfParallel function tests that splitting the dummy
+        PDF file with a process pool produces the same page files, each
+        holding the right page, as splitting it with a single process, and
+        that progress is reported page by page in page order.
+        """
+        import io
+        import re
+        from contextlib import redirect_stdout
+        from pypdf import PdfReader
+        from genai.split_pdf import split_pdf
+
+        pdf_file = self.create_pdf_with_numbers(pages=6)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            split_pdf(pdf_file, os.getcwd(), workers=2)
+        self.assertEqual([int(page) for page in re.findall(r"Extracted page (\d+)", output.getvalue())],\
+            list(range(1, 7)), "Progress not reported page by page in page order.")
+        for page_num in range(1, 7):
+            filename = f"extracted_pages/LHC_page_{page_num}.pdf"
+            self.assertTrue(os.path.exists(filename), f"Page {page_num} of PDF not extracted.")
+            self.assertEqual(PdfReader(filename).pages[0].extract_text().strip(), str(page_num),\
+                f"Page {page_num} of PDF extracted incorrectly.")
+
+        os.remove(pdf_file)
+        shutil.rmtree('extracted_pages')
+        os.remove('.extracted_pages.state.json')
+
+    def testSplitPdfResume(self):
+        """
+        The testSplitPdfResume function tests that a rerun on an unchanged
+        PDF file only extracts the pages that are missing or no longer
+        match their recorded checksum.
+        """
+        import io
+        from contextlib import redirect_stdout
+        from genai.split_pdf import split_pdf
+
+        pdf_file = self.create_pdf_with_numbers()
+        split_pdf(pdf_file, os.getcwd())
+
+        # page 2 goes missing and page 3 gets corrupted, page 1 is untouched
+        os.remove("extracted_pages/LHC_page_2.pdf")
+        with open("extracted_pages/LHC_page_3.pdf", 'r+b') as f:
+            f.write(b'X')
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            split_pdf(pdf_file, os.getcwd())
+        output = output.getvalue()
+
+        self.assertIn("Skipped 1 pages", output, "Unchanged page was not skipped.")
+        self.assertNotIn("Extracted page 1 ", output, "Unchanged page was extracted again.")
+        self.assertIn("Extracted page 2 ", output, "Missing page was not extracted again.")
+        self.assertIn("Extracted page 3 ", output, "Corrupted page was not extracted again.")
+        self.assertEqual(len(os.listdir('extracted_pages')), 3, "Folder should only hold the pages.")
+
+        os.remove(pdf_file)
+        shutil.rmtree('extracted_pages')
+        os.remove('.extracted_pages.state.json')
+
+    def testSplitPdfParallelCrash(self):
+        """
+        The testSplitPdfParallelCrash function tests that the files written
+        by the workers of a failed parallel run are recorded in the state,
+        even those finished ahead of a page that failed, so that a rerun
+        only extracts the rest.
+        """
+        import io
+        from contextlib import redirect_stdout
+        from unittest import mock
+        from genai import split_pdf as split_pdf_module
+
+        pdf_file = self.create_pdf_with_numbers(pages=6)
+        write_unit = split_pdf_module.write_unit
+
+        def fail_on_page_2(reader, manifest, name, page_nums, output_folder):
+            if 1 in page_nums:
+                raise RuntimeError("worker crashed")
+            return write_unit(reader, manifest, name, page_nums, output_folder)
+
+        # the workers are forked, so they inherit the patched function
+        with mock.patch.object(split_pdf_module, 'write_unit', fail_on_page_2),\
+             redirect_stdout(io.StringIO()), self.assertRaises(RuntimeError):
+            split_pdf_module.split_pdf(pdf_file, os.getcwd(), workers=2)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            split_pdf_module.split_pdf(pdf_file, os.getcwd(), workers=2)
+        output = output.getvalue()
+
+        self.assertIn("Skipped 4 pages", output, "Pages written before the crash were not recorded.")
+        self.assertIn("Extracted page 2 ", output)
+        self.assertIn("Extracted page 3 ", output)
+        self.assertEqual(len(os.listdir('extracted_pages')), 6)
+
+        os.remove(pdf_file)
+        shutil.rmtree('extracted_pages')
+        os.remove('.extracted_pages.state.json')
+
+    def testSplitPdfShards(self):
+        """
+        The testSplitPdfShards function tests the sharded and archived
+        output modes: the pages are packed into fewer files and every page
+        can be read back on its own through the index.
+        """
+        from genai.split_pdf import split_pdf, read_page
+
+        pdf_file = self.create_pdf_with_numbers()
+
+        for output_mode, expected_files in [('shards', ['LHC_shard_1.pdfpack', 'LHC_shard_2.pdfpack']),\
+                                            ('archive', ['LHC_pages.pdfpack'])]:
+            split_pdf(pdf_file, os.getcwd(), workers=2, output_mode=output_mode, shard_size=2)
+
+            self.assertEqual(sorted(os.listdir('extracted_pages')), sorted(expected_files + ['index.json']),\
+                f"Unexpected files in '{output_mode}' mode.")
+            for page_num in range(3):
+                self.assertEqual(read_page('extracted_pages', page_num).extract_text().strip(),\
+                    str(page_num + 1), f"Page {page_num + 1} read back incorrectly in '{output_mode}' mode.")
+
+            shutil.rmtree('extracted_pages')
+
+        os.remove(pdf_file)
+        os.remove('.extracted_pages.state.json')
+
+    def testSplitPdfChangedShardSize(self):
+        """
+        The testSplitPdfChangedShardSize function tests that a rerun with
+        another shard size or output mode doesn't keep the pack files of
+        the earlier layout, and that every page can be read back.
+        """
+        import io
+        from contextlib import redirect_stdout
+        from genai.split_pdf import split_pdf, read_page
+
+        pdf_file = self.create_pdf_with_numbers(10)
+
+        for output_mode, shard_size in [('pages', None), ('shards', 3), ('shards', 5), ('shards', 3)]:
+            output = io.StringIO()
+            with redirect_stdout(output):
+                split_pdf(pdf_file, os.getcwd(), output_mode=output_mode, shard_size=shard_size)
+            self.assertNotIn("Skipped", output.getvalue(), f"Stale files kept with shard size {shard_size}.")
+
+        self.assertEqual(sorted(os.listdir('extracted_pages')),\
+            ['LHC_shard_1.pdfpack', 'LHC_shard_2.pdfpack', 'LHC_shard_3.pdfpack', 'LHC_shard_4.pdfpack',\
+             'index.json'], "Files of an earlier layout left behind.")
+        for page_num in range(10):
+            self.assertEqual(read_page('extracted_pages', page_num).extract_text().strip(),\
+                str(page_num + 1), f"Page {page_num + 1} read back incorrectly.")
+
+        # back to single pages, which must not leave an index to the deleted packs
+        with redirect_stdout(io.StringIO()):
+            split_pdf(pdf_file, os.getcwd(), output_mode='pages')
+        self.assertEqual(sorted(os.listdir('extracted_pages')),\
+            sorted(f"LHC_page_{page_num}.pdf" for page_num in range(1, 11)), "Index of the packs left behind.")
+
+        os.remove(pdf_file)
+        shutil.rmtree('extracted_pages')
+        os.remove('.extracted_pages.state.json')
+
+    def testGetOptions(self):
+        """
+        The testGetOptions function tests that the optional arguments before
+        the current directory and pdf file name are read correctly.
+        """
+        from genai.split_pdf import get_options
+
+        sys.argv = ["split_pdf.py", "--workers", "4", "--output", "shards", "--shard-size", "10",\
+            "current_dir", "pdf_file"]
+        self.assertEqual(get_options(),\
+            ({'workers': 4, 'output_mode': 'shards', 'shard_size': 10}, "current_dir", "pdf_file"),\
+            "Options not retrieved correctly.")
+
+        for shard_size in ["0", "-2"]:
+            sys.argv = ["split_pdf.py", "--output", "shards", "--shard-size", shard_size, "current_dir", "pdf_file"]
+            with self.assertRaises(SystemExit, msg=f"Shard size {shard_size} accepted."):
+                get_options()
@@ -0,0 +1,82 @@
+import os
+import json
+import tempfile
+import unittest
+
+
+class FakeClock:
+    """
+    The FakeClock class stands in for time.perf_counter and advances
+    by a fixed step every time it is read.
+    """
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+class TestTelemetry(unittest.TestCase):
+    def testStages(self):
+        """
+        The testStages function tests that timed and externally timed
+        stages are recorded with their counters and peak memory, and
+        that callbacks fire as each stage ends.
+        """
+        from genai.telemetry import InferenceTelemetry
+
+        telemetry = InferenceTelemetry(run_id='run', clock=FakeClock(2.0), cpu_clock=FakeClock(1.0))
+        finished = []
+        telemetry.add_callback(lambda record: finished.append(record['stage']))
+
+        with telemetry.stage('tokenization') as counters:
+            counters['tokens'] = 12
+        telemetry.record_stage('decode', 6.0, tokens=30, tokens_per_second=5.0)
+
+        self.assertEqual(finished, ['tokenization', 'decode'], 'Callbacks not fired in order.')
+        tokenization, decode = telemetry.records
+        self.assertEqual((tokenization['seconds'], tokenization['cpu_seconds'], tokenization['tokens']), (2.0, 1.0, 12))
+        self.assertEqual((decode['seconds'], decode['tokens_per_second']), (6.0, 5.0))
+        self.assertTrue(decode['peak_rss_mb'] > 0, 'Peak memory not recorded.')
+
+        summary = telemetry.summary()
+        self.assertEqual(summary['seconds'], 8.0)
+        self.assertEqual(summary['stages']['decode']['share'], 0.75, 'Stage share is incorrect.')
+
+    def testFailedStage(self):
+        """
+        The testFailedStage function tests that a stage that raises is
+        still recorded.
+        """
+        from genai.telemetry import InferenceTelemetry
+
+        telemetry = InferenceTelemetry(clock=FakeClock(1.0))
+        with self.assertRaises(ValueError):
+            with telemetry.stage('model_load'):
+                raise ValueError('no such model')
+
+        self.assertEqual([record['stage'] for record in telemetry.records], ['model_load'])
+
+    def testExportJsonl(self):
+        """
+        The testExportJsonl function tests that every run appends its
+        stage records and its summary to the JSON lines file.
+        """
+        from genai.telemetry import InferenceTelemetry
+
+        path = os.path.join(tempfile.mkdtemp(), 'telemetry.jsonl')
+        for run_id in ('first', 'second'):
+            telemetry = InferenceTelemetry(run_id=run_id)
+            with telemetry.stage('file_write', files=1):
+                pass
+            telemetry.export_jsonl(path)
+
+        with open(path, 'r') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([(record['run_id'], record['stage']) for record in records],\
+            [('first', 'file_write'), ('first', 'summary'), ('second', 'file_write'), ('second', 'summary')])
+
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestWorkQueue(unittest.TestCase):
+    def testClaimTasks(self):
+        """
+        The testClaimTasks function tests that tasks are claimed in order,
+        that a claimed task can't be claimed again and that an empty
+        queue returns None.
+        """
+        from genai.work_queue import create_queue, load_queue_info, claim_task, complete_task, count_tasks
+
+        queue_dir = tempfile.mkdtemp()
+        create_queue(queue_dir, [[0, 2], [2, 3]], info={'word': 'it'})
+        self.assertEqual(load_queue_info(queue_dir), {'word': 'it'}, 'Queue info is incorrect.')
+
+        first_name, first_task = claim_task(queue_dir)
+        second_name, second_task = claim_task(queue_dir)
+        self.assertEqual([first_task, second_task], [[0, 2], [2, 3]], 'Tasks claimed out of order.')
+        self.assertIsNone(claim_task(queue_dir), 'A task was claimed twice.')
+        self.assertEqual(count_tasks(queue_dir, 'claimed'), 2)
+
+        complete_task(queue_dir, first_name)
+        self.assertEqual(count_tasks(queue_dir, 'done'), 1)
+        self.assertEqual(count_tasks(queue_dir, 'claimed'), 1)
+
+        shutil.rmtree(queue_dir)
+
+    def testIterTasks(self):
+        """
+        The testIterTasks function tests that two workers draining the
+        same queue together see every task exactly once.
+        """
+        from genai.work_queue import create_queue, iter_tasks, count_tasks
+
+        queue_dir = tempfile.mkdtemp()
+        create_queue(queue_dir, [[page, page + 1] for page in range(6)])
+
+        first_worker, second_worker = iter_tasks(queue_dir), iter_tasks(queue_dir)
+        seen = []
+        for task_pair in zip(first_worker, second_worker):
+            seen.extend(task_pair)
+        # the first worker asked once more and found the queue empty
+        seen.extend(second_worker)
+
+        self.assertEqual(sorted(seen), [[page, page + 1] for page in range(6)], 'Tasks lost or repeated.')
+        self.assertEqual(count_tasks(queue_dir, 'done'), 6, 'Not every task was marked as done.')
+
+        shutil.rmtree(queue_dir)